@@ -3,10 +3,10 @@
 from tools.tool_factory import ToolFactory
 from memory.contextual_memory import ContextualMemory
 from tasks.meta_task import MetaTask
-import openai
 import os 
 from dotenv import load_dotenv
 from utils.logger import logger
+from utils.llm_gateway import get_gateway
 
 # agents/executor_agent.py
 
@@ -59,18 +59,14 @@ class ExecutorAgent:
         Provide validation feedback and suggest improvements if necessary.
         """
         try:
-            response = openai.chat.completions.create(
+            validation_feedback = get_gateway().chat(
+                validation_prompt,
                 model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant."},
-                    {"role": "user", "content": validation_prompt}
-                ],
                 max_tokens=300,
                 n=1,
                 stop=None,
                 temperature=0.5,
             )
-            validation_feedback = response.choices[0].message.content
             logger.info(f"Validation Feedback: {validation_feedback}")
             
             # Adjust result based on feedback
@@ -80,7 +76,7 @@ class ExecutorAgent:
 
             return result
 
-        except openai.error.OpenAIError as e:
+        except Exception as e:
             logger.error(f"Error with LLM validation: {str(e)}")
             return result
 
@@ -1,18 +1,23 @@
-import openai
 import json
+from typing import Optional
 from .executor_agent import ExecutorAgent
 from tasks.meta_task import MetaTask
 from utils.graph import GraphOptimizer
+from utils.llm_gateway import get_gateway
+from utils.logger import logger
+from memory.plan_cache import PlanCache
 
 # Remove unnecessary imports
 # import os
 # from memory.persistence import PersistenceManager
 
 class ManagerAgent:
-    def __init__(self, executor_agents, memory, supervisor):
+    def __init__(self, executor_agents, memory, supervisor, plan_cache: Optional[PlanCache] = None):
         self.executor_agents = executor_agents
         self.memory = memory
         self.supervisor = supervisor
+        # Earlier decompositions, reused for similar requests instead of asking the LLM again
+        self.plan_cache = plan_cache if plan_cache is not None else PlanCache(memory.embedding_model)
 
     def assign_tasks(self, meta_tasks):
         unassigned_tasks = [task for task in meta_tasks if not task.is_completed()]
@@ -38,6 +43,14 @@ class ManagerAgent:
         return workload_factor * expertise_factor * complexity_factor
 
     def decompose_task(self, main_task):
+        try:
+            cached_plan = self.plan_cache.lookup(main_task.description, main_task.context, main_task.input_data)
+        except Exception as e:
+            logger.warning(f"Plan cache lookup failed, asking the LLM: {e}")
+            cached_plan = None
+        if cached_plan is not None:
+            return GraphOptimizer().optimize(self.build_meta_tasks(cached_plan))
+
         decomposition_prompt = f"""
         Decompose the following task into sub-tasks. Specify the tools needed for each sub-task and their dependencies.
 
@@ -53,19 +66,17 @@ class ManagerAgent:
         ```
         """
         try:
-            response = openai.ChatCompletion.create(
+            response = get_gateway().chat(
+                decomposition_prompt,
                 model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant."},
-                    {"role": "user", "content": decomposition_prompt}
-                ],
                 max_tokens=300,
                 n=1,
                 stop=None,
                 temperature=0.5,
             )
-            decomposition_plan = json.loads(response.choices[0].message.content)
+            decomposition_plan = json.loads(response)
             meta_tasks = self.build_meta_tasks(decomposition_plan)
+            self.plan_cache.store(main_task.description, main_task.context, main_task.input_data, decomposition_plan)
             return GraphOptimizer().optimize(meta_tasks)
 
         except Exception as e:
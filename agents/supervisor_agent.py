@@ -1,11 +1,10 @@
 # supervisor_agent.py
 
-import openai
-import os 
+from utils.llm_gateway import get_gateway
 
 class SupervisorAgent:
     def __init__(self):
-        openai.api_key = os.getenv("OPENAI_API_KEY")
+        self.llm = get_gateway()
 
     def refine_task(self, task, neighboring_task_results):
         task_context = self.summarize_neighboring_results(neighboring_task_results)
@@ -27,18 +26,14 @@ class SupervisorAgent:
         Provide refined insights and suggestions.
         """
         try:
-            response = openai.chat.completions.create(
+            refined_insights = self.llm.chat(
+                refinement_prompt,
                 model="gpt-4o-mini",
-                  messages=[
-                        {"role": "system", "content": "You are a helpful assistant."},
-                        {"role": "user", "content": refinement_prompt}
-                    ],
                 max_tokens=150,
                 n=1,
                 stop=None,
                 temperature=0.5,
             )
-            refined_insights = response.choices[0].message.content
             return refined_insights
 
         except Exception as e:
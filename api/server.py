@@ -1,7 +1,8 @@
 # api/server.py
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 from agents.manager_agent import ManagerAgent
 from agents.executor_agent import ExecutorAgent
@@ -9,13 +10,11 @@ from agents.supervisor_agent import SupervisorAgent
 from workflows.meta_task import MetaTaskWorkflow
 from tasks.meta_task import MetaTask
 from tools.tool_factory import ToolFactory
-from memory.embeddings import EmbeddingModel
+from memory.sharding import DEFAULT_SHARD, MemoryShards
+from utils.llm_gateway import close_gateway, get_gateway
 
 from utils.logger import logger
 
-# Import MemGPT
-from memory.memgpt import MemGPT
-
 # FastAPI app initialization
 app = FastAPI()
 
@@ -46,48 +45,110 @@ class ToolDiscoveryRequest(BaseModel):
 class ToolDiscoveryResponse(BaseModel):
     suggested_tools: List[str]
 
-# Initialize global variables to store agent instances
-executor_agents = []
-manager_agent = None
+class ShardContext:
+    """One memory shard (a session, tenant or agent) with the agents working on its memory."""
+
+    def __init__(self, memgpt, agent_configs: List[AgentConfig]):
+        self.memgpt = memgpt
+        self.executor_agents = [
+            ExecutorAgent(name=config.name, tools=config.tools, memory=memgpt.contextual_memory)
+            for config in agent_configs
+        ]
+        self.manager_agent = ManagerAgent(
+            executor_agents=self.executor_agents,
+            memory=memgpt.contextual_memory,
+            supervisor=supervisor_agent,
+            plan_cache=memgpt.plan_cache,
+        )
+
+    def close(self) -> None:
+        self.memgpt.close()
+
+# Initialize global variables; memory and agents live per shard so requests for different shards run in parallel
 supervisor_agent = SupervisorAgent()
-memgpt_instance = None  # Use MemGPT for memory management
+shards: Optional[MemoryShards] = None
+
+def _shard_key(shard: Optional[str], header: Optional[str]) -> str:
+    """Shard for a request: the `shard` query parameter, then the X-Memory-Shard header, then the default."""
+    return shard or header or DEFAULT_SHARD
+
+def _acquire_shard(active_shards: Optional[MemoryShards], key: str) -> ShardContext:
+    """Opens a shard and leases it, so it is not evicted while the request uses it; pair with `release`."""
+    if active_shards is None:
+        raise HTTPException(status_code=400, detail="System is not initialized. Please initialize first.")
+    try:
+        return active_shards.acquire(key)
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 # Initialize System Endpoint
 @app.post("/initialize_system", response_model=dict)
-async def initialize_system(request: InitializationRequest):
+async def initialize_system(
+    request: InitializationRequest,
+    shard: Optional[str] = Query(None),
+    x_memory_shard: Optional[str] = Header(None),
+):
     try:
-        global memgpt_instance
+        global shards
+        key = _shard_key(shard, x_memory_shard)
+
+        # Imported here so the server starts listening before the memory stack is loaded
+        from memory.embeddings import EmbeddingModel
+        from memory.memgpt import MemGPT
 
-        # Initialize MemGPT
         persona = request.personas.get("persona", "")
         human = request.personas.get("human", "")
         embedding_model = EmbeddingModel()
+        agent_configs = list(request.agent_configs)
 
-        # Initialize MemGPT instance
-        memgpt_instance = MemGPT(persona, human, embedding_model)
-
-        # Initialize Agents
-        global executor_agents, manager_agent
-        executor_agents = [
-            ExecutorAgent(name=config.name, tools=config.tools, memory=memgpt_instance.contextual_memory)
-            for config in request.agent_configs
-        ]
-
-        manager_agent = ManagerAgent(executor_agents=executor_agents, memory=memgpt_instance.contextual_memory, supervisor=supervisor_agent)
+        # Shards are opened on first use, each with its own MemGPT instance and data directory
+        new_shards = MemoryShards(
+            lambda key, data_dir: ShardContext(MemGPT(persona, human, embedding_model, data_dir=data_dir), agent_configs)
+        )
+        try:
+            new_shards.check_key(key)
+        except PermissionError as e:
+            raise HTTPException(status_code=403, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        # Flush the previous shards before their memory is reloaded by the new ones (off the event loop: it writes to disk)
+        if shards is not None:
+            await run_in_threadpool(shards.close_all)
+        shards = new_shards
+        context = await run_in_threadpool(shards.get, key)
 
         logger.info("System initialized successfully using MemGPT")
-        return {"status": "System initialized successfully"}
+        return {"status": "System initialized successfully", "shard": key, "startup_ms": context.memgpt.startup_report}
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error initializing system: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 # Execute Meta-Task Workflow
 @app.post("/execute_meta_task_workflow", response_model=WorkflowResponse)
-async def execute_meta_task_workflow(tasks: List[Task]):
+async def execute_meta_task_workflow(
+    tasks: List[Task],
+    shard: Optional[str] = Query(None),
+    x_memory_shard: Optional[str] = Header(None),
+):
+    try:
+        # Ensure the system is initialized and open the request's shard (off the event loop: it may load from disk)
+        key = _shard_key(shard, x_memory_shard)
+        active_shards = shards
+        context = await run_in_threadpool(_acquire_shard, active_shards, key)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error opening shard: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
     try:
-        # Ensure the system is initialized
-        if not manager_agent or not executor_agents:
+        if not context.executor_agents:
             raise HTTPException(status_code=400, detail="System is not initialized. Please initialize first.")
 
         # Convert input tasks to MetaTask objects
@@ -106,21 +167,47 @@ async def execute_meta_task_workflow(tasks: List[Task]):
         # Initialize and execute workflow
         workflow = MetaTaskWorkflow(
             tasks=meta_tasks,
-            manager_agent=manager_agent,
-            executor_agents=executor_agents,
+            manager_agent=context.manager_agent,
+            executor_agents=context.executor_agents,
             supervisor_agent=supervisor_agent
         )
-        results = workflow.execute()
+        # Run in a worker thread so the event loop keeps serving other shards meanwhile
+        results = await run_in_threadpool(workflow.execute)
 
-        # Save memory state after task execution
-        memgpt_instance.save_all_memories()
+        # Save memory state after task execution, off the request path
+        context.memgpt.mark_dirty()
 
         logger.info("Meta-Task Workflow executed successfully")
         return {"status": "Meta-Task Workflow executed successfully", "results": results}
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error executing workflow: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        # Releasing may close shards evicted while this one was leased
+        await run_in_threadpool(active_shards.release, key)
+
+@app.on_event("shutdown")
+def shutdown():
+    """Writes any pending memory snapshot and closes the LLM connection pool before the process exits."""
+    if shards is not None:
+        shards.close_all()
+    close_gateway()
+
+# Memory Statistics
+@app.get("/memory_stats", response_model=dict)
+async def memory_stats(shard: Optional[str] = Query(None), x_memory_shard: Optional[str] = Header(None)):
+    key = _shard_key(shard, x_memory_shard)
+    if shards is None or key not in shards:
+        raise HTTPException(status_code=400, detail=f"Shard '{key}' is not open. Initialize or run a workflow on it first.")
+    return {
+        "shard": key,
+        "open_shards": shards.keys(),
+        **shards.get(key).memgpt.stats(),
+        "llm": get_gateway().report(),
+    }
 
 # Discover Tools
 @app.post("/discover_tools", response_model=ToolDiscoveryResponse)
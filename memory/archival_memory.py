@@ -0,0 +1,52 @@
+# memory/archival_memory.py
+
+from typing import Any, Tuple
+import numpy as np
+
+
+class ArchivalMemory(list):
+    """
+    List of (memory, embedding) pairs shared by the persistence manager and the function executor.
+    `version` is bumped by every change other than appending (clear, reload, removal, edits), so
+    anything derived from a prefix of the list (the on-disk rows, the search index) can tell it is stale.
+    """
+
+    def __init__(self, *args: Any):
+        super().__init__(*args)
+        self.version = 0
+
+    def _changed(self) -> None:
+        self.version += 1
+
+    def clear(self) -> None:
+        super().clear()
+        self._changed()
+
+    def __setitem__(self, index, value) -> None:
+        super().__setitem__(index, value)
+        self._changed()
+
+    def __delitem__(self, index) -> None:
+        super().__delitem__(index)
+        self._changed()
+
+    def insert(self, index: int, value: Tuple[str, np.ndarray]) -> None:
+        super().insert(index, value)
+        self._changed()
+
+    def pop(self, index: int = -1) -> Tuple[str, np.ndarray]:
+        value = super().pop(index)
+        self._changed()
+        return value
+
+    def remove(self, value: Tuple[str, np.ndarray]) -> None:
+        super().remove(value)
+        self._changed()
+
+    def sort(self, *args: Any, **kwargs: Any) -> None:
+        super().sort(*args, **kwargs)
+        self._changed()
+
+    def reverse(self) -> None:
+        super().reverse()
+        self._changed()
@@ -1,3 +1,4 @@
+import threading
 from typing import Dict, Any
 
 class MemoryModule:
@@ -7,26 +8,31 @@ class MemoryModule:
         self.name = name
         self.limit = limit
         self.content = content
+        # Appends and replacements are read-modify-write on the content string
+        self._lock = threading.Lock()
 
     def append(self, new_content: str) -> None:
         """Appends content to the memory module."""
         
-        # Check content length before appending
-        if len(self.content) + len(new_content) > self.limit:
-            raise ValueError(f"Appending exceeds the memory limit of {self.limit} characters.")
-        self.content += new_content
+        with self._lock:
+            # Check content length before appending
+            if len(self.content) + len(new_content) > self.limit:
+                raise ValueError(f"Appending exceeds the memory limit of {self.limit} characters.")
+            self.content += new_content
 
     def replace(self, old_content: str, new_content: str) -> None:
         """Replaces existing content in the memory module."""
         
-        # Ensure old content exists
-        if old_content not in self.content:
-            raise ValueError(f"Content to replace not found in memory module '{self.name}'.")
-        
-        # Replace and validate length
-        self.content = self.content.replace(old_content, new_content)
-        if len(self.content) > self.limit:
-            raise ValueError(f"Replacement exceeds the memory limit of {self.limit} characters.")
+        with self._lock:
+            # Ensure old content exists
+            if old_content not in self.content:
+                raise ValueError(f"Content to replace not found in memory module '{self.name}'.")
+
+            # Validate length before publishing the replacement
+            content = self.content.replace(old_content, new_content)
+            if len(content) > self.limit:
+                raise ValueError(f"Replacement exceeds the memory limit of {self.limit} characters.")
+            self.content = content
 
     def to_dict(self) -> Dict[str, Any]:
         """Converts the memory module content to a dictionary."""
@@ -41,16 +47,18 @@ class BaseMemory:
 
     def __init__(self):
         self.memory_modules: Dict[str, MemoryModule] = {}
+        self._lock = threading.Lock()
 
     def add_module(self, name: str, limit: int, content: str = "") -> None:
         """Adds a new memory module."""
         
-        # Check if module already exists
-        if name in self.memory_modules:
-            raise ValueError(f"Memory module '{name}' already exists.")
-        
-        # Add new module
-        self.memory_modules[name] = MemoryModule(name, limit, content)
+        with self._lock:
+            # Check if module already exists
+            if name in self.memory_modules:
+                raise ValueError(f"Memory module '{name}' already exists.")
+
+            # Add new module
+            self.memory_modules[name] = MemoryModule(name, limit, content)
 
     def get_module(self, name: str) -> MemoryModule:
         """Retrieves a memory module by name."""
@@ -66,7 +74,7 @@ class BaseMemory:
         """Converts all memory modules to a dictionary."""
         
         # Convert memory modules to dict
-        return {name: module.to_dict() for name, module in self.memory_modules.items()}
+        return {name: module.to_dict() for name, module in list(self.memory_modules.items())}
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "BaseMemory":
@@ -0,0 +1,100 @@
+# memory/context_cache.py
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class ContextCache:
+    """
+    Bounded LRU of assembled task contexts. Each entry remembers the memory generation it was
+    built from (the version counters of the storages it read); a lookup made at any other
+    generation is a miss and drops the entry, so invalidation is exact without scanning.
+    Entries also expire `ttl` seconds after they were built, for inputs that change with time
+    alone (recency decay) rather than through a write.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 4 * 1024 * 1024, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[Tuple[int, ...], Any, int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def get(self, key: Hashable, generation: Tuple[int, ...]) -> Optional[Any]:
+        """Returns the cached value for the key if it was built at this generation, else None."""
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is None:
+                self.misses += 1
+                return None
+            if cached[0] != generation or (self.ttl and time.monotonic() - cached[3] > self.ttl):
+                self._drop(key)
+                self.stale += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return cached[1]
+
+    def put(self, key: Hashable, generation: Tuple[int, ...], value: Any, size: int) -> None:
+        """Stores a value built at the given generation; `size` is its approximate size in bytes."""
+        if not self.enabled or size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (generation, value, size, time.monotonic())
+            self.bytes += size
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                _, (_, _, evicted, _) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    def _drop(self, key: Hashable) -> None:
+        """Removes an entry. Caller holds the lock."""
+        _, _, size, _ = self._entries.pop(key)
+        self.bytes -= size
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current sizes."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    @classmethod
+    def from_env(cls) -> "ContextCache":
+        """
+        Cache sized by MEMGPT_CONTEXT_CACHE_SIZE (entries) and MEMGPT_CONTEXT_CACHE_BYTES (0 disables it),
+        with entries expiring after MEMGPT_CONTEXT_CACHE_TTL seconds (0 = only on writes).
+        """
+        return cls(
+            max_entries=int(os.getenv("MEMGPT_CONTEXT_CACHE_SIZE", 256)),
+            max_bytes=int(os.getenv("MEMGPT_CONTEXT_CACHE_BYTES", 4 * 1024 * 1024)),
+            ttl=float(os.getenv("MEMGPT_CONTEXT_CACHE_TTL", 300)) or None,
+        )
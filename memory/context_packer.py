@@ -0,0 +1,125 @@
+# memory/context_packer.py
+
+from typing import Any, Dict, List, Optional, Tuple
+from memory.text_index import TOKEN_PATTERN
+from utils.tokenizer import TokenCounter, get_token_counter
+
+# Sections are rendered in this order, each under its header
+SECTION_HEADERS = {
+    "ltm": "Historical Data:",
+    "stm": "Recent Insights:",
+    "entities": "Entities:",
+}
+
+
+class Snippet:
+    """One candidate line of context: its source, text and relevance score within that source."""
+
+    def __init__(self, source: str, text: str, score: float, entry_id: Optional[int] = None):
+        self.source = source
+        self.text = text
+        self.score = score
+        self.entry_id = entry_id  # Storage entry the text came from, if any
+        self.value = 0.0  # Score normalised across sources, set by the packer
+        self.tokens = 0
+
+    @property
+    def line(self) -> str:
+        return f"- {self.text}"
+
+    def describe(self, reason: str) -> Dict[str, Any]:
+        return {"source": self.source, "text": self.text, "tokens": self.tokens, "value": round(self.value, 4), "reason": reason}
+
+
+class ContextPacker:
+    """
+    Packs snippets from several memory sources into a token budget. Scores are normalised per
+    source (each source's best snippet is worth 1.0, times its weight), near-duplicates are
+    dropped in favour of the more valuable copy, and the rest are chosen greedily by value per
+    token. Every dropped snippet is reported with the reason.
+    """
+
+    def __init__(
+        self,
+        token_counter: Optional[TokenCounter] = None,
+        dedupe_threshold: float = 0.85,
+        weights: Optional[Dict[str, float]] = None,
+    ):
+        self.token_counter = token_counter or get_token_counter()
+        self.dedupe_threshold = dedupe_threshold
+        self.weights = weights or {}
+
+    def _normalise(self, snippets: List[Snippet]) -> None:
+        best: Dict[str, float] = {}
+        for snippet in snippets:
+            best[snippet.source] = max(best.get(snippet.source, 0.0), snippet.score)
+        for snippet in snippets:
+            top = best[snippet.source]
+            value = snippet.score / top if top > 0 else 1.0
+            snippet.value = value * self.weights.get(snippet.source, 1.0)
+            snippet.tokens = self.token_counter.count(snippet.line) + 1  # + newline
+
+    def _dedupe(self, snippets: List[Snippet], dropped: List[Dict[str, Any]]) -> List[Snippet]:
+        """Keeps the most valuable copy of near-identical snippets (token-set Jaccard similarity)."""
+        kept: List[Tuple[Snippet, frozenset]] = []
+        for snippet in sorted(snippets, key=lambda item: -item.value):
+            terms = frozenset(TOKEN_PATTERN.findall(snippet.text.lower()))
+            duplicate = any(
+                terms == other or (terms and other and len(terms & other) / len(terms | other) >= self.dedupe_threshold)
+                for _, other in kept
+            )
+            if duplicate:
+                dropped.append(snippet.describe("duplicate"))
+            else:
+                kept.append((snippet, terms))
+        return [snippet for snippet, _ in kept]
+
+    def _render(self, chosen: List[Snippet], order: List[Snippet]) -> str:
+        chosen_ids = {id(snippet) for snippet in chosen}
+        sections = []
+        for source, header in SECTION_HEADERS.items():
+            lines = [snippet.line for snippet in order if snippet.source == source and id(snippet) in chosen_ids]
+            if lines:
+                sections.append("\n".join([header] + lines))
+        return "\n".join(sections)
+
+    def pack(self, snippets: List[Snippet], budget: Optional[int] = None) -> Tuple[str, Dict[str, Any]]:
+        """
+        Returns the rendered context and a report: budget, tokens used, snippets kept and
+        candidates seen, and the dropped snippets. A budget of None means no limit.
+        """
+        dropped: List[Dict[str, Any]] = []
+        self._normalise(snippets)
+        candidates = self._dedupe(snippets, dropped)
+
+        chosen: List[Snippet] = []
+        used = 0
+        opened = set()
+        for snippet in sorted(candidates, key=lambda item: -item.value / item.tokens):
+            cost = snippet.tokens
+            if snippet.source not in opened:
+                cost += self.token_counter.count(SECTION_HEADERS.get(snippet.source, "")) + 1
+            if budget is not None and used + cost > budget:
+                dropped.append(snippet.describe("budget"))
+                continue
+            chosen.append(snippet)
+            opened.add(snippet.source)
+            used += cost
+
+        # Per-line counts can be off by a token where lines meet; trim until the rendered text fits
+        rendered = self._render(chosen, snippets)
+        tokens = self.token_counter.count(rendered)
+        while budget is not None and chosen and tokens > budget:
+            dropped.append(chosen.pop().describe("budget"))
+            rendered = self._render(chosen, snippets)
+            tokens = self.token_counter.count(rendered)
+
+        report = {
+            "budget": budget,
+            "tokens": tokens,
+            "kept": len(chosen),
+            "candidates": len(snippets),
+            "exact_tokens": self.token_counter.exact,
+            "dropped": dropped,
+        }
+        return rendered, report
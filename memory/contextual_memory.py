@@ -1,64 +1,146 @@
 # contextual_memory.py
 
-from typing import Optional
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
 from .short_term_memory import ShortTermMemory
 from .long_term_memory import LongTermMemory
 from .entity_memory import EntityMemory
+from .context_packer import ContextPacker, Snippet
+from .context_cache import ContextCache
 
 class ContextualMemory:
     def __init__(self, stm: ShortTermMemory, ltm: LongTermMemory, em: EntityMemory):
         self.stm = stm
         self.ltm = ltm
         self.em = em
+        self.embedding_model = stm.storage.embedding_model
+        self._executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="context-builder")
+        self.last_timings: Dict[str, float] = {}
+        self.entity_hops = 1  # Relationship hops followed from entities named in the task
+        # Token budget for the built context (MEMGPT_CONTEXT_TOKEN_BUDGET, 0 = unlimited)
+        self.token_budget = int(os.getenv("MEMGPT_CONTEXT_TOKEN_BUDGET", 1500)) or None
+        self.packer = ContextPacker()
+        self.last_report: Dict[str, Any] = {}
+        # Built contexts, valid until any of the three storages is written to
+        self.cache = ContextCache.from_env()
 
-    def build_context_for_task(self, task_description: str, context: str) -> str:
+    def build_context_for_task(self, task_description: str, context: str, token_budget: Optional[int] = None) -> str:
         """
         Automatically builds a minimal, highly relevant set of contextual information for a given task.
         """
+        built_context, _ = self.build_context_with_timings(task_description, context, token_budget)
+        return built_context
+
+    def build_context_with_timings(
+        self, task_description: str, context: str, token_budget: Optional[int] = None
+    ) -> Tuple[str, Dict[str, float]]:
+        """
+        Builds the task context and returns it with a per-stage timing breakdown in milliseconds.
+        Each distinct query string is embedded once and the three memory searches run concurrently;
+        the hits are then packed into the token budget (see `last_report` for what was dropped).
+        Results are cached until the next write to any of the three memories (or the cache TTL);
+        expired STM entries are evicted first, and STM entries served from the cache count as retrieved.
+        """
+        started = time.perf_counter()
         query = f"{task_description} {context}".strip()
 
         if query == "":
-            return ""
+            self.last_timings = {}
+            self.last_report = {}
+            return "", {}
+
+        budget = (self.token_budget if token_budget is None else token_budget) or None
+        # Expire STM before reading the generation, so a hit never serves entries past their TTL
+        self.stm.evict()
+        # Read before searching: a write that lands mid-build leaves this entry at an old generation
+        generation = self.generation()
+        cache_key = (task_description, context, budget, self.entity_hops)
+        cached = self.cache.get(cache_key, generation)
+        if cached is not None:
+            built_context, report, stm_ids = cached
+            self.stm.touch(stm_ids)
+            self.last_report = {**report, "cached": True}
+            elapsed = (time.perf_counter() - started) * 1000
+            self.last_timings = {"cache": elapsed, "total": elapsed}
+            return built_context, self.last_timings
+
+        # LTM is queried with the bare description, STM and entities with description + context
+        distinct_queries = list(dict.fromkeys([task_description, query]))
+        if self.stm.storage.retrieval_mode == "auto":
+            # Storages embed on demand so a confident lexical match can skip the embedding call;
+            # concurrent requests for the same text are still coalesced into one API call
+            embeddings = dict.fromkeys(distinct_queries)
+        else:
+            embeddings = dict(zip(distinct_queries, self.embedding_model.embed_batch(distinct_queries)))
+        timings = {"embedding": (time.perf_counter() - started) * 1000}
+
+        futures = {
+            "ltm": self._executor.submit(self._timed, self._fetch_ltm_context, task_description, embeddings[task_description]),
+            "stm": self._executor.submit(self._timed, self._fetch_stm_context, query, embeddings[query]),
+            "entities": self._executor.submit(self._timed, self._fetch_entity_context, query, embeddings[query]),
+        }
+
+        results = {}
+        for source, future in futures.items():
+            results[source], timings[source] = future.result()
 
-        context = []
-        context.append(self._fetch_ltm_context(task_description))
-        context.append(self._fetch_stm_context(query))
-        context.append(self._fetch_entity_context(query))
-        return "\n".join(filter(None, context))
+        stage = time.perf_counter()
+        built_context, self.last_report = self.packer.pack(results["ltm"] + results["stm"] + results["entities"], budget)
+        timings["packing"] = (time.perf_counter() - stage) * 1000
+        size = len(built_context) + sum(len(dropped["text"]) for dropped in self.last_report["dropped"])
+        stm_ids = [snippet.entry_id for snippet in results["stm"]]
+        self.cache.put(cache_key, generation, (built_context, self.last_report, stm_ids), size)
 
-    def _fetch_stm_context(self, query) -> str:
+        timings["total"] = (time.perf_counter() - started) * 1000
+        self.last_timings = timings
+        return built_context, timings
+
+    def close(self) -> None:
+        """Stops the search worker threads."""
+        self._executor.shutdown(wait=True)
+
+    def generation(self) -> Tuple[int, int, int]:
+        """Version counters of the memories a context is built from; any write changes it."""
+        return (self.stm.storage.version, self.ltm.storage.version, self.em.storage.version)
+
+    @staticmethod
+    def _timed(fetch, query: str, query_embedding: Optional[np.ndarray]):
+        """Runs one fetch and returns its result with the elapsed milliseconds."""
+        started = time.perf_counter()
+        result = fetch(query, query_embedding)
+        return result, (time.perf_counter() - started) * 1000
+
+    def _fetch_stm_context(self, query, query_embedding: Optional[np.ndarray] = None) -> List[Snippet]:
         """
-        Fetches recent relevant insights from STM related to the task's description and expected_output,
-        formatted as bullet points.
+        Fetches recent relevant insights from STM related to the task's description and expected_output.
         """
-        stm_results = self.stm.search(query)
-        formatted_results = "\n".join([f"- {result['value']}" for result in stm_results])
-        return f"Recent Insights:\n{formatted_results}" if stm_results else ""
+        stm_results = self.stm.search(query, query_embedding=query_embedding)
+        return [Snippet("stm", result["value"], result.get("score", 1.0), result.get("id")) for result in stm_results]
 
-    def _fetch_ltm_context(self, task) -> Optional[str]:
+    def _fetch_ltm_context(self, task, query_embedding: Optional[np.ndarray] = None) -> List[Snippet]:
         """
-        Fetches historical data or insights from LTM that are relevant to the task's description and expected_output,
-        formatted as bullet points.
+        Fetches historical data or insights from LTM that are relevant to the task's description and expected_output.
+        Each suggestion is scored by the best LTM result carrying it.
         """
-        ltm_results = self.ltm.search(task, latest_n=2)
-        if not ltm_results:
-            return None
-
-        formatted_results = [
-            suggestion
-            for result in ltm_results
-            for suggestion in result.get("metadata", {}).get("suggestions", [])
-        ]
-        formatted_results = list(dict.fromkeys(formatted_results))
-        formatted_results = "\n".join([f"- {result}" for result in formatted_results])
-
-        return f"Historical Data:\n{formatted_results}" if ltm_results else ""
+        ltm_results = self.ltm.search(task, latest_n=2, query_embedding=query_embedding)
+        suggestions: Dict[str, float] = {}
+        for result in ltm_results:
+            for suggestion in result.get("metadata", {}).get("suggestions", []):
+                suggestions.setdefault(suggestion, result.get("score", 1.0))
+        return [Snippet("ltm", suggestion, score) for suggestion, score in suggestions.items()]
 
-    def _fetch_entity_context(self, query) -> str:
+    def _fetch_entity_context(self, query, query_embedding: Optional[np.ndarray] = None) -> List[Snippet]:
         """
-        Fetches relevant entity information from Entity Memory related to the task's description and expected_output,
-        formatted as bullet points.
+        Fetches relevant entity information from Entity Memory related to the task's description and expected_output.
         """
-        em_results = self.em.search(query)
-        formatted_results = "\n".join([f"- {result['value']}" for result in em_results])
-        return f"Entities:\n{formatted_results}" if em_results else ""
+        # Entities named in the query and their neighbours come straight from the entity graph;
+        # the semantic scan is only needed when the query names no known entity
+        related = [entity for entity in self.em.related(query, hops=self.entity_hops) if entity["value"]]
+        if related:
+            # Named entities rank first, each further hop counts for less
+            return [Snippet("entities", entity["value"], 1.0 / (1 + entity["hops"])) for entity in related]
+        em_results = self.em.search(query, query_embedding=query_embedding)
+        return [Snippet("entities", result["value"], result.get("score", 1.0)) for result in em_results]
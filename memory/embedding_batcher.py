@@ -0,0 +1,104 @@
+# memory/embedding_batcher.py
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from utils.logger import logger
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent single-text embedding requests. Requests are gathered for up to
+    max_wait_ms (or until max_batch_size is reached), sent as one batched call, and the
+    results are fanned back out to the waiting callers. Each request carries the `embed_batch` of
+    the model instance that made it, so instances sharing a batcher keep their own client and cache.
+    """
+
+    def __init__(
+        self,
+        embed_batch: Callable[[List[str]], List[np.ndarray]],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+    ):
+        self.embed_batch = embed_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue[Tuple[str, Future, Callable]]" = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.texts = 0
+        self.largest_batch = 0
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._thread.start()
+
+    def submit(self, text: str, embed_batch: Optional[Callable[[List[str]], List[np.ndarray]]] = None) -> Future:
+        """Queues a text and returns a future resolving to its embedding, computed by `embed_batch` if given."""
+        future: Future = Future()
+        self._queue.put((text, future, embed_batch or self.embed_batch))
+        self._ensure_started()
+        return future
+
+    def embed(self, text: str, embed_batch: Optional[Callable[[List[str]], List[np.ndarray]]] = None) -> np.ndarray:
+        """Blocking helper: submits the text and waits for its embedding."""
+        return self.submit(text, embed_batch).result()
+
+    def _collect(self) -> List[Tuple[str, Future, Callable]]:
+        """Blocks for the first request, then gathers more until the size cap or the deadline."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            groups: Dict[Callable, List[Tuple[str, Future]]] = {}
+            for text, future, embed_batch in self._collect():
+                groups.setdefault(embed_batch, []).append((text, future))
+            for embed_batch, requests in groups.items():
+                self._dispatch(embed_batch, requests)
+
+    def _dispatch(self, embed_batch: Callable[[List[str]], List[np.ndarray]], requests: List[Tuple[str, Future]]) -> None:
+        """Runs one batched call and settles every future in it, whatever the backend returns."""
+        requests = [(text, future) for text, future in requests if future.set_running_or_notify_cancel()]
+        if not requests:
+            return
+        texts = [text for text, _ in requests]
+        try:
+            embeddings = embed_batch(texts)
+            if len(embeddings) != len(texts):
+                raise ValueError(f"Embedding backend returned {len(embeddings)} vectors for {len(texts)} texts")
+        except Exception as e:
+            logger.error(f"Batched embedding request for {len(texts)} texts failed: {e}")
+            for _, future in requests:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.texts += len(texts)
+        self.largest_batch = max(self.largest_batch, len(texts))
+        for (_, future), embedding in zip(requests, embeddings):
+            future.set_result(embedding)
+
+    def stats(self) -> Dict[str, Any]:
+        """Batch counters; texts / batches is the effective coalescing factor."""
+        return {
+            "batches": self.batches,
+            "texts": self.texts,
+            "largest_batch": self.largest_batch,
+            "mean_batch_size": self.texts / self.batches if self.batches else 0.0,
+        }
@@ -0,0 +1,184 @@
+# memory/embedding_cache.py
+
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import numpy as np
+from utils.logger import logger
+
+
+class EmbeddingCache:
+    """
+    Two-level embedding cache keyed by a hash of (model, text): a bounded in-process LRU
+    in front of an on-disk store of .npy files that survives restarts.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        cache_dir: Optional[str] = "data/embedding_cache",
+        max_disk_bytes: Optional[int] = None,
+    ):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.disk_bytes: Optional[int] = None  # Computed lazily on the first disk write
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(model: str, text: str) -> str:
+        """Content address of an embedding."""
+        return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.npy")
+
+    def get(self, model: str, text: str) -> Optional[np.ndarray]:
+        """Returns the cached embedding, or None on a miss."""
+        key = self.key(model, text)
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return embedding
+
+        embedding = self._read_disk(key)
+        with self._lock:
+            if embedding is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._insert(key, embedding)
+        return embedding
+
+    def put(self, model: str, text: str, embedding: np.ndarray) -> np.ndarray:
+        """Stores an embedding in both tiers and returns the read-only cached copy."""
+        key = self.key(model, text)
+        embedding = np.array(embedding, dtype=np.float32)
+        embedding.setflags(write=False)
+        with self._lock:
+            self._insert(key, embedding)
+        self._write_disk(key, embedding)
+        return embedding
+
+    def _insert(self, key: str, embedding: np.ndarray) -> None:
+        """Adds to the LRU and evicts from the cold end until the byte budget holds. Caller holds the lock."""
+        if embedding.nbytes > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.bytes -= previous.nbytes
+        self._entries[key] = embedding
+        self.bytes += embedding.nbytes
+        while self.bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def _read_disk(self, key: str) -> Optional[np.ndarray]:
+        if not self.cache_dir:
+            return None
+        try:
+            embedding = np.load(self._path(key), allow_pickle=False)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Discarding unreadable embedding cache file for {key}: {e}")
+            return None
+        embedding.setflags(write=False)
+        return embedding
+
+    def _write_disk(self, key: str, embedding: np.ndarray) -> None:
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        if os.path.exists(path):
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp file and rename so concurrent readers never see a partial array
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, embedding, allow_pickle=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write embedding cache file {path}: {e}")
+            return
+        self._account_disk(os.path.getsize(path))
+
+    def _account_disk(self, added: int) -> None:
+        """Keeps the disk tier under max_disk_bytes by deleting the least recently written files."""
+        if self.max_disk_bytes is None:
+            return
+        with self._lock:
+            if self.disk_bytes is None:
+                self.disk_bytes = sum(os.path.getsize(path) for path in self._disk_files())
+            else:
+                self.disk_bytes += added
+            if self.disk_bytes <= self.max_disk_bytes:
+                return
+            for path in sorted(self._disk_files(), key=os.path.getmtime):
+                if self.disk_bytes <= self.max_disk_bytes:
+                    break
+                try:
+                    size = os.path.getsize(path)
+                    os.remove(path)
+                    self.disk_bytes -= size
+                except OSError:
+                    continue
+
+    def _disk_files(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".npy"):
+                    yield os.path.join(root, name)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current sizes."""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "disk_bytes": self.disk_bytes,
+                "evictions": self.evictions,
+            }
+
+    def clear(self) -> None:
+        """Empties the in-process tier; the disk tier is left alone."""
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+
+_default_cache: Optional[EmbeddingCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> EmbeddingCache:
+    """Process-wide cache shared by every EmbeddingModel, configured from the environment."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            max_disk_bytes = os.getenv("MEMGPT_EMBEDDING_CACHE_DISK_BYTES")
+            _default_cache = EmbeddingCache(
+                max_bytes=int(os.getenv("MEMGPT_EMBEDDING_CACHE_BYTES", 64 * 1024 * 1024)),
+                cache_dir=os.getenv("MEMGPT_EMBEDDING_CACHE_DIR", "data/embedding_cache") or None,
+                max_disk_bytes=int(max_disk_bytes) if max_disk_bytes else None,
+            )
+        return _default_cache
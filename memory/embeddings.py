@@ -1,20 +1,105 @@
-import openai
 import numpy as np
 import os
+import threading
+from typing import Dict, List, Optional
+from memory.embedding_cache import EmbeddingCache, get_default_cache
+from memory.embedding_batcher import EmbeddingBatcher
+from utils.single_flight import SingleFlight
+
+# One coalescer and one single-flight group per embedding model, shared by every EmbeddingModel in the process
+_batchers: Dict[str, EmbeddingBatcher] = {}
+_batchers_lock = threading.Lock()
+_flights: Dict[str, SingleFlight] = {}
 
 class EmbeddingModel:
     """A class for generating and handling text embeddings using OpenAI."""
 
-    def __init__(self):
-        openai.api_key = os.getenv("OPENAI_API_KEY")
+    max_api_batch_size = 2048  # Inputs accepted by a single embeddings request
+
+    def __init__(
+        self,
+        model: str = "text-embedding-ada-002",
+        cache: Optional[EmbeddingCache] = None,
+        use_cache: bool = True,
+        coalesce: Optional[bool] = None,
+    ):
+        self.model = model
+        self.cache = (cache or get_default_cache()) if use_cache else None
+        if coalesce is None:
+            coalesce = os.getenv("MEMGPT_EMBEDDING_COALESCE", "1") != "0"
+        self.coalesce = coalesce
+
+    @property
+    def batcher(self) -> EmbeddingBatcher:
+        """Shared micro-batching coalescer for this model; requests still go through this instance's embed_batch."""
+        with _batchers_lock:
+            if self.model not in _batchers:
+                _batchers[self.model] = EmbeddingBatcher(
+                    self.embed_batch,
+                    max_batch_size=int(os.getenv("MEMGPT_EMBEDDING_BATCH_SIZE", 64)),
+                    max_wait_ms=float(os.getenv("MEMGPT_EMBEDDING_BATCH_WAIT_MS", 5)),
+                )
+            return _batchers[self.model]
+
+    @property
+    def flight(self) -> SingleFlight:
+        """Shared single-flight group for this model."""
+        with _batchers_lock:
+            if self.model not in _flights:
+                _flights[self.model] = SingleFlight()
+            return _flights[self.model]
 
     def embed(self, text: str) -> np.ndarray:
-        """Generates an embedding for the given text using OpenAI's API."""
+        """
+        Generates an embedding for the given text, serving repeated text from the cache.
+        Concurrent misses for the same text share one request.
+        """
+        if self.cache is not None:
+            cached = self.cache.get(self.model, text)
+            if cached is not None:
+                return cached
+
+        # Only instances with the same backend and cache are interchangeable
+        key = (type(self), id(self.cache), text)
+        if self.coalesce:
+            return self.flight.do(key, lambda: self.batcher.embed(text, self.embed_batch))
+        return self.flight.do(key, lambda: self.embed_batch([text])[0])
+
+    def embed_batch(self, texts: List[str]) -> List[np.ndarray]:
+        """Generates embeddings for several texts, requesting only uncached, distinct texts from the API."""
+        embeddings: List[Optional[np.ndarray]] = [None] * len(texts)
+        missing: Dict[str, List[int]] = {}
+        for position, text in enumerate(texts):
+            cached = self.cache.get(self.model, text) if self.cache is not None else None
+            if cached is not None:
+                embeddings[position] = cached
+            else:
+                missing.setdefault(text, []).append(position)
+
+        pending = list(missing)
+        for start in range(0, len(pending), self.max_api_batch_size):
+            chunk = pending[start:start + self.max_api_batch_size]
+            results = self._request_embeddings(chunk)
+            if len(results) != len(chunk):
+                raise ValueError(f"Embeddings API returned {len(results)} vectors for {len(chunk)} texts")
+            for text, embedding in zip(chunk, results):
+                if self.cache is not None:
+                    embedding = self.cache.put(self.model, text, embedding)
+                for position in missing[text]:
+                    embeddings[position] = embedding
+        return embeddings
+
+    def _request_embeddings(self, texts: List[str]) -> List[np.ndarray]:
+        """Generates embeddings for the given texts with a single call to OpenAI's API."""
+        import openai  # Imported on first use: the SDK is slow to import and cache hits never need it
+
+        openai.api_key = os.getenv("OPENAI_API_KEY")
         response = openai.embeddings.create(
-            input=text,
-            model="text-embedding-ada-002"  # Specify the embedding model
+            input=texts,
+            model=self.model
         )
-        return np.array(response.data[0].embedding, dtype=np.float32)
+        ordered = sorted(response.data, key=lambda item: item.index)
+        return [np.array(item.embedding, dtype=np.float32) for item in ordered]
 
     def similarity(self, vec1: np.ndarray, vec2: np.ndarray) -> float:
         """Calculates cosine similarity between two vectors."""
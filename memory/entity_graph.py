@@ -0,0 +1,166 @@
+# memory/entity_graph.py
+
+import re
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from memory.text_index import TOKEN_PATTERN
+
+# "works_at: Acme Corp", "manages -> Bob" or just "Acme Corp", separated by commas, semicolons or newlines
+RELATIONSHIP_SEPARATOR = re.compile(r"[,;\n]")
+RELATION_SPLIT = re.compile(r"\s*(?:->|:|=)\s*")
+
+
+def normalize_name(name: str) -> str:
+    """Case- and whitespace-insensitive key for an entity name."""
+    return " ".join(TOKEN_PATTERN.findall(name.lower()))
+
+
+def parse_relationships(relationships: str) -> List[Tuple[str, str]]:
+    """Parses a free-form relationships string into (relation, target name) pairs."""
+    pairs = []
+    for part in RELATIONSHIP_SEPARATOR.split(relationships or ""):
+        part = part.strip()
+        if not part:
+            continue
+        pieces = RELATION_SPLIT.split(part, maxsplit=1)
+        relation, target = (pieces[0], pieces[1]) if len(pieces) == 2 else ("related_to", pieces[0])
+        if normalize_name(target):
+            pairs.append((relation.strip() or "related_to", target.strip()))
+    return pairs
+
+
+class EntityGraph:
+    """
+    In-memory entity graph. Names are interned to dense integer ids; name and type lookups are hash
+    lookups and relationships are adjacency lists, so neighbourhood queries never scan every entity.
+    Targets that were never saved themselves become placeholder nodes without a type or description.
+    """
+
+    def __init__(self):
+        self._id_of: Dict[str, int] = {}
+        self.names: List[str] = []
+        self.types: List[Optional[str]] = []
+        self.descriptions: List[Optional[str]] = []
+        self.values: List[Optional[str]] = []  # The stored "name(type): description" text
+        self._by_type: Dict[str, Set[int]] = {}
+        # id -> {neighbour id: {(relation, outgoing)}}; every edge is stored from both ends
+        self._edges: List[Dict[int, Set[Tuple[str, bool]]]] = []
+        self._max_name_tokens = 1
+
+    def intern(self, name: str) -> int:
+        """Returns the id for a name, creating a placeholder node the first time it is seen."""
+        key = normalize_name(name)
+        if not key:
+            raise ValueError("Entity name must contain at least one word character.")
+        entity_id = self._id_of.get(key)
+        if entity_id is None:
+            entity_id = len(self.names)
+            self._id_of[key] = entity_id
+            self.names.append(name.strip())
+            self.types.append(None)
+            self.descriptions.append(None)
+            self.values.append(None)
+            self._edges.append({})
+            self._max_name_tokens = max(self._max_name_tokens, len(key.split()))
+        return entity_id
+
+    def add_entity(self, name: str, type: Optional[str] = None, description: Optional[str] = None, value: Optional[str] = None) -> int:
+        """Adds or updates an entity; the latest type and description win."""
+        entity_id = self.intern(name)
+        old_type = self.types[entity_id]
+        if old_type is not None and old_type != type:
+            self._by_type[old_type.lower()].discard(entity_id)
+        if type is not None:
+            self._by_type.setdefault(type.lower(), set()).add(entity_id)
+        self.types[entity_id] = type
+        self.descriptions[entity_id] = description
+        self.values[entity_id] = value
+        return entity_id
+
+    def add_relationship(self, source: str, relation: str, target: str) -> None:
+        source_id, target_id = self.intern(source), self.intern(target)
+        if source_id == target_id:
+            return
+        self._edges[source_id].setdefault(target_id, set()).add((relation, True))
+        self._edges[target_id].setdefault(source_id, set()).add((relation, False))
+
+    def clear(self) -> None:
+        self.__init__()
+
+    def _describe(self, entity_id: int, hops: int = 0) -> Dict[str, Any]:
+        return {
+            "name": self.names[entity_id],
+            "type": self.types[entity_id],
+            "description": self.descriptions[entity_id],
+            "value": self.values[entity_id],
+            "relationships": [
+                {"relation": relation, "direction": "out" if outgoing else "in", "entity": self.names[neighbour]}
+                for neighbour, relations in self._edges[entity_id].items()
+                for relation, outgoing in sorted(relations)
+            ],
+            "hops": hops,
+        }
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        """O(1) lookup by name."""
+        entity_id = self._id_of.get(normalize_name(name))
+        return None if entity_id is None else self._describe(entity_id)
+
+    def get_many(self, names: Iterable[str]) -> List[Dict[str, Any]]:
+        """Batch lookup; unknown names are skipped."""
+        found = (self._id_of.get(normalize_name(name)) for name in names)
+        return [self._describe(entity_id) for entity_id in dict.fromkeys(found) if entity_id is not None]
+
+    def by_type(self, type: str) -> List[Dict[str, Any]]:
+        return [self._describe(entity_id) for entity_id in sorted(self._by_type.get(type.lower(), ()))]
+
+    def mentions(self, text: str) -> List[int]:
+        """Ids of entities whose names occur in the text, via hash lookups on its word n-grams."""
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        found = {}
+        for start in range(len(tokens)):
+            for length in range(1, min(self._max_name_tokens, len(tokens) - start) + 1):
+                entity_id = self._id_of.get(" ".join(tokens[start:start + length]))
+                if entity_id is not None:
+                    found.setdefault(entity_id, None)
+        return list(found)
+
+    def neighbourhood(
+        self,
+        seeds: Iterable[int],
+        hops: int = 1,
+        relation: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Tuple[int, int]]:
+        """Breadth-first k-hop expansion: (entity id, hop distance) pairs, seeds first."""
+        distance: Dict[int, int] = {}
+        queue = deque()
+        for seed in seeds:
+            if seed not in distance:
+                distance[seed] = 0
+                queue.append(seed)
+        while queue and (limit is None or len(distance) < limit):
+            current = queue.popleft()
+            if distance[current] >= hops:
+                continue
+            for neighbour, relations in self._edges[current].items():
+                if neighbour in distance or (relation is not None and all(label != relation for label, _ in relations)):
+                    continue
+                distance[neighbour] = distance[current] + 1
+                queue.append(neighbour)
+                if limit is not None and len(distance) >= limit:
+                    break
+        return list(distance.items())
+
+    def related(self, text: str, hops: int = 1, relation: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Entities mentioned in the text plus everything within `hops` relationships of them."""
+        return [
+            self._describe(entity_id, hops=distance)
+            for entity_id, distance in self.neighbourhood(self.mentions(text), hops, relation, limit)
+        ]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return normalize_name(name) in self._id_of
@@ -1,7 +1,12 @@
 # memory/entity_memory.py
 
-from memory.storage.memgpt_storage import MemGPTStorage
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+import numpy as np
+from memory.entity_graph import EntityGraph, parse_relationships
 from memory.persistence import PersistenceManager
+from memory.storage.memory_store import MemoryStore
 
 class EntityMemoryItem:
     """Represents an item in entity memory."""
@@ -16,38 +21,104 @@ class EntityMemoryItem:
         self.name = name
         self.type = type
         self.description = description
-        self.metadata = {"relationships": relationships}
+        self.metadata = {"relationships": relationships, "name": name, "type": type}
+
+
+# Entries saved before name and type were kept in metadata: "name(type): description"
+ENTITY_VALUE = re.compile(r"^(?P<name>.*?)\((?P<type>[^()]*)\): (?P<description>.*)$", re.DOTALL)
 
 
 class EntityMemory:
     """
     EntityMemory class for managing structured information about entities and their relationships.
+
+    Besides the embedding storage, entities live in an EntityGraph that answers name, type and
+    k-hop relationship queries by direct lookup. The graph is rebuilt from storage after a load.
     """
 
-    def __init__(self, persona: str, human: str, persistence_manager: PersistenceManager):
-        self.persistence_manager = persistence_manager
-        self.storage = MemGPTStorage(persona, human, persistence_manager)
-        self.file_name = 'data/entity_memory.json'
-        self.load_memory()
+    def __init__(self, persona: str, human: str, persistence_manager: PersistenceManager, store: Optional[MemoryStore] = None):
+        if store is None:
+            store = MemoryStore(persistence_manager, persona=persona, human=human)
+            store.load()
+        self.persistence_manager = store.persistence_manager
+        self.storage = store.namespace("entity_memory")
+        self.graph = EntityGraph()
+        # Storage list, version and entry count the graph reflects
+        self._graph_source: Optional[List[Dict[str, Any]]] = None
+        self._graph_version = 0
+        self._graph_entries = 0
+        self._graph_lock = threading.Lock()
 
     def save(self, item: EntityMemoryItem) -> None:
         """Saves an entity item into the storage."""
         data = f"{item.name}({item.type}): {item.description}"
         self.storage.save(data, item.metadata)
-        self.persist_memory()
+        with self._graph_lock:
+            self._sync_graph()
+
+    def _sync_graph(self) -> None:
+        """
+        Adds new storage entries to the graph. Every save bumps the storage version once, so a version
+        that moved further than the entry count means something other than appends happened (a load,
+        reset, delete or edit) and the graph is rebuilt. Caller holds the lock.
+        """
+        with self.storage._lock:
+            entries, version = self.storage.storage, self.storage.version
+            appended = len(entries) - self._graph_entries
+            if entries is not self._graph_source or appended < 0 or version - self._graph_version != appended:
+                self.graph.clear()
+                self._graph_entries = 0
+            for entry in entries[self._graph_entries:]:
+                self._add_to_graph(entry)
+            self._graph_source, self._graph_version, self._graph_entries = entries, version, len(entries)
+
+    def _add_to_graph(self, entry: Dict[str, Any]) -> None:
+        metadata = entry["metadata"]
+        name, type, description = metadata.get("name"), metadata.get("type"), None
+        match = ENTITY_VALUE.match(str(entry["value"]))
+        if match:
+            name = name or match.group("name")
+            type = type or match.group("type")
+            description = match.group("description")
+        if not name:
+            return
+        self.graph.add_entity(name, type=type, description=description, value=entry["value"])
+        for relation, target in parse_relationships(metadata.get("relationships", "")):
+            self.graph.add_relationship(name, relation, target)
+
+    def lookup(self, names: Iterable[str]) -> List[Dict[str, Any]]:
+        """Batch lookup of entities by name."""
+        with self._graph_lock:
+            self._sync_graph()
+            return self.graph.get_many(names)
+
+    def by_type(self, type: str) -> List[Dict[str, Any]]:
+        with self._graph_lock:
+            self._sync_graph()
+            return self.graph.by_type(type)
+
+    def related(self, text: str, hops: int = 1, relation: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Entities named in the text and those within `hops` relationships of them, nearest first."""
+        with self._graph_lock:
+            self._sync_graph()
+            return self.graph.related(text, hops=hops, relation=relation, limit=limit)
 
-    def search(self, query: str):
-        return self.storage.search(query=query)
+    def search(self, query: str, query_embedding: Optional[np.ndarray] = None):
+        return self.storage.search(query=query, query_embedding=query_embedding)
 
     def reset(self) -> None:
         try:
             self.storage.reset()
+            with self._graph_lock:
+                self.graph.clear()
+                self._graph_source = None
+                self._graph_entries = 0
             self.persist_memory()
         except Exception as e:
             raise Exception(f"An error occurred while resetting the entity memory: {e}")
 
     def persist_memory(self) -> None:
-        self.storage.persistence_manager.save(self.file_name)
+        self.storage.persist_memory()
 
     def load_memory(self) -> None:
-        self.storage.persistence_manager.load(self.file_name)
+        self.storage.load_memory()
@@ -1,16 +1,34 @@
 # executor.py
 
-from typing import Dict, List, Any
+import threading
+from typing import Dict, List, Any, Optional
 import numpy as np
 from .embeddings import EmbeddingModel
+from .storage.vector_index import create_index
+from utils.logger import logger
 
 class FunctionExecutor:
-    def __init__(self, core_memory, archival_memory, recall_memory):
+    def __init__(
+        self,
+        core_memory,
+        archival_memory,
+        recall_memory,
+        index_kind: Optional[str] = None,
+        embedding_model: Optional[EmbeddingModel] = None,
+    ):
         from memory.base_memory import BaseMemory
         self.core_memory: BaseMemory = core_memory
         self.archival_memory = archival_memory
         self.recall_memory = recall_memory
-        self.embedding_model = EmbeddingModel()
+        self.embedding_model = embedding_model or EmbeddingModel()
+
+        # Archival entries are indexed by their position in the archival list; the index covers the
+        # list object and ArchivalMemory.version it was built from
+        self.archival_index = create_index(index_kind)
+        self._indexed_archival = None
+        self._indexed_version = None
+        # Background snapshots sync the index too, so index updates are serialised
+        self._archival_lock = threading.RLock()
 
     def execute_function(self, function_call: Dict) -> str:
         """Executes a function call."""
@@ -21,7 +39,10 @@ class FunctionExecutor:
             memory_content = args.get("content", "")
             embedding = self.embedding_model.embed(memory_content)
             print(f"Adding memory: {memory_content}, Embedding: {embedding}")  # Debugging
-            self.archival_memory.append((memory_content, embedding))
+            with self._archival_lock:
+                self._sync_archival_index()
+                self.archival_memory.append((memory_content, embedding))
+                self.archival_index.add([len(self.archival_memory) - 1], embedding.reshape(1, -1))
             print(f"Archival Memory: {self.archival_memory}")  # Debugging
             return "Memory added successfully."
 
@@ -63,12 +84,58 @@ class FunctionExecutor:
     def search_archival_memory(self, query: str, top_k: int) -> List[Dict[str, Any]]:
         """Searches for memories based on semantic similarity."""
         query_embedding = self.embedding_model.embed(query)
-        similarities = [
-            (self.embedding_model.similarity(query_embedding, memory_embedding), memory)
-            for memory, memory_embedding in self.archival_memory
-        ]
-        top_matches = sorted(similarities, key=lambda x: x[0], reverse=True)[:top_k]
-        return [{"text": match[1], "score": match[0]} for match in top_matches]
+        with self._archival_lock:
+            self._sync_archival_index()
+            top_matches = self.archival_index.search(query_embedding, top_k=top_k)
+        return [{"text": self.archival_memory[position][0], "score": score} for position, score in top_matches]
+
+    def _sync_archival_index(self) -> None:
+        """Rebuilds the archival index if the archival list was replaced, reloaded or cleared behind its back."""
+        if self._index_current():
+            return
+
+        self.archival_index.clear()
+        if self.archival_memory:
+            embeddings = np.vstack([embedding for _, embedding in self.archival_memory])
+            self.archival_index.add(range(len(self.archival_memory)), embeddings)
+        self._mark_indexed()
+
+    def _archival_version(self) -> int:
+        # A plain list has no version; only replacement and length changes are detected then
+        return getattr(self.archival_memory, "version", 0)
+
+    def _index_current(self) -> bool:
+        return (
+            self._indexed_archival is self.archival_memory
+            and self._indexed_version == self._archival_version()
+            and len(self.archival_index) == len(self.archival_memory)
+        )
+
+    def _mark_indexed(self) -> None:
+        self._indexed_archival = self.archival_memory
+        self._indexed_version = self._archival_version()
+
+    def save_archival_index(self, path: str) -> None:
+        """Writes the archival index next to the memory files."""
+        if not self.archival_memory:
+            return
+        try:
+            with self._archival_lock:
+                self._sync_archival_index()
+                self.archival_index.save(path)
+        except Exception as e:
+            logger.error(f"Error saving archival index to {path}: {e}")
+
+    def load_archival_index(self, path: str) -> None:
+        """Loads the archival index from disk, falling back to a rebuild if it is missing or stale."""
+        try:
+            if self.archival_index.load(path) and len(self.archival_index) == len(self.archival_memory):
+                self._mark_indexed()
+                return
+        except Exception as e:
+            logger.error(f"Error loading archival index from {path}: {e}")
+        self._indexed_archival = None
+        self._sync_archival_index()
 
     def clear_memory(self, memory_type: str) -> str:
         """Clears specified type of memory."""
@@ -77,6 +144,7 @@ class FunctionExecutor:
             return "Core memory cleared."
         elif memory_type == "archival":
             self.archival_memory.clear()
+            self.archival_index.clear()
             return "Archival memory cleared."
         elif memory_type == "recall":
             self.recall_memory.clear()
@@ -84,5 +152,6 @@ class FunctionExecutor:
         else:
             self.core_memory.memory_modules.clear()
             self.archival_memory.clear()
+            self.archival_index.clear()
             self.recall_memory.clear()
             return "All memory cleared."
\ No newline at end of file
@@ -1,8 +1,9 @@
 # memory/long_term_memory.py
 
-from typing import Any, Dict, Optional, Union
-from memory.storage.memgpt_storage import MemGPTStorage
+from typing import Any, Dict, List, Optional, Union
+import numpy as np
 from memory.persistence import PersistenceManager
+from memory.storage.memory_store import MemoryStore
 
 class LongTermMemoryItem:
     def __init__(self, agent: str, task: str, expected_output: str, datetime: str, quality: Optional[Union[int, float]] = None, metadata: Optional[Dict[str, Any]] = None):
@@ -29,27 +30,55 @@ class LongTermMemory:
     LongTermMemory class for managing persistent data related to execution and performance across sessions.
     """
 
-    def __init__(self, persona: str, human: str, persistence_manager: PersistenceManager):
-        self.persistence_manager = persistence_manager
-        self.storage = MemGPTStorage(persona, human, persistence_manager)
-        self.file_name = 'data/long_term_memory.json'
-        self.load_memory()
+    def __init__(self, persona: str, human: str, persistence_manager: PersistenceManager, store: Optional[MemoryStore] = None):
+        if store is None:
+            store = MemoryStore(persistence_manager, persona=persona, human=human)
+            store.load()
+        self.persistence_manager = store.persistence_manager
+        self.storage = store.namespace("long_term_memory")
 
     def save(self, item: LongTermMemoryItem) -> None:
         metadata = item.metadata
         metadata.update({"agent": item.agent, "expected_output": item.expected_output})
-        self.storage.save(value=item.task, metadata=metadata)
-        self.persist_memory()
+        self.storage.save(value=item.task, metadata=metadata, created_at=item.datetime or None)
+
+    def save_batch(self, items: List[LongTermMemoryItem], embeddings: Optional[List[np.ndarray]] = None) -> None:
+        """
+        Saves several items with one batched embedding call, or none when embeddings are given.
+        Items keep their `datetime` as the entry's creation time, so recency ranking sees their real age.
+        """
+        metadatas = []
+        for item in items:
+            metadata = item.metadata
+            metadata.update({"agent": item.agent, "expected_output": item.expected_output})
+            metadatas.append(metadata)
+        self.storage.save_batch(
+            [item.task for item in items], metadatas, embeddings=embeddings, created_at=[item.datetime or None for item in items]
+        )
 
-    def search(self, task: str, latest_n: int = 3) -> Dict[str, Any]:
-        return self.storage.search(task)
+    def search(
+        self,
+        task: str,
+        latest_n: int = 3,
+        query_embedding: Optional[np.ndarray] = None,
+        window: Optional[float] = None,
+        max_candidates: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Returns the latest_n most relevant entries, favouring recent ones. Only the newest `max_candidates`
+        entries (default MEMGPT_RECENT_MAX_CANDIDATES=1000) from the last `window` seconds are scored, so cost
+        does not grow with history; older entries are not returned at all, so raise the cap to search deeper.
+        """
+        return self.storage.search_recent(
+            task, top_k=latest_n, window=window, max_candidates=max_candidates, query_embedding=query_embedding
+        )
 
     def reset(self) -> None:
         self.storage.reset()
         self.persist_memory()
 
     def persist_memory(self) -> None:
-        self.storage.persistence_manager.save(self.file_name)
+        self.storage.persist_memory()
 
     def load_memory(self) -> None:
-        self.storage.persistence_manager.load(self.file_name)
+        self.storage.load_memory()
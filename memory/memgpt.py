@@ -1,4 +1,5 @@
 import os
+from typing import Optional
 from memory.short_term_memory import ShortTermMemory
 from memory.long_term_memory import LongTermMemory
 from memory.entity_memory import EntityMemory
@@ -6,10 +7,13 @@ from memory.embeddings import EmbeddingModel
 from memory.persistence import PersistenceManager
 from memory.contextual_memory import ContextualMemory
 from memory.base_memory import BaseMemory
+from memory.archival_memory import ArchivalMemory
 from memory.messages import RecallMemory
-from memory.executor import FunctionExecutor
-from memory.storage.memgpt_storage import MemGPTStorage
+from memory.storage.memory_store import MemoryStore
+from memory.snapshot import SnapshotService
+from memory.plan_cache import PlanCache
 from utils.logger import logger
+from utils.timing import PhaseTimer
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -18,40 +22,62 @@ load_dotenv()
 class MemGPT:
     """Main MemGPT class integrating memory management and execution."""
 
-    def __init__(self, persona: str, human: str, embedding_model: EmbeddingModel):
+    def __init__(self, persona: str, human: str, embedding_model: EmbeddingModel, data_dir: str = "data"):
+        timer = PhaseTimer()
+
         # Initialize memory components with default structures if loading fails
         self.core_memory = BaseMemory()
-        self.archival_memory = []
+        self.archival_memory = ArchivalMemory()
         self.recall_memory = RecallMemory()
         self.persistence_manager = PersistenceManager(self.core_memory, self.archival_memory, self.recall_memory)
 
+        # One store owns the shared components; each memory type is a namespace in it
+        self.memory_store = MemoryStore(
+            self.persistence_manager, persona=persona, human=human, embedding_model=embedding_model, data_dir=data_dir
+        )
+
         # Initialize short-term, long-term, and entity memory
-        self.short_term_memory = ShortTermMemory(persona, human, self.persistence_manager)
-        self.long_term_memory = LongTermMemory(persona, human, self.persistence_manager)
-        self.entity_memory = EntityMemory(persona, human, self.persistence_manager)
+        with timer.phase("construct"):
+            self._build_memories(persona, human)
+
+        # Load all memory states once, then report where startup time went
+        self.load_all_memories(timer)
+        self.startup_report = timer.report()
+        logger.info(f"MemGPT startup: {timer.summary()}")
+
+        # Saves happen in the background; callers only mark memory as dirty
+        self.snapshots = SnapshotService(self.save_all_memories)
+        self.snapshots.start()
+
+        # Task decompositions, reused for similar requests; loaded on first lookup
+        self.plan_cache = PlanCache(embedding_model, path=os.path.join(data_dir, "plan_cache.json"), on_change=self.mark_dirty)
+
+    def _build_memories(self, persona: str, human: str) -> None:
+        """Creates the memory namespaces without loading them."""
+        self.long_term_memory = LongTermMemory(persona, human, self.persistence_manager, store=self.memory_store)
+        # Entries evicted from STM are promoted to LTM
+        self.short_term_memory = ShortTermMemory(
+            persona, human, self.persistence_manager, store=self.memory_store, ltm=self.long_term_memory
+        )
+        self.entity_memory = EntityMemory(persona, human, self.persistence_manager, store=self.memory_store)
 
         # Contextual memory combines all memory types
         self.contextual_memory = ContextualMemory(self.short_term_memory, self.long_term_memory, self.entity_memory)
 
         # Initialize function executor
-        self.function_executor = FunctionExecutor(self.core_memory, self.archival_memory, self.recall_memory)
+        self.function_executor = self.memory_store.function_executor
 
         # Initialize storage
-        self.storage = MemGPTStorage(persona, human, self.persistence_manager)
-
-        # Load all memory states
-        self.load_all_memories()  # Ensure this is called during initialization
+        self.storage = self.memory_store.namespace("memgpt_storage")
 
-    def load_all_memories(self):
+    def load_all_memories(self, timer: Optional[PhaseTimer] = None):
         """Loads all memory states from respective files."""
         
         # Logging for memory loading
         logger.info("Loading all memory states")
         
-        self.short_term_memory.load_memory()
-        self.long_term_memory.load_memory()
-        self.entity_memory.load_memory()
-        self.storage.load_memory()
+        # The store reads the shared state file once and every namespace's own files once
+        self.memory_store.load(timer)
 
     def save_all_memories(self):
         """Saves all memory states."""
@@ -59,7 +85,26 @@ class MemGPT:
         # Logging for memory saving
         logger.info("Saving all memory states")
         
-        self.short_term_memory.persist_memory()
-        self.long_term_memory.persist_memory()
-        self.entity_memory.persist_memory()
-        self.storage.persist_memory()
+        self.memory_store.save()
+        self.plan_cache.save()
+
+    def stats(self):
+        """Counters for monitoring: STM eviction/promotion, caches, collapsed embedding calls and background snapshots."""
+        return {
+            "short_term_memory": {**self.short_term_memory.stats, "entries": len(self.short_term_memory.storage.entries)},
+            "long_term_memory": {"entries": len(self.long_term_memory.storage.entries)},
+            "context_cache": self.contextual_memory.cache.stats(),
+            "plan_cache": {**self.plan_cache.stats, "plans": len(self.plan_cache)},
+            "embedding_single_flight": self.memory_store.embedding_model.flight.stats(),
+            "snapshots": dict(self.snapshots.stats),
+        }
+
+    def mark_dirty(self):
+        """Schedules a background snapshot; repeated calls before it runs are coalesced."""
+        self.snapshots.mark_dirty()
+
+    def close(self):
+        """Writes any pending snapshot and stops background threads."""
+        self.snapshots.close()
+        self.contextual_memory.close()
+        self.memory_store.close()
@@ -1,7 +1,10 @@
 # messages.py
 
 import datetime
+import threading
 from typing import List, Dict, Optional
+from memory.text_index import NGramIndex
+from memory.time_index import TimeIndex
 
 class Message:
     """Represents a single message in the conversation."""
@@ -34,25 +37,68 @@ class RecallMemory:
     """Stores the history of messages in the conversation."""
 
     def __init__(self):
-        self.messages: List[Message] = []
+        self._messages: List[Message] = []
+        # Built lazily from the message list, so loading a long history stays cheap
+        self._text_index = NGramIndex()
+        self._time_index = TimeIndex()
+        self._indexed = 0
+        # Appends are lock-free list appends; index catch-up and lookups are serialised
+        self._lock = threading.Lock()
+
+    @property
+    def messages(self) -> List[Message]:
+        return self._messages
+
+    @messages.setter
+    def messages(self, messages: List[Message]) -> None:
+        with self._lock:
+            self._messages = messages
+            self._reset_indexes()
+
+    def _reset_indexes(self) -> None:
+        self._text_index.clear()
+        self._time_index.clear()
+        self._indexed = 0
+
+    def _catch_up(self) -> None:
+        """Indexes messages appended since the last query, including direct appends to `messages`."""
+        if self._indexed > len(self._messages):
+            self._reset_indexes()
+        for position in range(self._indexed, len(self._messages)):
+            message = self._messages[position]
+            self._text_index.add(position, message.content)
+            self._time_index.add(position, message.created_at)
+        self._indexed = len(self._messages)
 
     def add_message(self, message: Message) -> None:
         """Adds a message to the recall memory."""
-        self.messages.append(message)
+        self._messages.append(message)
 
     def search_by_text(self, query: str) -> List[Message]:
         """Searches for messages containing the query text."""
-        return [message for message in self.messages if query.lower() in message.content.lower()]
+        with self._lock:
+            self._catch_up()
+            return [self._messages[position] for position in self._text_index.search(query)]
+
+    def search_by_terms(self, query: str) -> List[Message]:
+        """Searches for messages containing every word of the query."""
+        with self._lock:
+            self._catch_up()
+            return [self._messages[position] for position in self._text_index.search_terms(query)]
 
     def search_by_date(self, start_date: datetime.datetime, end_date: datetime.datetime) -> List[Message]:
         """Searches for messages within a date range."""
-        return [message for message in self.messages if start_date <= message.created_at <= end_date]
+        with self._lock:
+            self._catch_up()
+            return [self._messages[position] for position in sorted(self._time_index.range(start_date, end_date))]
 
     def __len__(self):
-        return len(self.messages)
+        return len(self._messages)
 
     def __str__(self):
-        return "\n".join([f"{message.created_at} - {message.role}: {message.content}" for message in self.messages])
+        return "\n".join([f"{message.created_at} - {message.role}: {message.content}" for message in self._messages])
 
     def clear(self):
-        self.messages.clear()
+        with self._lock:
+            self._messages.clear()
+            self._reset_indexes()
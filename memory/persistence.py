@@ -1,44 +1,64 @@
-import json
+import os
 import numpy as np
-import ipdb  # Import ipdb for debugging
 from utils.logger import logger
 from memory.base_memory import BaseMemory
 from memory.messages import RecallMemory, Message
-from typing import List, Tuple
+from memory.storage.vector_file import VectorFile
+from memory.snapshot import read_snapshot, write_snapshot
+from typing import List, Optional, Tuple
 
 class PersistenceManager:
     """Manages the persistence of core, archival, and recall memory."""
 
-    def __init__(self, core_memory: BaseMemory, archival_memory: list, recall_memory: RecallMemory):
+    def __init__(
+        self,
+        core_memory: BaseMemory,
+        archival_memory: list,
+        recall_memory: RecallMemory,
+        generations: Optional[int] = None,
+    ):
         self.core_memory = core_memory
         self.archival_memory = archival_memory 
         self.recall_memory = recall_memory 
+        # Number of snapshot generations kept on disk, the newest included
+        self.generations = generations or int(os.getenv("MEMGPT_SNAPSHOT_GENERATIONS", 3))
+        # ArchivalMemory.version the archival rows on disk were written at; while it matches, the
+        # rows on disk are a prefix of the list and new entries can be appended
+        self._archival_version: Optional[int] = None
 
     def save(self, file_path: str) -> None:
-        """Saves the current memory state to a file."""
+        """Saves the current memory state to a file. Raises if it could not be written, so callers can retry."""
         
         # Debug log for saving data
         logger.debug(f"Preparing to save data to {file_path}")
 
-        # Use ipdb to set a breakpoint
-        #ipdb.set_trace()  # Debug: Check memory state before saving
-        archival_data = [{"memory": memory, "embedding": embedding.tolist()} for memory, embedding in self.archival_memory]
+        archival_file = VectorFile(self._archival_path(file_path))
 
+        # Copy the containers first; saves may run on a background thread while memory keeps changing
+        version = self._current_archival_version()
+        archival = list(self.archival_memory)
         data = {
             "core_memory": self.core_memory.to_dict(),
-            "archival_memory": archival_data,
-            "recall_memory": [message.to_dict() for message in self.recall_memory.messages],
+            "archival_file": os.path.basename(archival_file.base_path),
+            "archival_rows": len(archival),
+            "recall_memory": [message.to_dict() for message in list(self.recall_memory.messages)],
         }
 
-        logger.debug(f"Saving data to {file_path}: {json.dumps(data, indent=4)}")
+        logger.debug(
+            f"Saving data to {file_path}: {len(data['core_memory'])} core modules, "
+            f"{len(archival)} archival entries, {len(data['recall_memory'])} messages"
+        )
         try:
-            with open(file_path, "w") as f:
-                json.dump(data, f)
+            self._save_archival(archival_file, archival, rewrite=version != self._archival_version)
+            self._archival_version = version
+            write_snapshot(file_path, data, self.generations)
             logger.info(f"Successfully saved memory data to {file_path}")
         except IOError as e:
             logger.error(f"IOError saving memory data: {e}")
+            raise
         except Exception as e:
             logger.error(f"Unexpected error saving memory data: {e}")
+            raise
 
     def load(self, file_path: str) -> None:
         """Loads a memory state from a file."""
@@ -47,37 +67,76 @@ class PersistenceManager:
         logger.debug(f"Attempting to load data from {file_path}")
 
         try:
-            with open(file_path, "r") as f:
-                data = json.load(f)
+            data, _ = read_snapshot(file_path, self.generations)
+            if data is None:
+                raise FileNotFoundError(file_path)
 
-            logger.debug(f"Data loaded from {file_path}: {json.dumps(data, indent=4)}")
-
-            self.core_memory = BaseMemory.from_dict(data.get("core_memory", {}))
+            self.core_memory.memory_modules = BaseMemory.from_dict(data.get("core_memory", {})).memory_modules
 
             self.archival_memory.clear()
+
+            # Files written before the binary format keep embeddings inline as JSON lists
             for entry in data.get("archival_memory", []):
                 memory = entry["memory"]
                 embedding = np.array(entry["embedding"], dtype=np.float32)
                 self.archival_memory.append((memory, embedding))
 
+            archival_file = VectorFile(self._archival_path(file_path))
+            if archival_file.exists():
+                vectors, rows = archival_file.load()
+                # An older snapshot generation only covers the rows that existed when it was taken
+                rows = rows[:data.get("archival_rows", len(rows))]
+                self.archival_memory.extend((row["memory"], vectors[i]) for i, row in enumerate(rows))
+            # The file holds these rows (and possibly newer ones, which the next save rewrites away)
+            self._archival_version = self._current_archival_version()
+
             self.recall_memory.messages = [
                 Message.from_dict(message_data) for message_data in data.get("recall_memory", [])
             ]
 
-            logger.info(f"Successfully loaded memory data from {file_path}")
+            logger.info(
+                f"Successfully loaded memory data from {file_path}: {len(self.archival_memory)} archival entries, "
+                f"{len(self.recall_memory)} messages"
+            )
 
         except FileNotFoundError:
             logger.warning(f"Memory file not found at {file_path}. Initializing empty memory.")
-            self.core_memory = BaseMemory()
-            self.archival_memory = []
-            self.recall_memory = RecallMemory()
-        except json.JSONDecodeError:
-            logger.error(f"JSON decoding failed for {file_path}. Initializing empty memory.")
-            self.core_memory = BaseMemory()
-            self.archival_memory = []
-            self.recall_memory = RecallMemory()
+            self._reset_memory()
+        except ValueError as e:
+            logger.error(f"No readable snapshot at {file_path} ({e}). Initializing empty memory.")
+            self._reset_memory()
         except Exception as e:
             logger.error(f"Unexpected error loading memory data from {file_path}: {e}")
-            self.core_memory = BaseMemory()
-            self.archival_memory = []
-            self.recall_memory = RecallMemory()
+            self._reset_memory()
+
+    def _reset_memory(self) -> None:
+        """Empties memory in place so components sharing the memory objects stay in sync."""
+        self.core_memory.memory_modules.clear()
+        self.archival_memory.clear()
+        self.recall_memory.clear()
+        self._archival_version = None  # Whatever is on disk is not a prefix of the empty memory
+
+    def _current_archival_version(self) -> int:
+        # A plain list has no version; only shrinking is detected then
+        return getattr(self.archival_memory, "version", 0)
+
+    @staticmethod
+    def _archival_path(file_path: str) -> str:
+        """Base path of the binary archival store that sits next to a memory file."""
+        return f"{os.path.splitext(file_path)[0]}.archival"
+
+    def _save_archival(self, archival_file: VectorFile, archival: list, rewrite: bool = False) -> None:
+        """
+        Appends archival rows that are not on disk yet. Rewrites everything when the rows on disk are
+        no longer a prefix of the memory: it shrank, or was cleared or reloaded since the last save.
+        """
+        persisted = archival_file.rows
+        if rewrite or persisted > len(archival):
+            archival_file.rewrite(*self._archival_rows(archival))
+        elif persisted < len(archival):
+            archival_file.append(*self._archival_rows(archival[persisted:]))
+
+    @staticmethod
+    def _archival_rows(entries: list) -> Tuple[Optional[np.ndarray], List[dict]]:
+        vectors = np.vstack([embedding for _, embedding in entries]) if entries else None
+        return vectors, [{"memory": memory} for memory, _ in entries]
@@ -0,0 +1,259 @@
+# memory/plan_cache.py
+
+import copy
+import difflib
+import json
+import os
+import re
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from memory.embeddings import EmbeddingModel
+from memory.snapshot import atomic_write
+from memory.storage.embedding_matrix import EmbeddingMatrix
+from utils.logger import logger
+
+# Words, numbers, dates and times as single tokens: "2024-05-01", "10:30", "3.5"
+SLOT_TOKEN = re.compile(r"\w+(?:[-/:.']\w+)*")
+
+
+def plan_key(description: str, context: str = "") -> str:
+    return f"{description}\n{context}".strip()
+
+
+def slot_tokens(text: str, values: Iterable[str] = ()) -> List[Tuple[str, bool]]:
+    """
+    The words of a text, each flagged when it is slot-like: a number, date or time, a proper noun
+    (capitalised other than at the start of a sentence) or one of the given explicit values.
+    """
+    values = set(values)
+    tokens = []
+    for match in SLOT_TOKEN.finditer(text):
+        token = match.group(0)
+        preceding = text[:match.start()].rstrip()
+        sentence_start = not preceding or preceding[-1] in ".!?:\n"
+        slot = (
+            token in values
+            or any(char.isdigit() for char in token)
+            or (token[0].isupper() and not sentence_start)
+        )
+        tokens.append((token, slot))
+    return tokens
+
+
+def slot_bindings(old_text: str, new_text: str, values: Iterable[str] = ()) -> Optional[Dict[str, Optional[str]]]:
+    """
+    Aligns the words of two similar requests and returns old span -> new span for every slot that
+    changed; slots only present in the old text map to None (they cannot be rebound). Returns None
+    when anything other than slots differs: another verb or object is another task, and a slot
+    the old request lacked has nowhere to go in its plan.
+    """
+    values = list(values)
+    old, new = slot_tokens(old_text, values), slot_tokens(new_text, values)
+    bindings: Dict[str, Optional[str]] = {}
+    matcher = difflib.SequenceMatcher(a=[token for token, _ in old], b=[token for token, _ in new], autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        if tag == "insert" or not all(slot for _, slot in old[i1:i2] + new[j1:j2]):
+            return None
+        old_span = " ".join(token for token, _ in old[i1:i2])
+        bindings[old_span] = " ".join(token for token, _ in new[j1:j2]) if tag == "replace" else None
+    return bindings
+
+
+def inferred_values(plan: List[Dict[str, Any]], known: Set[str]) -> Set[str]:
+    """
+    Slot-like values in the plan's sub-task parameters that the request never stated (e.g. an
+    airport code inferred from a city). They would go stale when the request's slots change.
+    """
+    found: Set[str] = set()
+
+    def visit(value: Any) -> None:
+        if isinstance(value, dict):
+            for item in value.values():
+                visit(item)
+        elif isinstance(value, list):
+            for item in value:
+                visit(item)
+        elif isinstance(value, (str, int, float)) and not isinstance(value, bool):
+            for token in SLOT_TOKEN.findall(str(value)):
+                if token not in known and (token[0].isupper() or any(char.isdigit() for char in token)):
+                    found.add(token)
+
+    for task in plan:
+        visit(task.get("input_data", {}))
+    return found
+
+
+def rebind(value: Any, bindings: Dict[str, Optional[str]], pattern: Optional[re.Pattern]) -> Any:
+    """Applies the bindings to every string (and number) in a plan. Raises KeyError on an unbound slot."""
+    if pattern is None:
+        return value
+    if isinstance(value, str):
+        def substitute(match):
+            replacement = bindings[match.group(0)]
+            if replacement is None:
+                raise KeyError(match.group(0))
+            return replacement
+        return pattern.sub(substitute, value)
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        replacement = bindings.get(str(value), str(value))
+        if replacement is None:
+            raise KeyError(str(value))
+        return type(value)(replacement)
+    if isinstance(value, list):
+        return [rebind(item, bindings, pattern) for item in value]
+    if isinstance(value, dict):
+        return {key: rebind(item, bindings, pattern) for key, item in value.items()}
+    return value
+
+
+class PlanCache:
+    """
+    Decompositions of earlier tasks, found again by embedding similarity of description + context.
+    A hit above `threshold` reuses the stored plan with the request's changed slots (input_data
+    values, numbers, dates, proper nouns) rebound into its descriptions, dependencies and input_data.
+    It is a miss when the requests differ in anything else, when a slot cannot be rebound, or when
+    slots changed and the plan carries parameters inferred from the old request.
+    """
+
+    # Fields of a sub-task that carry request-specific values; tools and complexity are kept as-is
+    REBOUND_FIELDS = ("description", "dependencies", "input_data")
+
+    def __init__(
+        self,
+        embedding_model: EmbeddingModel,
+        threshold: Optional[float] = None,
+        max_plans: Optional[int] = None,
+        path: Optional[str] = None,
+        on_change: Optional[Callable[[], None]] = None,
+    ):
+        self.embedding_model = embedding_model
+        self.threshold = threshold if threshold is not None else float(os.getenv("MEMGPT_PLAN_CACHE_THRESHOLD", 0.92))
+        self.max_plans = max_plans or int(os.getenv("MEMGPT_PLAN_CACHE_SIZE", 512))
+        self.path = path
+        self.on_change = on_change
+        self.vectors = EmbeddingMatrix()
+        self.plans: Dict[int, Dict[str, Any]] = {}
+        self._next_id = 0
+        self._loaded = path is None
+        self._lock = threading.RLock()
+        self.stats = {"hits": 0, "misses": 0, "unbound": 0, "stored": 0}
+
+    def _ensure_loaded(self) -> None:
+        """Reads the persisted plans on first use, re-embedding their keys (normally embedding cache hits)."""
+        if self._loaded:
+            return
+        self._loaded = True
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                records = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Ignoring unreadable plan cache {self.path}: {e}")
+            return
+        if records:
+            embeddings = self.embedding_model.embed_batch([plan_key(r["description"], r["context"]) for r in records])
+            for record, embedding in zip(records, embeddings):
+                self._add(record, embedding)
+        logger.info(f"Loaded {len(records)} cached plans from {self.path}")
+
+    def _add(self, record: Dict[str, Any], embedding) -> None:
+        plan_id = self._next_id
+        self._next_id += 1
+        self.vectors.add(plan_id, embedding)
+        self.plans[plan_id] = record
+        while len(self.plans) > self.max_plans:
+            oldest = next(iter(self.plans))
+            self.vectors.remove([oldest])
+            del self.plans[oldest]
+
+    def lookup(self, description: str, context: str = "", input_data: Optional[Dict[str, Any]] = None) -> Optional[List[Dict[str, Any]]]:
+        """Returns a rebound copy of the closest stored plan, or None when there is no usable match."""
+        embedding = self.embedding_model.embed(plan_key(description, context))
+        with self._lock:
+            self._ensure_loaded()
+            matches = self.vectors.search(embedding, top_k=1, threshold=self.threshold)
+            if not matches:
+                self.stats["misses"] += 1
+                return None
+            plan_id, score = matches[0]
+            record = self.plans[plan_id]
+
+            old_text = plan_key(record["description"], record["context"])
+            old_values = {str(value) for value in record.get("input_data", {}).values()}
+            new_values = {str(value) for value in (input_data or {}).values()}
+            bindings = slot_bindings(old_text, plan_key(description, context), old_values | new_values)
+            if bindings is None:
+                logger.debug(f"Plan cache: similar plan ({score:.3f}) is for a different request")
+                self.stats["misses"] += 1
+                return None
+            # Values passed explicitly in input_data bind by key
+            for key, old_value in record.get("input_data", {}).items():
+                new_value = (input_data or {}).get(key)
+                if new_value is not None and new_value != old_value:
+                    bindings[str(old_value)] = str(new_value)
+
+            if bindings:
+                known = {token for token, _ in slot_tokens(old_text)} | old_values
+                inferred = inferred_values(record["plan"], known)
+                if inferred:
+                    logger.debug(f"Plan cache: similar plan ({score:.3f}) has inferred parameters {sorted(inferred)}")
+                    self.stats["unbound"] += 1
+                    self.stats["misses"] += 1
+                    return None
+
+            pattern = None
+            if bindings:
+                spans = sorted(bindings, key=len, reverse=True)
+                pattern = re.compile(r"(?<!\w)(?:" + "|".join(re.escape(span) for span in spans) + r")(?!\w)")
+            try:
+                plan = [
+                    {field: rebind(value, bindings, pattern) if field in self.REBOUND_FIELDS else copy.deepcopy(value)
+                     for field, value in task.items()}
+                    for task in record["plan"]
+                ]
+            except (KeyError, ValueError) as e:
+                logger.debug(f"Plan cache: similar plan ({score:.3f}) has an unbindable slot {e}")
+                self.stats["unbound"] += 1
+                self.stats["misses"] += 1
+                return None
+
+            record["hits"] = record.get("hits", 0) + 1
+            self.stats["hits"] += 1
+            logger.info(f"Plan cache hit ({score:.3f}) for '{description}' from '{record['description']}'")
+            return plan
+
+    def store(self, description: str, context: str, input_data: Optional[Dict[str, Any]], plan: List[Dict[str, Any]]) -> None:
+        """Remembers a freshly produced plan; a plan for the same request replaces the earlier one."""
+        embedding = self.embedding_model.embed(plan_key(description, context))
+        record = {
+            "description": description,
+            "context": context,
+            "input_data": copy.deepcopy(input_data or {}),
+            "plan": copy.deepcopy(plan),
+            "hits": 0,
+        }
+        with self._lock:
+            self._ensure_loaded()
+            for plan_id, _ in self.vectors.search(embedding, top_k=1, threshold=0.999):
+                self.vectors.remove([plan_id])
+                del self.plans[plan_id]
+            self._add(record, embedding)
+            self.stats["stored"] += 1
+        if self.on_change is not None:
+            self.on_change()
+
+    def save(self) -> None:
+        """Writes the plans to `path`, if the cache is persistent and was ever loaded."""
+        if self.path is None or not self._loaded:
+            return
+        with self._lock:
+            payload = json.dumps(list(self.plans.values()), default=str).encode("utf-8")
+        atomic_write(self.path, payload)
+
+    def __len__(self) -> int:
+        return len(self.plans)
@@ -0,0 +1,163 @@
+# memory/sharding.py
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, FrozenSet, Generic, List, Optional, TypeVar
+from utils.logger import logger
+
+DEFAULT_SHARD = "default"
+SHARD_KEY_PATTERN = re.compile(r"[A-Za-z0-9_-][A-Za-z0-9_.-]{0,63}")
+
+T = TypeVar("T")
+
+
+def shard_data_dir(root: str, key: str) -> str:
+    """Directory holding a shard's files; the default shard keeps using the root for existing data."""
+    if key == DEFAULT_SHARD:
+        return root
+    return os.path.join(root, "shards", key)
+
+
+def shard_allowlist() -> Optional[FrozenSet[str]]:
+    """Shard keys allowed by MEMGPT_SHARD_ALLOWLIST (comma separated), or None when any valid key may be opened."""
+    keys = {key.strip() for key in os.getenv("MEMGPT_SHARD_ALLOWLIST", "").split(",") if key.strip()}
+    return frozenset(keys | {DEFAULT_SHARD}) if keys else None
+
+
+class MemoryShards(Generic[T]):
+    """
+    Memory partitioned by session, tenant or agent key. Each shard is built by `factory(key, data_dir)`
+    on first use and owns its own stores, locks and files, so work on different shards never
+    contends. Building a shard only blocks callers of that same key.
+
+    Keys come from clients, so at most `max_open` shards (MEMGPT_MAX_OPEN_SHARDS) stay open: opening
+    another closes the least recently used one that is not leased. Work that must not lose its shard
+    midway holds it with `acquire()` / `release()`. `allowed` (MEMGPT_SHARD_ALLOWLIST) restricts the keys.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[str, str], T],
+        root: str = "data",
+        max_open: Optional[int] = None,
+        allowed: Optional[FrozenSet[str]] = None,
+    ):
+        if max_open is None:
+            max_open = int(os.getenv("MEMGPT_MAX_OPEN_SHARDS", 32))
+        if max_open < 1:
+            raise ValueError("max_open must be at least 1.")
+        self.factory = factory
+        self.root = root
+        self.max_open = max_open
+        self.allowed = shard_allowlist() if allowed is None else allowed
+        self._shards: "OrderedDict[str, T]" = OrderedDict()  # Least recently used first
+        self._leases: Dict[str, int] = {}
+        self._building: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.stats = {"opened": 0, "evicted": 0}
+
+    @staticmethod
+    def validate_key(key: str) -> str:
+        if not SHARD_KEY_PATTERN.fullmatch(key or ""):
+            raise ValueError(f"Invalid shard key '{key}': use 1-64 letters, digits, '_', '-' or '.', not starting with '.'.")
+        return key
+
+    def check_key(self, key: str) -> str:
+        """Validates a key and raises PermissionError when it is not on the allow-list."""
+        self.validate_key(key)
+        if self.allowed is not None and key not in self.allowed:
+            raise PermissionError(f"Shard '{key}' is not allowed.")
+        return key
+
+    def get(self, key: str = DEFAULT_SHARD) -> T:
+        """Returns the shard for a key, building it the first time it is asked for."""
+        return self._open(key, lease=False)
+
+    def acquire(self, key: str = DEFAULT_SHARD) -> T:
+        """Like `get`, but the shard is not evicted until the matching `release()`."""
+        return self._open(key, lease=True)
+
+    def release(self, key: str) -> None:
+        """Ends a lease from `acquire()`, closing shards left over the limit while it was held."""
+        with self._lock:
+            remaining = self._leases.get(key, 0) - 1
+            if remaining > 0:
+                self._leases[key] = remaining
+            else:
+                self._leases.pop(key, None)
+        self._evict()
+
+    def _open(self, key: str, lease: bool) -> T:
+        with self._lock:
+            shard = self._shards.get(key)
+            if shard is not None:
+                self._shards.move_to_end(key)
+                if lease:
+                    self._leases[key] = self._leases.get(key, 0) + 1
+                return shard
+
+        self.check_key(key)
+        with self._lock:
+            building = self._building.setdefault(key, threading.Lock())
+        with building:
+            with self._lock:
+                shard = self._shards.get(key)
+            built = shard is None
+            if built:
+                shard = self.factory(key, shard_data_dir(self.root, key))
+                logger.info(f"Opened memory shard '{key}'")
+            with self._lock:
+                self._shards[key] = shard
+                self._shards.move_to_end(key)
+                if lease:
+                    self._leases[key] = self._leases.get(key, 0) + 1
+                if built:
+                    self.stats["opened"] += 1
+        self._evict(keep=key)
+        return shard
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        """Closes least recently used, unleased shards until at most `max_open` remain."""
+        while True:
+            with self._lock:
+                if len(self._shards) <= self.max_open:
+                    return
+                victim = next((key for key in self._shards if key != keep and key not in self._leases), None)
+                if victim is None:
+                    return  # Everything is in use; the next release evicts
+                shard = self._shards.pop(victim)
+                self._building.pop(victim, None)
+                self.stats["evicted"] += 1
+            logger.info(f"Evicting memory shard '{victim}' ({self.max_open} open at most)")
+            shard.close()
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return list(self._shards)
+
+    def items(self) -> List[Any]:
+        with self._lock:
+            return list(self._shards.items())
+
+    def close(self, key: str) -> bool:
+        """Closes and forgets one shard. Returns False when it was not open."""
+        with self._lock:
+            shard = self._shards.pop(key, None)
+            self._building.pop(key, None)
+            self._leases.pop(key, None)
+        if shard is None:
+            return False
+        shard.close()
+        return True
+
+    def close_all(self) -> None:
+        for key in self.keys():
+            self.close(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._shards
+
+    def __len__(self) -> int:
+        return len(self._shards)
@@ -1,8 +1,16 @@
 # memory/short_term_memory.py
 
-from typing import Any, Optional, Dict
-from memory.storage.memgpt_storage import MemGPTStorage
+import heapq
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Optional, Dict, List, Tuple
 from memory.persistence import PersistenceManager
+from memory.storage.memory_store import MemoryStore
+from memory.long_term_memory import LongTermMemory, LongTermMemoryItem
+from utils.logger import logger
+import numpy as np
 import os 
 
 class ShortTermMemoryItem:
@@ -19,16 +27,49 @@ class ShortTermMemoryItem:
         self.metadata = metadata if metadata is not None else {}
 
 
+EVICTION_POLICIES = ("lru", "ttl", "score")
+
+
 class ShortTermMemory:
     """
     ShortTermMemory class for managing transient data related to immediate tasks
     and interactions.
+
+    STM is bounded: entries older than `ttl` seconds expire, and once more than `capacity`
+    entries exist the policy picks victims ("lru": least recently saved or retrieved,
+    "ttl": oldest first, "score": fewest retrievals weighted by age). Victims are promoted to
+    long-term memory in batches, reusing their embeddings, instead of being dropped.
     """
 
-    def __init__(self, persona: str, human: str, persistence_manager: PersistenceManager):
-        self.storage = MemGPTStorage(persona, human, persistence_manager)
-        self.file_name = 'data/short_term_memory.json'
-        self.load_memory()
+    def __init__(
+        self,
+        persona: str,
+        human: str,
+        persistence_manager: PersistenceManager,
+        store: Optional[MemoryStore] = None,
+        ltm: Optional[LongTermMemory] = None,
+        capacity: Optional[int] = None,
+        ttl: Optional[float] = None,
+        policy: Optional[str] = None,
+        batch_size: Optional[int] = None,
+    ):
+        if store is None:
+            store = MemoryStore(persistence_manager, persona=persona, human=human)
+            store.load()
+        self.storage = store.namespace("short_term_memory")
+        self.ltm = ltm
+        self.capacity = capacity if capacity is not None else int(os.getenv("MEMGPT_STM_CAPACITY", 1000))
+        self.ttl = ttl if ttl is not None else float(os.getenv("MEMGPT_STM_TTL", 0)) or None
+        self.policy = policy or os.getenv("MEMGPT_STM_POLICY", "lru")
+        if self.policy not in EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy '{self.policy}'. Expected one of {EVICTION_POLICIES}.")
+        # Evictions and promotions happen this many entries at a time so snapshot rewrites stay rare
+        self.batch_size = max(1, batch_size if batch_size is not None else int(os.getenv("MEMGPT_STM_BATCH_SIZE", 32)))
+        self.stats = {"evicted_capacity": 0, "evicted_ttl": 0, "promoted": 0, "dropped": 0}
+
+        # Entry id -> (last access, retrievals), least recently used first
+        self._access: "OrderedDict[int, Tuple[float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
 
     def save(
         self,
@@ -37,22 +78,117 @@ class ShortTermMemory:
         agent: Optional[str] = None,
     ) -> None:
         item = ShortTermMemoryItem(data=value, metadata=metadata, agent=agent)
-        self.storage.save(value=item.data, metadata=item.metadata)
-        self.persist_memory()
+        entry_id = self.storage.save(value=item.data, metadata=item.metadata)
+        with self._lock:
+            self._sync_access()
+            self._access[entry_id] = (time.time(), 0)
+        self.evict()
+
+    def search(self, query: str, query_embedding: Optional[np.ndarray] = None):
+        self.evict()
+        results = self.storage.search(query=query, query_embedding=query_embedding)
+        self.touch([result.get("id") for result in results])
+        return results
+
+    def touch(self, entry_ids: List[int]) -> None:
+        """Records a retrieval of these entries for the eviction policy, e.g. when served from a cache."""
+        now = time.time()
+        with self._lock:
+            for entry_id in entry_ids:
+                if entry_id in self._access:
+                    _, retrievals = self._access.pop(entry_id)
+                    self._access[entry_id] = (now, retrievals + 1)
 
-    def search(self, query: str):
-        return self.storage.search(query=query)
+    def _sync_access(self) -> None:
+        """Starts tracking entries loaded from disk, oldest first. Caller holds the lock."""
+        entries = self.storage.entries
+        if len(self._access) == len(entries):
+            return
+        for entry_id in [entry_id for entry_id in self._access if entry_id not in entries]:
+            del self._access[entry_id]
+        for entry_id in sorted(set(entries) - set(self._access)):
+            self._access[entry_id] = (self._created_at(entries[entry_id]), 0)
+
+    @staticmethod
+    def _created_at(entry: Dict[str, Any]) -> float:
+        created_at = entry.get("created_at")
+        return datetime.fromisoformat(created_at).timestamp() if created_at else time.time()
+
+    def _expired(self, now: float) -> List[int]:
+        if not self.ttl:
+            return []
+        cutoff = datetime.fromtimestamp(now - self.ttl)
+        return [entry["id"] for entry in self.storage.search_by_date(datetime.min.isoformat(), cutoff.isoformat())]
+
+    def _victims(self, count: int, exclude: set, now: float) -> List[int]:
+        """Picks `count` entries to evict according to the policy."""
+        candidates = [entry_id for entry_id in self._access if entry_id not in exclude]
+        if self.policy == "lru":
+            return candidates[:count]
+
+        entries = self.storage.entries
+        if self.policy == "ttl":
+            key = lambda entry_id: self._created_at(entries[entry_id])
+        else:
+            # Retrievals per hour of age, so frequently useful entries survive longer
+            key = lambda entry_id: (1 + self._access[entry_id][1]) / (1 + (now - self._created_at(entries[entry_id])) / 3600)
+        return heapq.nsmallest(count, candidates, key=key)
+
+    def evict(self) -> int:
+        """Expires old entries and trims STM back under capacity. Returns the number evicted."""
+        now = time.time()
+        with self._lock:
+            self._sync_access()
+            expired = self._expired(now)
+            overflow = len(self._access) - len(expired) - self.capacity
+            if overflow > 0:
+                # Evict a whole batch at a time, but never more than a quarter of a small STM
+                overflow = max(overflow, min(self.batch_size, max(1, self.capacity // 4)))
+            over_capacity = self._victims(overflow, set(expired), now) if overflow > 0 else []
+            if not expired and not over_capacity:
+                return 0
+
+            victims = expired + over_capacity
+            self._promote(victims)
+            self.storage.delete(victims)
+            for entry_id in victims:
+                self._access.pop(entry_id, None)
+            self.stats["evicted_ttl"] += len(expired)
+            self.stats["evicted_capacity"] += len(over_capacity)
+        logger.debug(f"Evicted {len(victims)} short-term memory entries")
+        return len(victims)
+
+    def _promote(self, entry_ids: List[int]) -> None:
+        """Consolidates evicted entries into long-term memory in one batch, reusing their embeddings."""
+        if self.ltm is None:
+            self.stats["dropped"] += len(entry_ids)
+            return
+        entries = [self.storage.entries[entry_id] for entry_id in entry_ids]
+        embeddings = list(self.storage.get_embeddings(entry_ids))
+        items = [
+            LongTermMemoryItem(
+                agent=entry["metadata"].get("agent", ""),
+                task=entry["value"],
+                expected_output=str(entry["metadata"].get("result", "")),
+                datetime=entry.get("created_at", ""),
+                metadata={**entry["metadata"], "source": "short_term_memory"},
+            )
+            for entry in entries
+        ]
+        self.ltm.save_batch(items, embeddings=embeddings)
+        self.stats["promoted"] += len(items)
 
     def reset(self) -> None:
         try:
             self.storage.reset()
+            with self._lock:
+                self._access.clear()
             self.persist_memory()
         except Exception as e:
             raise Exception(f"An error occurred while resetting the short-term memory: {e}")
 
     def persist_memory(self) -> None:
-        self.storage.persistence_manager.save(os.path.join("data", self.file_name))
+        self.storage.persist_memory()
 
     def load_memory(self) -> None:
-        self.storage.persistence_manager.load(os.path.join("data", self.file_name))
-
+        self.storage.load_memory()
@@ -0,0 +1,187 @@
+# memory/snapshot.py
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+from utils.logger import logger
+
+SNAPSHOT_FORMAT = "memgpt-snapshot"
+
+
+def atomic_write(path: str, payload: bytes) -> None:
+    """Writes a file via a fsynced temp file and an atomic rename, so readers never see a partial file."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+    # Persist the rename itself; not every platform lets a directory be opened
+    try:
+        dir_fd = os.open(directory or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+def _canonical(data: Dict[str, Any]) -> bytes:
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def generation_paths(path: str, generations: int):
+    """The current snapshot first, then older generations `<path>.1`, `<path>.2`, ..."""
+    return [path] + [f"{path}.{generation}" for generation in range(1, generations)]
+
+
+def write_snapshot(path: str, data: Dict[str, Any], generations: int = 3) -> None:
+    """
+    Writes a checksummed snapshot and keeps the previous `generations - 1` snapshots next to it.
+    The new file is fully on disk before any older generation is rotated.
+    """
+    payload = _canonical(data)
+    envelope = {
+        "format": SNAPSHOT_FORMAT,
+        "version": 1,
+        "checksum": hashlib.sha256(payload).hexdigest(),
+        "data": data,
+    }
+    tmp_path = f"{path}.new"
+    atomic_write(tmp_path, _canonical(envelope))
+
+    paths = generation_paths(path, max(1, generations))
+    for older, newer in zip(reversed(paths[1:]), reversed(paths[:-1])):
+        if os.path.exists(newer):
+            os.replace(newer, older)
+    os.replace(tmp_path, path)
+
+
+def _read_one(path: str) -> Dict[str, Any]:
+    with open(path, "r") as f:
+        content = json.load(f)
+    if not isinstance(content, dict) or content.get("format") != SNAPSHOT_FORMAT:
+        # Files written before snapshots were checksummed hold the state directly
+        return content
+
+    data = content.get("data")
+    if hashlib.sha256(_canonical(data)).hexdigest() != content.get("checksum"):
+        raise ValueError("checksum mismatch")
+    return data
+
+
+def read_snapshot(path: str, generations: int = 3) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Returns the newest snapshot that parses and passes its checksum, with the path it came from.
+    Returns (None, None) when no generation exists; raises ValueError when all of them are damaged.
+    """
+    found = False
+    for candidate in generation_paths(path, max(1, generations)):
+        if not os.path.exists(candidate):
+            continue
+        found = True
+        try:
+            data = _read_one(candidate)
+        except ValueError as e:
+            logger.error(f"Snapshot {candidate} is damaged ({e}); trying an older generation.")
+            continue
+        if candidate != path:
+            logger.warning(f"Recovered memory state from older snapshot {candidate}")
+        return data, candidate
+
+    if found:
+        raise ValueError(f"Every snapshot generation of {path} is damaged.")
+    return None, None
+
+
+class SnapshotService:
+    """
+    Saves memory state from a background thread. Writers call `mark_dirty()`; marks that arrive
+    while a save is pending or running collapse into a single save, and saves are spaced at least
+    `interval` seconds apart. `close()` writes any outstanding changes before returning.
+    """
+
+    def __init__(self, save: Callable[[], None], interval: Optional[float] = None):
+        if interval is None:
+            interval = float(os.getenv("MEMGPT_SNAPSHOT_INTERVAL", 2.0))
+        self.save = save
+        self.interval = interval
+        self.stats: Dict[str, float] = {"marks": 0, "snapshots": 0, "failures": 0, "last_snapshot_ms": 0.0}
+        self._dirty = False
+        self._state_lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._last_snapshot = 0.0
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="memgpt-snapshot", daemon=True)
+        self._thread.start()
+
+    def mark_dirty(self) -> None:
+        """Records that memory changed; returns immediately."""
+        with self._state_lock:
+            self._dirty = True
+            self.stats["marks"] += 1
+        self._wake.set()
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait()
+            self._wake.clear()
+            # Let further marks pile up until the interval since the last snapshot has passed
+            if self._stop.wait(max(0.0, self._last_snapshot + self.interval - time.monotonic())):
+                break
+            self.flush()
+
+    def flush(self) -> bool:
+        """Saves now if anything is dirty. Returns True when a snapshot was written."""
+        with self._save_lock:
+            with self._state_lock:
+                if not self._dirty:
+                    return False
+                self._dirty = False
+
+            started = time.perf_counter()
+            try:
+                self.save()
+            except Exception as e:
+                logger.error(f"Background snapshot failed: {e}")
+                with self._state_lock:
+                    self._dirty = True
+                    self.stats["failures"] += 1
+                self._last_snapshot = time.monotonic()
+                self._wake.set()  # Retry after the interval
+                return False
+
+            self._last_snapshot = time.monotonic()
+            self.stats["snapshots"] += 1
+            self.stats["last_snapshot_ms"] = (time.perf_counter() - started) * 1000
+            return True
+
+    def close(self) -> None:
+        """Stops the background thread and writes anything still dirty."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
@@ -1,4 +1,6 @@
 # memory/storage/__init__.py
 
 from .interface import Storage
-from .memgpt_storage import MemGPTStorage
\ No newline at end of file
+from .embedding_matrix import EmbeddingMatrix
+from .vector_index import VectorIndex, ExactIndex, FaissIndex, create_index
+from .memgpt_storage import MemGPTStorage
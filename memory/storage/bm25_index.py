@@ -0,0 +1,95 @@
+# memory/storage/bm25_index.py
+
+import math
+from typing import Dict, List, Optional, Tuple
+from memory.text_index import TOKEN_PATTERN
+
+
+class BM25Index:
+    """Okapi BM25 over word tokens, maintained incrementally; a query only touches its terms' postings."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[int, int]] = {}  # term -> {doc id: term frequency}
+        self._doc_terms: Dict[int, Dict[str, int]] = {}
+        self._doc_lengths: Dict[int, int] = {}
+        self._total_length = 0
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        return TOKEN_PATTERN.findall(text.lower())
+
+    def add(self, doc_id: int, text: str) -> None:
+        """Indexes a document, replacing any earlier text stored under the same id."""
+        if doc_id in self._doc_terms:
+            self.remove(doc_id)
+        tokens = self.tokenize(text)
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for term, count in counts.items():
+            self._postings.setdefault(term, {})[doc_id] = count
+        self._doc_terms[doc_id] = counts
+        self._doc_lengths[doc_id] = len(tokens)
+        self._total_length += len(tokens)
+
+    def remove(self, doc_id: int) -> None:
+        counts = self._doc_terms.pop(doc_id, None)
+        if counts is None:
+            return
+        for term in counts:
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(doc_id)
+
+    def clear(self) -> None:
+        self._postings.clear()
+        self._doc_terms.clear()
+        self._doc_lengths.clear()
+        self._total_length = 0
+
+    def idf(self, term: str) -> float:
+        documents = len(self._doc_terms)
+        frequency = len(self._postings.get(term, ()))
+        return math.log(1 + (documents - frequency + 0.5) / (frequency + 0.5))
+
+    def search(self, query: str, top_k: Optional[int] = None, min_coverage: float = 0.0) -> List[Tuple[int, float]]:
+        """
+        (doc id, BM25 score) pairs for documents sharing at least one term with the query, best first.
+        Documents covering less than min_coverage of the query's IDF mass are dropped.
+        """
+        terms = set(self.tokenize(query))
+        if not terms or not self._doc_terms:
+            return []
+
+        average_length = self._total_length / len(self._doc_terms) or 1.0
+        idfs = {term: self.idf(term) for term in terms}
+        total_idf = sum(idfs.values())
+        scores: Dict[int, float] = {}
+        matched: Dict[int, float] = {}
+        for term, idf in idfs.items():
+            for doc_id, frequency in self._postings.get(term, {}).items():
+                norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / average_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+                matched[doc_id] = matched.get(doc_id, 0.0) + idf
+
+        ranked = sorted(
+            ((doc_id, score) for doc_id, score in scores.items() if matched[doc_id] >= min_coverage * total_idf),
+            key=lambda item: (-item[1], item[0]),
+        )
+        return ranked if top_k is None else ranked[:top_k]
+
+    def coverage(self, query: str, doc_id: int) -> float:
+        """Share of the query's IDF mass whose terms occur in the document, from 0 to 1."""
+        terms = set(self.tokenize(query))
+        total = sum(self.idf(term) for term in terms)
+        if total == 0:
+            return 0.0
+        doc_terms = self._doc_terms.get(doc_id, {})
+        return sum(self.idf(term) for term in terms if term in doc_terms) / total
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
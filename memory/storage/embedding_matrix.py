@@ -0,0 +1,210 @@
+# memory/storage/embedding_matrix.py
+
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+
+class EmbeddingMatrix:
+    """
+    Growable float32 matrix of L2-normalised embeddings keyed by entry id.
+
+    Writers must be serialised by the caller; readers need no lock. Every mutation ends by
+    publishing an immutable (data, ids, size, row_of) view in a single assignment, appends only
+    write rows past the published size, and removals copy instead of moving rows in place, so a
+    search always scores a consistent snapshot while another thread writes.
+    """
+
+    def __init__(self, dim: Optional[int] = None, initial_capacity: int = 64, growth_factor: float = 2.0):
+        if growth_factor <= 1.0:
+            raise ValueError("growth_factor must be greater than 1.0")
+        self.dim = dim
+        self.initial_capacity = max(1, initial_capacity)
+        self.growth_factor = growth_factor
+        self._data: Optional[np.ndarray] = None
+        self._ids = np.empty(0, dtype=np.int64)
+        self._size = 0
+        self._row_of: Dict[int, int] = {}
+        self._view: Tuple[Optional[np.ndarray], np.ndarray, int, Dict[int, int]] = (None, self._ids, 0, self._row_of)
+
+    def _publish(self) -> None:
+        self._view = (self._data, self._ids, self._size, self._row_of)
+
+    @staticmethod
+    def normalize(vectors: np.ndarray) -> np.ndarray:
+        """Returns a float32 copy of the vectors scaled to unit length."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _reserve(self, required: int) -> None:
+        """Grows the backing buffers geometrically so appends stay amortised O(1)."""
+        capacity = 0 if self._data is None else self._data.shape[0]
+        if required <= capacity:
+            return
+
+        new_capacity = max(self.initial_capacity, capacity)
+        while new_capacity < required:
+            new_capacity = int(new_capacity * self.growth_factor) + 1
+
+        data = np.empty((new_capacity, self.dim), dtype=np.float32)
+        ids = np.empty(new_capacity, dtype=np.int64)
+        if self._size:
+            data[:self._size] = self._data[:self._size]
+            ids[:self._size] = self._ids[:self._size]
+        self._data = data
+        self._ids = ids
+
+    def add(self, entry_id: int, embedding: np.ndarray) -> None:
+        """Adds a single embedding under the given entry id."""
+        self.add_batch([entry_id], np.asarray(embedding, dtype=np.float32).reshape(1, -1))
+
+    def add_batch(self, entry_ids: Iterable[int], embeddings: np.ndarray) -> None:
+        """Adds several embeddings at once; rows must line up with entry_ids."""
+        entry_ids = [int(entry_id) for entry_id in entry_ids]
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if embeddings.ndim != 2 or embeddings.shape[0] != len(entry_ids):
+            raise ValueError("Embeddings must be a 2-D array with one row per entry id.")
+        if not entry_ids:
+            return
+
+        if self.dim is None:
+            self.dim = embeddings.shape[1]
+        elif embeddings.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension {embeddings.shape[1]} does not match matrix dimension {self.dim}.")
+
+        for entry_id in entry_ids:
+            if entry_id in self._row_of:
+                raise ValueError(f"Entry id {entry_id} is already present in the matrix.")
+
+        self._reserve(self._size + len(entry_ids))
+        start, end = self._size, self._size + len(entry_ids)
+        self._data[start:end] = self.normalize(embeddings)
+        self._ids[start:end] = entry_ids
+        for offset, entry_id in enumerate(entry_ids):
+            self._row_of[entry_id] = start + offset
+        self._size = end
+        self._publish()
+
+    def adopt(self, entry_ids: Iterable[int], vectors: np.ndarray) -> None:
+        """
+        Replaces the contents with already-normalised vectors without copying them, e.g. a
+        memory-mapped file. The buffer is only copied once the matrix needs to grow.
+        """
+        entry_ids = np.asarray(list(entry_ids), dtype=np.int64)
+        if vectors.ndim != 2 or vectors.shape[0] != entry_ids.size:
+            raise ValueError("Vectors must be a 2-D array with one row per entry id.")
+        self.dim = vectors.shape[1]
+        self._data = vectors
+        self._ids = entry_ids
+        self._size = entry_ids.size
+        self._row_of = {int(entry_id): row for row, entry_id in enumerate(entry_ids.tolist())}
+        self._publish()
+
+    def remove(self, entry_ids: Iterable[int]) -> int:
+        """
+        Removes embeddings by entry id, filling each hole with the last row. Returns the count removed.
+        Rows are rearranged in fresh buffers so concurrent readers keep their snapshot.
+        """
+        doomed = [int(entry_id) for entry_id in entry_ids if int(entry_id) in self._row_of]
+        if not doomed:
+            return 0
+
+        data = self._data[:self._size].copy()
+        ids = self._ids[:self._size].copy()
+        row_of = dict(self._row_of)
+        size = self._size
+        for entry_id in dict.fromkeys(doomed):
+            row = row_of.pop(entry_id)
+            last = size - 1
+            if row != last:
+                moved_id = int(ids[last])
+                data[row] = data[last]
+                ids[row] = moved_id
+                row_of[moved_id] = row
+            size = last
+        self._data, self._ids, self._size, self._row_of = data, ids, size, row_of
+        self._publish()
+        return len(set(doomed))
+
+    def get(self, entry_id: int) -> np.ndarray:
+        """Returns the normalised embedding stored for an entry id."""
+        data, _, size, row_of = self._view
+        row = row_of.get(int(entry_id))
+        if row is None or row >= size:
+            raise KeyError(f"Entry id {entry_id} not found in the matrix.")
+        return data[row]
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """View of the populated rows."""
+        data, _, size, _ = self._view
+        if data is None:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return data[:size]
+
+    @property
+    def ids(self) -> np.ndarray:
+        """View of the entry ids, aligned with `vectors`."""
+        _, ids, size, _ = self._view
+        return ids[:size]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the populated rows."""
+        return self.vectors.nbytes
+
+    def search(
+        self,
+        query: np.ndarray,
+        top_k: Optional[int] = None,
+        threshold: Optional[float] = None,
+        entry_ids: Optional[Iterable[int]] = None,
+    ) -> List[Tuple[int, float]]:
+        """
+        Scores every row against the query with one matrix-vector product and returns
+        (entry_id, cosine score) pairs, best first. Scores must be strictly above the threshold.
+        When entry_ids is given only those rows are scored.
+        """
+        data, all_ids, size, row_of = self._view
+        if size == 0 or top_k == 0:
+            return []
+
+        query = self.normalize(query).reshape(-1)
+        if entry_ids is None:
+            ids = all_ids[:size]
+            scores = data[:size] @ query
+        else:
+            found = (row_of.get(int(entry_id)) for entry_id in entry_ids)
+            rows = np.fromiter((row for row in found if row is not None and row < size), dtype=np.int64)
+            if rows.size == 0:
+                return []
+            ids = all_ids[rows]
+            scores = data[rows] @ query
+
+        if threshold is not None:
+            keep = np.flatnonzero(scores > threshold)
+            ids, scores = ids[keep], scores[keep]
+
+        if top_k is not None and top_k < scores.size:
+            # Partial sort: only the top_k candidates get fully ordered
+            candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            candidates = np.arange(scores.size)
+        order = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(ids[i]), float(scores[i])) for i in order]
+
+    def clear(self) -> None:
+        """Drops every row but keeps the dimension."""
+        self._data = None
+        self._ids = np.empty(0, dtype=np.int64)
+        self._size = 0
+        self._row_of = {}
+        self._publish()
+
+    def __len__(self) -> int:
+        return self._view[2]
+
+    def __contains__(self, entry_id: int) -> bool:
+        _, _, size, row_of = self._view
+        return row_of.get(int(entry_id), size) < size
@@ -3,12 +3,113 @@
 from typing import Any, Dict, List
 from datetime import datetime
 import json
+import threading
+from memory.text_index import NGramIndex
+from memory.time_index import TimeIndex
 
 class Storage:
         def __init__(self):
+            # Indexes are keyed by entry id; ids grow with insertion order, so id order is list order
+            self._json_index = NGramIndex()  # Lowercased json.dumps(entry), for search()
+            self._value_index = NGramIndex()  # Lowercased values, for search_by_text()
+            self._time_index = TimeIndex()
+            self._modules: Dict[str, List[int]] = {}  # module_name -> ids carrying it
+            self._by_id: Dict[int, Dict[str, Any]] = {}
+            self._stale = False
+            # The text indexes cost far more than the entries; they are built by the first text lookup, then kept current
+            self._text_indexed = False
+            # Guards the entry list and text/time indexes; held only for the in-memory update or lookup
+            self._lock = threading.RLock()
+            # Bumped once a change to the entries is complete, so caches derived from them can check freshness
+            self.version = 0
             self.storage = []  # List to store entries
             self.current_id = 0  # Incremental ID for each entry
 
+        @property
+        def storage(self) -> List[Dict[str, Any]]:
+            return self._storage
+
+        @storage.setter
+        def storage(self, entries: List[Dict[str, Any]]) -> None:
+            # Replacing the list (e.g. on load) rebuilds the indexes lazily on the next lookup
+            self._storage = entries
+            self._stale = True
+            self.version += 1
+
+        def _ensure_indexes(self) -> None:
+            if not self._stale:
+                return
+            self._json_index.clear()
+            self._value_index.clear()
+            self._text_indexed = False
+            self._time_index.clear()
+            self._modules.clear()
+            self._by_id.clear()
+            self._stale = False
+            for entry in self._storage:
+                self._index(entry)
+
+        def _ensure_text_indexes(self) -> None:
+            self._ensure_indexes()
+            if self._text_indexed:
+                return
+            for entry in self._storage:
+                self._index_text(entry)
+            self._text_indexed = True
+
+        def _index_text(self, entry: Dict[str, Any]) -> None:
+            self._json_index.add(entry["id"], json.dumps(entry))
+            if isinstance(entry.get("value"), str):
+                self._value_index.add(entry["id"], entry["value"])
+
+        def _index(self, entry: Dict[str, Any]) -> None:
+            """Adds an entry that is already in `storage` to every index."""
+            if self._stale:
+                return  # Picked up by the pending rebuild
+            entry_id = entry["id"]
+            self._by_id[entry_id] = entry
+            if self._text_indexed:
+                self._index_text(entry)
+            if "created_at" in entry:
+                self._time_index.add(entry_id, datetime.fromisoformat(entry["created_at"]))
+            module_name = entry["metadata"].get("module_name")
+            if module_name is not None:
+                self._modules.setdefault(module_name, []).append(entry_id)
+
+        def _reindex(self, entry: Dict[str, Any]) -> None:
+            """Refreshes the text indexes after an entry's value changed in place."""
+            if self._stale or not self._text_indexed:
+                return
+            self._index_text(entry)
+
+        def _unindex(self, entry: Dict[str, Any]) -> None:
+            """Drops an entry that was removed from `storage` from every index."""
+            if self._stale:
+                return
+            entry_id = entry["id"]
+            self._by_id.pop(entry_id, None)
+            if self._text_indexed:
+                self._json_index.remove(entry_id)
+                self._value_index.remove(entry_id)
+            if "created_at" in entry:
+                self._time_index.remove(entry_id, datetime.fromisoformat(entry["created_at"]))
+            module_name = entry["metadata"].get("module_name")
+            if module_name in self._modules:
+                self._modules[module_name].remove(entry_id)
+                if not self._modules[module_name]:
+                    del self._modules[module_name]
+
+        def _entries_for(self, entry_ids: List[int]) -> List[Dict[str, Any]]:
+            return [self._by_id[entry_id] for entry_id in entry_ids]
+
+        def _module_entry(self, module_name: str) -> Dict[str, Any]:
+            """The first entry carrying the module name, found through the hash index."""
+            self._ensure_indexes()
+            entry_ids = self._modules.get(module_name)
+            if not entry_ids:
+                raise ValueError(f"Module '{module_name}' not found.")
+            return self._by_id[entry_ids[0]]
+
         def save(self, value: Any, metadata: Dict[str, Any]) -> None:
             """Save a value with associated metadata."""
             entry = {
@@ -17,61 +118,58 @@ class Storage:
                 "metadata": metadata,
                 "created_at": datetime.now().isoformat()
             }
-            self.storage.append(entry)
-            self.current_id += 1
+            with self._lock:
+                self.storage.append(entry)
+                self._index(entry)
+                self.current_id += 1
+                self.version += 1
             print(f"Saved entry: {entry}")
 
         def search(self, query: str) -> List[Dict[str, Any]]:
             """Search for entries containing the query in either the value or metadata."""
-            results = []
-            for entry in self.storage:
-                entry_data = json.dumps(entry)  # Convert entry to JSON string
-                if query.lower() in entry_data.lower():  # Case-insensitive search
-                    results.append(entry)
-            return results
+            # Same semantics as a case-insensitive match against json.dumps(entry), served from the index
+            with self._lock:
+                self._ensure_text_indexes()
+                return self._entries_for(self._json_index.search(query))
 
         def reset(self) -> None:
             """Reset the storage by clearing all entries."""
-            self.storage = []
-            self.current_id = 0
+            with self._lock:
+                self.storage = []
+                self.current_id = 0
             print("Storage has been reset.")
 
         def append(self, module_name: str, new_content: str) -> None:
             """Append new content to the value of a specific module."""
-            for entry in self.storage:
-                if entry['metadata'].get('module_name') == module_name:
-                    entry['value'] += new_content
-                    print(f"Appended new content to module '{module_name}'.")
-                    return
-            raise ValueError(f"Module '{module_name}' not found.")
+            with self._lock:
+                entry = self._module_entry(module_name)
+                entry['value'] += new_content
+                self._reindex(entry)
+                self.version += 1
+            print(f"Appended new content to module '{module_name}'.")
 
         def replace(self, module_name: str, old_content: str, new_content: str) -> None:
             """Replace old content with new content in a specific module."""
-            for entry in self.storage:
-                if entry['metadata'].get('module_name') == module_name:
-                    if old_content in entry['value']:
-                        entry['value'] = entry['value'].replace(old_content, new_content)
-                        print(f"Replaced content in module '{module_name}'.")
-                    else:
-                        raise ValueError(f"Old content not found in module '{module_name}'.")
-                    return
-            raise ValueError(f"Module '{module_name}' not found.")
+            with self._lock:
+                entry = self._module_entry(module_name)
+                if old_content in entry['value']:
+                    entry['value'] = entry['value'].replace(old_content, new_content)
+                    self._reindex(entry)
+                    self.version += 1
+                    print(f"Replaced content in module '{module_name}'.")
+                else:
+                    raise ValueError(f"Old content not found in module '{module_name}'.")
 
         def search_by_text(self, query: str) -> List[Any]:
             """Search entries where the text contains the query."""
-            results = []
-            for entry in self.storage:
-                if query.lower() in entry['value'].lower():
-                    results.append(entry)
-            return results
+            with self._lock:
+                self._ensure_text_indexes()
+                return self._entries_for(self._value_index.search(query))
 
         def search_by_date(self, start_date: str, end_date: str) -> List[Any]:
             """Search entries created within a specific date range."""
             start = datetime.fromisoformat(start_date)
             end = datetime.fromisoformat(end_date)
-            results = []
-            for entry in self.storage:
-                entry_date = datetime.fromisoformat(entry['created_at'])
-                if start <= entry_date <= end:
-                    results.append(entry)
-            return results
\ No newline at end of file
+            with self._lock:
+                self._ensure_indexes()
+                return self._entries_for(sorted(self._time_index.range(start, end)))
\ No newline at end of file
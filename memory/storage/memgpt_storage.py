@@ -1,126 +1,649 @@
-import json
+import os
+import time
+from datetime import datetime
 import numpy as np
-from memory.embeddings import EmbeddingModel
-from memory.messages import RecallMemory
-from memory.persistence import PersistenceManager
 from memory.storage.interface import Storage
-from memory.base_memory import BaseMemory
-from memory.executor import FunctionExecutor
+from memory.storage.bm25_index import BM25Index
+from memory.storage.embedding_matrix import EmbeddingMatrix
+from memory.storage.quantization import QuantizedMatrix, create_matrix
+from memory.storage.vector_index import ExactIndex, create_index, measure_recall
+from memory.storage.vector_file import VectorFile
+from memory.storage.write_ahead_log import WriteAheadLog, decode_vector, encode_vector
 from utils.logger import logger
-from typing import Any, Dict, List
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    # Annotation only: memory.persistence and memory_store import from this package
+    from memory.persistence import PersistenceManager
+    from memory.storage.memory_store import MemoryStore
+
+RETRIEVAL_MODES = ("semantic", "lexical", "hybrid", "auto")
+FUSION_METHODS = ("rrf", "weighted")
 
 class MemGPTStorage(Storage):
     """Storage implementation using MemGPT architecture."""
 
-    def __init__(self, persona: str, human: str, persistence_manager: PersistenceManager):
+    def __init__(
+        self,
+        persona: str,
+        human: str,
+        persistence_manager: "PersistenceManager",
+        top_k: Optional[int] = None,
+        threshold: float = 0.5,
+        index_kind: Optional[str] = None,
+        storage_path: Optional[str] = None,
+        wal_fsync: Optional[str] = None,
+        compact_interval: float = 60.0,
+        store: Optional["MemoryStore"] = None,
+        retrieval_mode: Optional[str] = None,
+        fusion: Optional[str] = None,
+        semantic_weight: float = 0.5,
+        rrf_k: int = 60,
+        lexical_threshold: float = 0.5,
+        lexical_confidence: float = 0.9,
+        codec: Optional[str] = None,
+    ):
+        self.bm25 = BM25Index()  # Lexical index over entry values, maintained with the base text indexes
         super().__init__()
-        self.embedding_model = EmbeddingModel()
-        self.core_memory = BaseMemory()
-        self.archival_memory = []
-        self.recall_memory = RecallMemory()
-        self.persistence_manager = persistence_manager
-        self.function_executor = FunctionExecutor(self.core_memory, self.archival_memory, self.recall_memory)
-        self.persona = persona
-        self.human = human
 
-        # Load memory data at initialization
-        self.load_memory()
+        # Shared components come from the MemoryStore; a standalone storage gets a private one
+        owns_store = store is None
+        if owns_store:
+            from memory.storage.memory_store import MemoryStore
+            store = MemoryStore(persistence_manager, persona=persona, human=human)
+        self.store = store
 
-    def load_memory(self) -> None:
-        """Load memory data using PersistenceManager."""
-        logger.debug("Loading memory data from persistent storage")
-        
-        try:
-            # Load core, archival, and recall memories
-            self.persistence_manager.load("data/core_memory.json")
-            self.persistence_manager.load("data/archival_memory.json")
-            self.persistence_manager.load("data/recall_memory.json")
-            self.persistence_manager.load("data/short_term_memory.json")
+        self.embedding_model = store.embedding_model
+        # Normalised embeddings, one row per entry; optionally quantized (MEMGPT_EMBEDDING_CODEC).
+        # Quantized rows are re-ranked with exact vectors: unsaved ones are kept in `_exact`,
+        # saved ones are read from the memory-mapped snapshot file in `_file` (vectors, id -> row)
+        self.vectors = create_matrix(codec)
+        self._exact: Dict[int, np.ndarray] = {}
+        self._file: Tuple[Optional[np.ndarray], Dict[int, int]] = (None, {})
+        if self._quantized:
+            self.vectors.rerank_source = self._rerank_vectors
+        self.index = create_index(index_kind, matrix=self.vectors)
+        self.entries: Dict[int, Dict[str, Any]] = {}
+        self.top_k = top_k
+        self.threshold = threshold
 
-            # Update local memory attributes
-            self.core_memory = self.persistence_manager.core_memory
-            self.archival_memory = self.persistence_manager.archival_memory
-            self.recall_memory = self.persistence_manager.recall_memory
+        # Retrieval: "semantic" (vectors only, the default), "lexical" (BM25 only), "hybrid" (both, fused) or
+        # "auto" (hybrid, but BM25 alone answers when its top hit covers the query confidently).
+        # Only "semantic" scores are cosine similarities; the other modes score on their own scale (see _fuse)
+        self.retrieval_mode = retrieval_mode or os.getenv("MEMGPT_RETRIEVAL_MODE", "semantic")
+        self.fusion = fusion or os.getenv("MEMGPT_RETRIEVAL_FUSION", "rrf")
+        if self.retrieval_mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode '{self.retrieval_mode}'. Expected one of {RETRIEVAL_MODES}.")
+        if self.fusion not in FUSION_METHODS:
+            raise ValueError(f"Unknown fusion method '{self.fusion}'. Expected one of {FUSION_METHODS}.")
+        self.semantic_weight = semantic_weight
+        self.rrf_k = rrf_k
+        self.lexical_threshold = lexical_threshold  # Minimum share of the query's IDF mass a lexical hit must match
+        self.lexical_confidence = lexical_confidence
+        self.last_timings: Dict[str, float] = {}
+        self.last_mode: Optional[str] = None
+        self.core_memory = store.core_memory
+        self.archival_memory = store.archival_memory
+        self.recall_memory = store.recall_memory
+        self.persistence_manager = store.persistence_manager
+        self.function_executor = store.function_executor
+        self.persona = persona
+        self.human = human
 
-            logger.info("Memory loaded successfully.")
+        # Entries and their embeddings are persisted to a binary VectorFile at storage_path;
+        # mutations in between snapshots go to an append-only write-ahead log next to it
+        self.storage_path = storage_path
+        self._persisted_rows = 0
+        self._snapshot_seq = 0  # Last log record reflected in the snapshot files
+        self._rewrite_needed = False
+        # `self._lock` (from Storage) serialises writers and lexical lookups; vector searches read
+        # the matrix's published snapshot and run alongside writes without taking it
+        self._replaying = False
+        self.wal = None
+        if storage_path:
+            self.wal = WriteAheadLog(f"{storage_path}.wal", fsync=wal_fsync or os.getenv("MEMGPT_WAL_FSYNC", "interval"))
 
-        except Exception as e:
-            logger.error(f"Error loading memory data: {e}")
-            # Initialize empty memories if loading fails
-            self.core_memory = BaseMemory()
-            self.archival_memory = []
-            self.recall_memory = RecallMemory()
+        # Load memory data at initialization; namespaces of a shared store are loaded by the store
+        if owns_store:
+            store.load()
+            self.load_memory()
+        elif store.loaded:
+            self.load_memory()
+        if self.wal is not None:
+            self.wal.start(self.compact, compact_interval=compact_interval)
+
+    def load_memory(self) -> None:
+        """Load this namespace's entries; shared core, archival and recall memory are loaded by the store."""
+        logger.debug(f"Loading storage entries for {self.storage_path}")
+        self.load_entries()
 
     def save_memory(self) -> None:
-        """Save memory data using PersistenceManager."""
-        logger.debug("Saving memory data to persistent storage")
-        
-        try:
-            # Persist each memory component
-            self.persistence_manager.save("data/core_memory.json")
-            self.persistence_manager.save("data/archival_memory.json")
-            self.persistence_manager.save("data/recall_memory.json")
-            self.persistence_manager.save("data/short_term_memory.json")
-            logger.info("Memory persisted successfully.")
-        except Exception as e:
-            logger.error(f"Error persisting memory: {e}")
+        """Persist this namespace's entries; shared memory is saved by the store."""
+        logger.debug(f"Saving storage entries for {self.storage_path}")
+        self.compact()
 
-    def save(self, value: Any, metadata: Dict[str, Any]) -> None:
-        """Save a value with associated metadata."""
+    def save(self, value: Any, metadata: Dict[str, Any], created_at: Optional[str] = None) -> int:
+        """Save a value with associated metadata, stamped now unless `created_at` is given. Returns the new entry's id."""
         embedding = self.embedding_model.embed(value)
+        with self._lock:
+            entry = self._add_entry(value, metadata, embedding, created_at)
+        logger.debug(f"Saved entry: {entry}")
+        return entry["id"]
+
+    def save_batch(
+        self,
+        values: List[Any],
+        metadatas: List[Dict[str, Any]],
+        embeddings: Optional[List[np.ndarray]] = None,
+        created_at: Optional[List[Optional[str]]] = None,
+    ) -> List[int]:
+        """
+        Saves several values at once; without precomputed embeddings they are embedded in one batched call.
+        `created_at` keeps existing ISO timestamps (e.g. of promoted entries) instead of stamping them now.
+        """
+        if embeddings is None:
+            embeddings = self.embedding_model.embed_batch(list(values))
+        if created_at is None:
+            created_at = [None] * len(values)
+        with self._lock:
+            entries = [
+                self._add_entry(value, metadata, embedding, timestamp)
+                for value, metadata, embedding, timestamp in zip(values, metadatas, embeddings, created_at)
+            ]
+        logger.debug(f"Saved {len(entries)} entries")
+        return [entry["id"] for entry in entries]
+
+    def _add_entry(self, value: Any, metadata: Dict[str, Any], embedding: np.ndarray, created_at: Optional[str] = None) -> Dict[str, Any]:
+        """Creates, inserts and logs a new entry. Caller holds the lock."""
         entry = {
+            "id": self.current_id,
             "value": value,
             "metadata": metadata,
-            "embedding": embedding.tolist()
+            "created_at": created_at or datetime.now().isoformat(),
         }
+        self._insert(entry, embedding)
+        self._log({"op": "save", **entry, "embedding": encode_vector(self._exact_vector(entry["id"]))})
+        return entry
+
+    def _insert(self, entry: Dict[str, Any], embedding: np.ndarray) -> None:
+        """Adds an entry and its embedding to the in-memory structures."""
+        self.vectors.add(entry["id"], embedding)
+        if self._quantized:
+            self._exact[entry["id"]] = EmbeddingMatrix.normalize(embedding).reshape(-1)
+        if not self._index_is_matrix():
+            self.index.add([entry["id"]], embedding.reshape(1, -1))
         self.storage.append(entry)
-        logger.debug(f"Saved entry: {entry}")
+        self._index(entry)
+        self.entries[entry["id"]] = entry
+        self.current_id = max(self.current_id, entry["id"] + 1)
+        self.version += 1
+
+    def _log(self, record: Dict[str, Any]) -> None:
+        """Appends a mutation to the write-ahead log, unless it is being replayed from it."""
+        if self.wal is not None and not self._replaying:
+            self.wal.append(record)
+
+    def search(
+        self,
+        query: str,
+        top_k: Optional[int] = None,
+        threshold: Optional[float] = None,
+        query_embedding: Optional[np.ndarray] = None,
+        mode: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Search for entries relevant to the query, combining BM25 and embedding similarity per the retrieval mode."""
+        results, _ = self.search_with_timings(query, top_k, threshold, query_embedding, mode)
+        return results
+
+    def search_with_timings(
+        self,
+        query: str,
+        top_k: Optional[int] = None,
+        threshold: Optional[float] = None,
+        query_embedding: Optional[np.ndarray] = None,
+        mode: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, float]]:
+        """Runs a search and returns the results with a per-stage timing breakdown in milliseconds."""
+        started = time.perf_counter()
+        mode = mode or self.retrieval_mode
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode '{mode}'. Expected one of {RETRIEVAL_MODES}.")
+        top_k = self.top_k if top_k is None else top_k
+        threshold = self.threshold if threshold is None else threshold
+        # Each ranking contributes a deeper candidate list than the final cut so fusion can reorder
+        depth = None if top_k is None else max(top_k * 4, 20)
+        timings: Dict[str, float] = {}
+
+        lexical: List[Tuple[int, float]] = []
+        if mode != "semantic":
+            stage = time.perf_counter()
+            with self._lock:
+                self._ensure_indexes()
+                lexical = self.bm25.search(query, top_k=depth, min_coverage=self.lexical_threshold)
+            timings["lexical"] = (time.perf_counter() - stage) * 1000
+            if mode == "auto" and lexical and self.bm25.coverage(query, lexical[0][0]) >= self.lexical_confidence:
+                mode = "lexical"
+
+        semantic: List[Tuple[int, float]] = []
+        if mode != "lexical":
+            if query_embedding is None:
+                stage = time.perf_counter()
+                query_embedding = self.embedding_model.embed(query)
+                timings["embedding"] = (time.perf_counter() - stage) * 1000
+            stage = time.perf_counter()
+            semantic = self.index.search(query_embedding, top_k=top_k if mode == "semantic" else depth, threshold=threshold)
+            timings["vector"] = (time.perf_counter() - stage) * 1000
+
+        if mode == "semantic":
+            ranked = semantic
+        elif mode == "lexical":
+            ranked = lexical if top_k is None else lexical[:top_k]
+        else:
+            stage = time.perf_counter()
+            ranked = self._fuse(semantic, lexical, top_k)
+            timings["fusion"] = (time.perf_counter() - stage) * 1000
+
+        timings["total"] = (time.perf_counter() - started) * 1000
+        self.last_timings = timings
+        self.last_mode = mode
+
+        # Matches come back sorted by (fused) score
+        # An entry deleted since scoring is skipped; it is looked up once so it cannot vanish mid-row
+        results = []
+        for entry_id, score in ranked:
+            entry = self.entries.get(entry_id)
+            if entry is not None:
+                results.append({
+                    "id": entry_id,
+                    "value": entry['value'],
+                    "metadata": entry['metadata'],
+                    "score": score
+                })
+        return results, timings
+
+    def search_recent(
+        self,
+        query: str,
+        top_k: Optional[int] = None,
+        window: Optional[float] = None,
+        max_candidates: Optional[int] = None,
+        half_life: Optional[float] = None,
+        threshold: Optional[float] = None,
+        query_embedding: Optional[np.ndarray] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Recency-aware semantic search. The time index first narrows the candidates to entries
+        created in the last `window` seconds, capped at the newest `max_candidates`; only those are
+        scored, and each similarity is multiplied by 0.5 ** (age / half_life) before the top_k cut.
+        The cap (default MEMGPT_RECENT_MAX_CANDIDATES=1000) is a hard cut: entries older than the
+        newest `max_candidates` are never returned, however well they match. Use `search` to reach them.
+        """
+        if max_candidates is None:
+            max_candidates = int(os.getenv("MEMGPT_RECENT_MAX_CANDIDATES", 1000))
+        if half_life is None:
+            half_life = float(os.getenv("MEMGPT_RECENCY_HALF_LIFE_DAYS", 30)) * 86400
+        threshold = self.threshold if threshold is None else threshold
+        now = datetime.now()
+
+        with self._lock:
+            self._ensure_indexes()
+            if window is None:
+                ids, times = self._time_index.latest_items(max_candidates)
+            else:
+                ids, times = self._time_index.range_items(datetime.fromtimestamp(now.timestamp() - window), datetime.max)
+                ids, times = ids[-max_candidates:], times[-max_candidates:]
+        if not ids:
+            return []
+
+        if query_embedding is None:
+            query_embedding = self.embedding_model.embed(query)
+        matches = self.vectors.search(query_embedding, threshold=threshold, entry_ids=ids)
+        if not matches:
+            return []
+
+        created = dict(zip(ids, times))
+        match_ids = np.fromiter((entry_id for entry_id, _ in matches), dtype=np.int64, count=len(matches))
+        similarity = np.fromiter((score for _, score in matches), dtype=np.float32, count=len(matches))
+        ages = now.timestamp() - np.fromiter(
+            (created[entry_id].timestamp() for entry_id in match_ids.tolist()), dtype=np.float64, count=len(matches)
+        )
+        scores = similarity * np.power(0.5, np.maximum(ages, 0.0) / half_life) if half_life > 0 else similarity
+        order = np.argsort(-scores, kind="stable")
+        if top_k is not None:
+            order = order[:top_k]
 
-    def search(self, query: str) -> List[Dict[str, Any]]:
-        """Search for entries containing the query using embeddings for semantic similarity."""
-        query_embedding = self.embedding_model.embed(query)
         results = []
-        
-        for entry in self.storage:
-            entry_embedding = np.array(entry['embedding'], dtype=np.float32)
-            similarity_score = self.embedding_model.similarity(query_embedding, entry_embedding)
-            if similarity_score > 0.5:  # Assuming a threshold for semantic match
+        for position in order.tolist():
+            entry = self.entries.get(int(match_ids[position]))
+            if entry is not None:
                 results.append({
+                    "id": entry["id"],
                     "value": entry['value'],
                     "metadata": entry['metadata'],
-                    "score": similarity_score
+                    "created_at": entry['created_at'],
+                    "score": float(scores[position]),
                 })
-        
-        # Sort results based on similarity scores
-        sorted_results = sorted(results, key=lambda x: x['score'], reverse=True)
-        return sorted_results
+        return results
+
+    def _fuse(
+        self,
+        semantic: List[Tuple[int, float]],
+        lexical: List[Tuple[int, float]],
+        top_k: Optional[int],
+    ) -> List[Tuple[int, float]]:
+        """
+        Merges the two rankings with reciprocal rank fusion or a weighted sum of normalised scores.
+        RRF scores are rank-based (at most 2 / (rrf_k + 1)), so cosine thresholds do not apply to them.
+        """
+        scores: Dict[int, float] = {}
+        if self.fusion == "rrf":
+            for ranking in (semantic, lexical):
+                for rank, (entry_id, _) in enumerate(ranking):
+                    scores[entry_id] = scores.get(entry_id, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+        else:
+            # Cosine scores are already in [0, 1] for relevant hits; BM25 is scaled by the best hit
+            best_lexical = lexical[0][1] if lexical else 1.0
+            for entry_id, score in semantic:
+                scores[entry_id] = self.semantic_weight * score
+            for entry_id, score in lexical:
+                scores[entry_id] = scores.get(entry_id, 0.0) + (1 - self.semantic_weight) * score / best_lexical
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked if top_k is None else ranked[:top_k]
+
+    def _ensure_indexes(self) -> None:
+        if self._stale:
+            self.bm25.clear()
+        super()._ensure_indexes()
+
+    def _index(self, entry: Dict[str, Any]) -> None:
+        super()._index(entry)
+        if not self._stale:
+            self.bm25.add(entry["id"], str(entry["value"]))
+
+    def _reindex(self, entry: Dict[str, Any]) -> None:
+        super()._reindex(entry)
+        if not self._stale:
+            self.bm25.add(entry["id"], str(entry["value"]))
+
+    def _unindex(self, entry: Dict[str, Any]) -> None:
+        super()._unindex(entry)
+        if not self._stale:
+            self.bm25.remove(entry["id"])
+
+    def delete(self, entry_ids: Iterable[int]) -> int:
+        """Removes entries by id. Returns the number removed."""
+        with self._lock:
+            ids = {int(entry_id) for entry_id in entry_ids} & self.entries.keys()
+            if not ids:
+                return 0
+            # Vectors go first so a concurrent search stops finding them before their data disappears
+            self.vectors.remove(ids)
+            if not self._index_is_matrix():
+                self.index.remove(ids)
+            removed = [self.entries.pop(entry_id) for entry_id in ids]
+            self.storage[:] = [entry for entry in self.storage if entry["id"] not in ids]
+            for entry in removed:
+                self._unindex(entry)
+                self._exact.pop(entry["id"], None)
+            self._rewrite_needed = True
+            self.version += 1
+            self._log({"op": "delete", "ids": sorted(ids)})
+        logger.debug(f"Deleted {len(removed)} entries")
+        return len(removed)
 
     def reset(self) -> None:
         """Reset the storage by clearing all entries."""
-        self.storage = []
-        self.current_id = 0
+        with self._lock:
+            self.storage = []
+            self.entries.clear()
+            self.vectors.clear()
+            self.index.clear()
+            self._exact.clear()
+            self._file = (None, {})
+            self.current_id = 0
+            self._rewrite_needed = True
+            self.version += 1
+            self._log({"op": "reset"})
         logger.info("Storage has been reset.")
 
+    def load_entries(self) -> None:
+        """Maps persisted entries and embeddings back in without re-embedding anything."""
+        if not self.storage_path:
+            return
+        with self._lock:
+            self._load_snapshot()
+            self._replay_wal()
+            self.version += 1
+
+    def _load_snapshot(self) -> None:
+        vector_file = VectorFile(self.storage_path)
+        if not vector_file.exists():
+            return
+
+        try:
+            vectors, rows = vector_file.load()
+        except Exception as e:
+            logger.error(f"Error loading storage entries from {self.storage_path}: {e}")
+            return
+
+        self.storage = rows
+        self.entries = {entry["id"]: entry for entry in rows}
+        self.vectors.clear()
+        if vectors is not None:
+            self.vectors.adopt([entry["id"] for entry in rows], vectors)
+        if self._quantized:
+            self._exact.clear()
+            self._file = (vectors, {entry["id"]: row for row, entry in enumerate(rows)})
+        self.current_id = max(self.entries) + 1 if self.entries else 0
+        self._persisted_rows = len(rows)
+        self._snapshot_seq = vector_file.seq
+        self._rewrite_needed = False
+
+        # Entries saved before timestamps were recorded get the snapshot's time, so recency queries see them
+        untimed = [entry for entry in rows if "created_at" not in entry]
+        if untimed:
+            stamped = datetime.fromtimestamp(os.path.getmtime(vector_file.header_path)).isoformat()
+            for entry in untimed:
+                entry["created_at"] = stamped
+            self._rewrite_needed = True
+        if not self._index_is_matrix():
+            self.load_index(f"{self.storage_path}.index")
+        logger.info(f"Loaded {len(rows)} storage entries from {self.storage_path}")
+
+    def _replay_wal(self) -> None:
+        """
+        Re-applies mutations logged after the last snapshot. Records the snapshot already reflects
+        (a crash between writing it and checkpointing the log) are skipped, and a record that
+        fails is logged and skipped without dropping the ones after it.
+        """
+        if self.wal is None:
+            return
+        records = [record for record in self.wal.replay() if record["seq"] > self._snapshot_seq]
+        failed = 0
+        self._replaying = True
+        try:
+            for record in records:
+                try:
+                    self._apply_record(record)
+                except Exception as e:
+                    failed += 1
+                    logger.error(f"Skipping write-ahead log record {record['seq']} ({record['op']}) for {self.storage_path}: {e}")
+        finally:
+            self._replaying = False
+        if records:
+            logger.info(f"Replayed {len(records) - failed} of {len(records)} write-ahead log records for {self.storage_path}")
+
+    def _apply_record(self, record: Dict[str, Any]) -> None:
+        op = record["op"]
+        if op == "save" and record["id"] not in self.entries:
+            entry = {"id": record["id"], "value": record["value"], "metadata": record["metadata"]}
+            if "created_at" in record:
+                entry["created_at"] = record["created_at"]
+            self._insert(entry, decode_vector(record["embedding"]))
+        elif op == "delete":
+            self.delete(record["ids"])
+        elif op == "append":
+            self.append(record["module_name"], record["content"])
+        elif op == "replace":
+            self.replace(record["module_name"], record["old_content"], record["new_content"])
+        elif op == "reset":
+            self.reset()
+
+    def compact(self) -> None:
+        """Folds the write-ahead log into the snapshot files, then truncates it once the snapshot is on disk."""
+        with self._lock:
+            seq = self.wal.last_seq if self.wal is not None else None
+            self.persist_entries(seq)
+            if self.wal is not None:
+                self.wal.checkpoint()
+
+    def persist_entries(self, seq: Optional[int] = None) -> None:
+        """
+        Writes entries added since the last save; edits and deletes fall back to a full rewrite.
+        `seq` is the last log record the written rows reflect. Raises if the snapshot could not be
+        written, so the log it would replace is kept.
+        """
+        if not self.storage_path:
+            return
+        vector_file = VectorFile(self.storage_path)
+        if self._rewrite_needed or vector_file.rows != self._persisted_rows:
+            vector_file.rewrite(self._entry_vectors(self.storage), self.storage, seq=seq)
+        elif len(self.storage) > self._persisted_rows:
+            pending = self.storage[self._persisted_rows:]
+            vector_file.append(self._entry_vectors(pending), pending, seq=seq)
+        elif seq is not None and seq > vector_file.seq:
+            vector_file.mark_seq(seq)
+        self._persisted_rows = len(self.storage)
+        self._rewrite_needed = False
+        if seq is not None:
+            self._snapshot_seq = seq
+        if self._quantized:
+            # Saved rows are re-ranked from the file from now on; swap the file in before dropping copies
+            self._file = (vector_file.map_vectors(), {entry["id"]: row for row, entry in enumerate(self.storage)})
+            self._exact.clear()
+        if not self._index_is_matrix():
+            self.save_index(f"{self.storage_path}.index")
+
+    def _entry_vectors(self, entries: List[Dict[str, Any]]) -> Optional[np.ndarray]:
+        if not entries:
+            return None
+        return self._exact_vectors([entry["id"] for entry in entries])
+
+    @property
+    def _quantized(self) -> bool:
+        return isinstance(self.vectors, QuantizedMatrix)
+
+    def _exact_vector(self, entry_id: int) -> np.ndarray:
+        """Full-precision normalised embedding of an entry, even when the matrix is quantized."""
+        if not self._quantized:
+            return self.vectors.get(entry_id)
+        exact = self._exact.get(entry_id)
+        if exact is not None:
+            return exact
+        vectors, rows = self._file
+        return vectors[rows[entry_id]]
+
+    def _exact_vectors(self, entry_ids: List[int]) -> np.ndarray:
+        return np.vstack([self._exact_vector(entry_id) for entry_id in entry_ids])
+
+    def _rerank_vectors(self, entry_ids: List[int]) -> np.ndarray:
+        """Exact vectors for the lock-free re-rank; rows deleted since the search began score zero."""
+        dim = self.vectors.dim
+        rows = []
+        for entry_id in entry_ids:
+            try:
+                rows.append(self._exact_vector(entry_id))
+            except KeyError:
+                rows.append(np.zeros(dim, dtype=np.float32))
+        return np.vstack(rows)
+
+    def get_embeddings(self, entry_ids: List[int]) -> np.ndarray:
+        """Normalised full-precision embeddings of the given entries, one row each."""
+        with self._lock:
+            return self._exact_vectors(entry_ids)
+
+    def memory_usage(self) -> Dict[str, Any]:
+        """Resident bytes of the embedding matrix next to what plain float32 rows would take."""
+        dim = self.vectors.dim or 0
+        return {
+            "codec": self.vectors.codec.name if self._quantized else "float32",
+            "rows": len(self.vectors),
+            "resident_bytes": self.vectors.nbytes,
+            "float32_bytes": len(self.vectors) * dim * 4,
+        }
+
+    def _index_is_matrix(self) -> bool:
+        """True when the search index is the exact index over `self.vectors` itself."""
+        return isinstance(self.index, ExactIndex) and self.index.matrix is self.vectors
+
+    def save_index(self, path: str) -> None:
+        """Writes the search index to disk."""
+        try:
+            self.index.save(path)
+            logger.debug(f"Saved {self.index.kind} index with {len(self.index)} vectors to {path}")
+        except Exception as e:
+            logger.error(f"Error saving vector index to {path}: {e}")
+
+    def load_index(self, path: str) -> bool:
+        """Loads the search index from disk, keeping it only if it matches the stored entries."""
+        if self._index_is_matrix():
+            return False
+        try:
+            if self.index.load(path) and len(self.index) == len(self.vectors):
+                return True
+        except Exception as e:
+            logger.error(f"Error loading vector index from {path}: {e}")
+
+        # Missing or stale index: rebuild it from the embedding matrix
+        self.index.clear()
+        if len(self.vectors):
+            ids = self.vectors.ids.tolist()
+            self.index.add(ids, self._exact_vectors(ids))
+        return False
+
+    def measure_recall(self, queries: List[str], top_k: int = 10) -> float:
+        """
+        Measures recall@top_k of the configured index (and codec) against exact full-precision
+        search over the same entries.
+        """
+        query_embeddings = [self.embedding_model.embed(query) for query in queries]
+        baseline = self.vectors
+        if self._quantized:
+            ids = self.vectors.ids.tolist()
+            baseline = EmbeddingMatrix()
+            if ids:
+                baseline.add_batch(ids, self._exact_vectors(ids))
+        return measure_recall(self.index, ExactIndex(baseline), query_embeddings, top_k)
+
     def append(self, module_name: str, new_content: str) -> None:
         """Append new content to a specific module."""
-        for entry in self.storage:
-            if entry['metadata'].get('module_name') == module_name:
-                entry['value'] += new_content
-                logger.debug(f"Appended new content to module '{module_name}'.")
-                return
-        raise ValueError(f"Module '{module_name}' not found.")
+        with self._lock:
+            entry = self._module_entry(module_name)
+            entry['value'] += new_content
+            self._reindex(entry)
+            self._rewrite_needed = True
+            self.version += 1
+            self._log({"op": "append", "module_name": module_name, "content": new_content})
+            logger.debug(f"Appended new content to module '{module_name}'.")
 
     def replace(self, module_name: str, old_content: str, new_content: str) -> None:
         """Replace old content with new content in a specific module."""
-        for entry in self.storage:
-            if entry['metadata'].get('module_name') == module_name:
-                if old_content in entry['value']:
-                    entry['value'] = entry['value'].replace(old_content, new_content)
-                    logger.debug(f"Replaced content in module '{module_name}'.")
-                else:
-                    raise ValueError(f"Old content not found in module '{module_name}'.")
-                return
-        raise ValueError(f"Module '{module_name}' not found.")
+        with self._lock:
+            entry = self._module_entry(module_name)
+            if old_content not in entry['value']:
+                raise ValueError(f"Old content not found in module '{module_name}'.")
+            entry['value'] = entry['value'].replace(old_content, new_content)
+            self._reindex(entry)
+            self._rewrite_needed = True
+            self.version += 1
+            self._log({
+                "op": "replace",
+                "module_name": module_name,
+                "old_content": old_content,
+                "new_content": new_content,
+            })
+            logger.debug(f"Replaced content in module '{module_name}'.")
 
     def persist_memory(self):
         """Persist memory data to files."""
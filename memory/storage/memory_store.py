@@ -0,0 +1,113 @@
+# memory/storage/memory_store.py
+
+import os
+from typing import Any, Dict, Optional
+from memory.archival_memory import ArchivalMemory
+from memory.base_memory import BaseMemory
+from memory.embeddings import EmbeddingModel
+from memory.executor import FunctionExecutor
+from memory.messages import RecallMemory
+from memory.persistence import PersistenceManager
+from utils.logger import logger
+from utils.timing import PhaseTimer
+
+
+class MemoryStore:
+    """
+    Owns the components every memory type shares (embedding model, core/archival/recall memory,
+    function executor and persistence) and hands out one MemGPTStorage namespace per memory type.
+    Shared state is written once to a single state file; each namespace persists only its own rows.
+    """
+
+    # Layout used before the store existed: every file held the same core/archival/recall payload
+    legacy_files = (
+        "core_memory.json",
+        "archival_memory.json",
+        "recall_memory.json",
+        "short_term_memory.json",
+        "long_term_memory.json",
+        "entity_memory.json",
+    )
+
+    def __init__(
+        self,
+        persistence_manager: Optional[PersistenceManager] = None,
+        persona: str = "",
+        human: str = "",
+        embedding_model: Optional[EmbeddingModel] = None,
+        data_dir: str = "data",
+        **storage_options: Any,
+    ):
+        if persistence_manager is None:
+            persistence_manager = PersistenceManager(BaseMemory(), ArchivalMemory(), RecallMemory())
+        self.persistence_manager = persistence_manager
+        self.persona = persona
+        self.human = human
+        self.data_dir = data_dir
+        self.storage_options = storage_options
+        self.embedding_model = embedding_model or EmbeddingModel()
+        self.core_memory = persistence_manager.core_memory
+        self.archival_memory = persistence_manager.archival_memory
+        self.recall_memory = persistence_manager.recall_memory
+        self.function_executor = FunctionExecutor(
+            self.core_memory, self.archival_memory, self.recall_memory, embedding_model=self.embedding_model
+        )
+        self.state_path = os.path.join(data_dir, "memgpt_state.json")
+        self.archival_index_path = os.path.join(data_dir, "archival_memory.index")
+        self.namespaces: Dict[str, "MemGPTStorage"] = {}
+        self.loaded = False
+
+    def namespace(self, name: str, **options: Any) -> "MemGPTStorage":
+        """
+        Returns the storage for a memory type, creating it on first use. New namespaces are
+        loaded by `load()`, or right away if the store has already been loaded.
+        """
+        if name not in self.namespaces:
+            from memory.storage.memgpt_storage import MemGPTStorage
+
+            self.namespaces[name] = MemGPTStorage(
+                self.persona,
+                self.human,
+                self.persistence_manager,
+                storage_path=os.path.join(self.data_dir, name),
+                store=self,
+                **{**self.storage_options, **options},
+            )
+        return self.namespaces[name]
+
+    def _state_file(self) -> str:
+        """The state file to load, falling back to the legacy per-memory files."""
+        if os.path.exists(self.state_path):
+            return self.state_path
+        for file_name in self.legacy_files:
+            legacy_path = os.path.join(self.data_dir, file_name)
+            if os.path.exists(legacy_path):
+                logger.info(f"Loading shared memory state from legacy file {legacy_path}")
+                return legacy_path
+        return self.state_path
+
+    def load(self, timer: Optional[PhaseTimer] = None) -> None:
+        """Loads core, archival and recall memory once for every namespace, then each namespace's own rows."""
+        timer = timer or PhaseTimer()
+        with timer.phase("shared_state"):
+            self.persistence_manager.load(self._state_file())
+        with timer.phase("archival_index"):
+            self.function_executor.load_archival_index(self.archival_index_path)
+        for name, storage in self.namespaces.items():
+            with timer.phase(f"namespace:{name}"):
+                storage.load_memory()
+        self.loaded = True
+
+    def save(self) -> None:
+        """Writes the shared state once, then lets each namespace persist its own rows."""
+        os.makedirs(self.data_dir, exist_ok=True)
+        self.persistence_manager.save(self.state_path)
+        self.function_executor.save_archival_index(self.archival_index_path)
+        for storage in self.namespaces.values():
+            storage.compact()
+
+    def close(self) -> None:
+        """Stops background log threads after flushing them."""
+        for storage in self.namespaces.values():
+            if storage.wal is not None:
+                storage.wal.close()
@@ -0,0 +1,449 @@
+# memory/storage/quantization.py
+
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+import numpy as np
+from memory.storage.embedding_matrix import EmbeddingMatrix
+from utils.logger import logger
+
+SCORE_CHUNK_ROWS = 8192  # Rows decoded per step while scoring, bounds the float32 scratch space
+RERANK_SLACK = 0.05  # Approximate scores this far below the threshold still reach the exact re-rank
+
+
+class Codec:
+    """Turns normalised float32 rows into compact codes and scores queries against the codes."""
+
+    name = "float32"
+    dtype = np.float32
+    scaled = False  # Whether rows carry a per-vector scale
+    rerank_factor = 4  # Default over-fetch before the exact re-rank
+
+    @property
+    def trained(self) -> bool:
+        return True
+
+    def columns(self, dim: int) -> int:
+        return dim
+
+    def fit(self, vectors: np.ndarray) -> None:
+        pass
+
+    def encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Returns (codes, per-row scale or None)."""
+        return np.asarray(vectors, dtype=np.float32), None
+
+    def decode(self, codes: np.ndarray, scales: Optional[np.ndarray]) -> np.ndarray:
+        return np.asarray(codes, dtype=np.float32)
+
+    def score(self, codes: np.ndarray, scales: Optional[np.ndarray], query: np.ndarray) -> np.ndarray:
+        """Approximate inner products of the query with every coded row."""
+        return codes @ query
+
+
+class Float16Codec(Codec):
+    """Half precision: 2x smaller, scores within ~1e-3 of float32."""
+
+    name = "float16"
+    dtype = np.float16
+
+    def encode(self, vectors):
+        return np.asarray(vectors, dtype=np.float16), None
+
+    def score(self, codes, scales, query):
+        return _chunked(codes, lambda chunk, _: chunk.astype(np.float32) @ query, scales)
+
+
+class Int8Codec(Codec):
+    """Symmetric scalar quantization with one float32 scale per vector: ~4x smaller."""
+
+    name = "int8"
+    dtype = np.int8
+    scaled = True
+
+    def encode(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    def decode(self, codes, scales):
+        return codes.astype(np.float32) * scales[:, None]
+
+    def score(self, codes, scales, query):
+        return _chunked(codes, lambda chunk, chunk_scales: (chunk.astype(np.float32) @ query) * chunk_scales, scales)
+
+
+class PQCodec(Codec):
+    """
+    Product quantization: each vector is split into `subspaces` slices and every slice is stored as
+    the one-byte id of its nearest k-means centroid. Queries are scored with a per-query lookup table
+    (asymmetric distance computation), so codes are never decoded while searching.
+    """
+
+    name = "pq"
+    dtype = np.uint8
+    rerank_factor = 10  # Coarser scores need a deeper candidate list
+
+    def __init__(self, subspaces: Optional[int] = None, clusters: int = 256, iterations: int = 10, train_size: int = 1024, seed: int = 0):
+        if clusters > 256:
+            raise ValueError("PQ codes are stored in one byte, so clusters must be at most 256.")
+        self.subspaces = subspaces
+        self.clusters = clusters
+        self.iterations = iterations
+        self.train_size = train_size
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None  # (subspaces, clusters, sub_dim)
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def columns(self, dim: int) -> int:
+        return self._subspaces(dim)
+
+    def _subspaces(self, dim: int) -> int:
+        subspaces = self.subspaces or max(1, dim // 8)
+        if dim % subspaces:
+            raise ValueError(f"Dimension {dim} is not divisible into {subspaces} PQ subspaces.")
+        return subspaces
+
+    def fit(self, vectors: np.ndarray) -> None:
+        """Runs k-means in every subspace on (a sample of) the given vectors."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        rng = np.random.default_rng(self.seed)
+        if len(vectors) > self.train_size:
+            vectors = vectors[rng.choice(len(vectors), self.train_size, replace=False)]
+        subspaces = self._subspaces(vectors.shape[1])
+        clusters = min(self.clusters, len(vectors))
+
+        centroids = []
+        for part in np.split(vectors, subspaces, axis=1):
+            centers = part[rng.choice(len(part), clusters, replace=False)].copy()
+            for _ in range(self.iterations):
+                assignment = self._nearest(part, centers)
+                for cluster in range(clusters):
+                    members = part[assignment == cluster]
+                    if len(members):
+                        centers[cluster] = members.mean(axis=0)
+            centroids.append(centers)
+        self.centroids = np.stack(centroids)
+
+    @staticmethod
+    def _nearest(part: np.ndarray, centers: np.ndarray) -> np.ndarray:
+        distances = (centers ** 2).sum(axis=1)[None, :] - 2 * part @ centers.T
+        return distances.argmin(axis=1)
+
+    def encode(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        parts = np.split(vectors, self.centroids.shape[0], axis=1)
+        codes = np.stack([self._nearest(part, centers) for part, centers in zip(parts, self.centroids)], axis=1)
+        return codes.astype(np.uint8), None
+
+    def decode(self, codes, scales):
+        return np.concatenate(
+            [self.centroids[j][codes[:, j]] for j in range(self.centroids.shape[0])], axis=1
+        ).astype(np.float32)
+
+    def score(self, codes, scales, query):
+        subspaces = self.centroids.shape[0]
+        table = np.einsum("jkd,jd->jk", self.centroids, query.reshape(subspaces, -1))
+        columns = np.arange(subspaces)
+        return _chunked(codes, lambda chunk, _: table[columns, chunk].sum(axis=1), scales)
+
+
+def _chunked(codes: np.ndarray, score_chunk: Callable, scales: Optional[np.ndarray]) -> np.ndarray:
+    scores = np.empty(len(codes), dtype=np.float32)
+    for start in range(0, len(codes), SCORE_CHUNK_ROWS):
+        end = start + SCORE_CHUNK_ROWS
+        scores[start:end] = score_chunk(codes[start:end], None if scales is None else scales[start:end])
+    return scores
+
+
+CODECS = {
+    "float32": Codec,
+    "float16": Float16Codec,
+    "int8": Int8Codec,
+    "pq": PQCodec,
+}
+
+
+class QuantizedMatrix:
+    """
+    Drop-in replacement for EmbeddingMatrix that keeps rows as compact codes. Search scores the
+    codes directly; when `rerank_source` is set (a callable returning exact normalised vectors for
+    a list of entry ids) the best `top_k * rerank_factor` candidates are re-scored exactly.
+    A PQ codec keeps rows in float32 until `train_size` rows exist, then trains and re-encodes them.
+    Like EmbeddingMatrix, writers are serialised by the caller and readers work on a published view.
+    """
+
+    def __init__(
+        self,
+        codec: Union[str, Codec] = "int8",
+        dim: Optional[int] = None,
+        initial_capacity: int = 64,
+        growth_factor: float = 2.0,
+        rerank_factor: Optional[int] = None,
+        rerank_source: Optional[Callable[[List[int]], np.ndarray]] = None,
+        **codec_params,
+    ):
+        if growth_factor <= 1.0:
+            raise ValueError("growth_factor must be greater than 1.0")
+        if isinstance(codec, str):
+            if codec not in CODECS:
+                raise ValueError(f"Unknown codec '{codec}'. Expected one of {tuple(CODECS)}.")
+            codec = CODECS[codec](**codec_params)
+        self.target_codec = codec
+        self.codec: Codec = codec if codec.trained else Codec()  # float32 staging until the codec is trained
+        self.dim = dim
+        self.initial_capacity = max(1, initial_capacity)
+        self.growth_factor = growth_factor
+        self.rerank_factor = codec.rerank_factor if rerank_factor is None else rerank_factor
+        self.rerank_source = rerank_source
+        self._codes: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+        self._ids = np.empty(0, dtype=np.int64)
+        self._size = 0
+        self._row_of: Dict[int, int] = {}
+        self._publish()
+
+    normalize = staticmethod(EmbeddingMatrix.normalize)
+
+    def _publish(self) -> None:
+        # (codec, codes, scales, ids, size, row_of): everything a reader needs, swapped in at once
+        self._view = (self.codec, self._codes, self._scales, self._ids, self._size, self._row_of)
+
+    def _reserve(self, required: int) -> None:
+        capacity = 0 if self._codes is None else self._codes.shape[0]
+        if required <= capacity:
+            return
+
+        new_capacity = max(self.initial_capacity, capacity)
+        while new_capacity < required:
+            new_capacity = int(new_capacity * self.growth_factor) + 1
+
+        codes = np.empty((new_capacity, self.codec.columns(self.dim)), dtype=self.codec.dtype)
+        scales = np.empty(new_capacity, dtype=np.float32)
+        ids = np.empty(new_capacity, dtype=np.int64)
+        if self._size:
+            codes[:self._size] = self._codes[:self._size]
+            if self._scales is not None:
+                scales[:self._size] = self._scales[:self._size]
+            ids[:self._size] = self._ids[:self._size]
+        self._codes = codes
+        self._scales = scales
+        self._ids = ids
+
+    def add(self, entry_id: int, embedding: np.ndarray) -> None:
+        self.add_batch([entry_id], np.asarray(embedding, dtype=np.float32).reshape(1, -1))
+
+    def add_batch(self, entry_ids: Iterable[int], embeddings: np.ndarray) -> None:
+        """Normalises, encodes and appends rows; rows must line up with entry_ids."""
+        entry_ids = [int(entry_id) for entry_id in entry_ids]
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if embeddings.ndim != 2 or embeddings.shape[0] != len(entry_ids):
+            raise ValueError("Embeddings must be a 2-D array with one row per entry id.")
+        if not entry_ids:
+            return
+
+        if self.dim is None:
+            self.dim = embeddings.shape[1]
+        elif embeddings.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension {embeddings.shape[1]} does not match matrix dimension {self.dim}.")
+
+        for entry_id in entry_ids:
+            if entry_id in self._row_of:
+                raise ValueError(f"Entry id {entry_id} is already present in the matrix.")
+
+        codes, scales = self.codec.encode(self.normalize(embeddings))
+        self._reserve(self._size + len(entry_ids))
+        start, end = self._size, self._size + len(entry_ids)
+        self._codes[start:end] = codes
+        if scales is not None:
+            self._scales[start:end] = scales
+        self._ids[start:end] = entry_ids
+        for offset, entry_id in enumerate(entry_ids):
+            self._row_of[entry_id] = start + offset
+        self._size = end
+        self._maybe_train()
+        self._publish()
+
+    def adopt(self, entry_ids: Iterable[int], vectors: np.ndarray) -> None:
+        """Replaces the contents with already-normalised vectors, e.g. a memory-mapped file, encoding them."""
+        entry_ids = np.asarray(list(entry_ids), dtype=np.int64)
+        if vectors.ndim != 2 or vectors.shape[0] != entry_ids.size:
+            raise ValueError("Vectors must be a 2-D array with one row per entry id.")
+        self.clear()
+        self.dim = vectors.shape[1]
+        if self.codec is not self.target_codec and entry_ids.size >= self.target_codec.train_size:
+            self.target_codec.fit(vectors)
+            self.codec = self.target_codec
+        self._reserve(entry_ids.size)
+        for start in range(0, entry_ids.size, SCORE_CHUNK_ROWS):
+            end = min(start + SCORE_CHUNK_ROWS, entry_ids.size)
+            codes, scales = self.codec.encode(vectors[start:end])
+            self._codes[start:end] = codes
+            if scales is not None:
+                self._scales[start:end] = scales
+        self._ids[:entry_ids.size] = entry_ids
+        self._size = entry_ids.size
+        self._row_of = {int(entry_id): row for row, entry_id in enumerate(entry_ids.tolist())}
+        self._publish()
+
+    def _maybe_train(self) -> None:
+        """Switches from float32 staging to the target codec once it has enough training rows."""
+        if self.codec is self.target_codec or self._size < self.target_codec.train_size:
+            return
+        vectors = self.codec.decode(self._codes[:self._size], None)
+        ids = self._ids[:self._size].copy()
+        self.target_codec.fit(vectors)
+        self.codec = self.target_codec
+        self._codes = None
+        self._size = 0
+        self._reserve(len(ids))
+        codes, scales = self.codec.encode(vectors)
+        self._codes[:len(ids)] = codes
+        if scales is not None:
+            self._scales[:len(ids)] = scales
+        self._ids[:len(ids)] = ids
+        self._size = len(ids)
+        logger.info(f"Trained {self.codec.name} codec on {len(ids)} vectors")
+
+    def remove(self, entry_ids: Iterable[int]) -> int:
+        """
+        Removes rows by entry id, filling each hole with the last row. Returns the count removed.
+        Rows are rearranged in fresh buffers so concurrent readers keep their snapshot.
+        """
+        doomed = [int(entry_id) for entry_id in entry_ids if int(entry_id) in self._row_of]
+        if not doomed:
+            return 0
+
+        codes = self._codes[:self._size].copy()
+        scales = self._scales[:self._size].copy()
+        ids = self._ids[:self._size].copy()
+        row_of = dict(self._row_of)
+        size = self._size
+        for entry_id in dict.fromkeys(doomed):
+            row = row_of.pop(entry_id)
+            last = size - 1
+            if row != last:
+                moved_id = int(ids[last])
+                codes[row] = codes[last]
+                scales[row] = scales[last]
+                ids[row] = moved_id
+                row_of[moved_id] = row
+            size = last
+        self._codes, self._scales, self._ids, self._size, self._row_of = codes, scales, ids, size, row_of
+        self._publish()
+        return len(set(doomed))
+
+    @staticmethod
+    def _scales_of(codec: Codec, scales: Optional[np.ndarray], rows) -> Optional[np.ndarray]:
+        return scales[rows] if codec.scaled else None
+
+    def get(self, entry_id: int) -> np.ndarray:
+        """Returns the decoded (approximate) embedding stored for an entry id."""
+        codec, codes, scales, _, size, row_of = self._view
+        row = row_of.get(int(entry_id))
+        if row is None or row >= size:
+            raise KeyError(f"Entry id {entry_id} not found in the matrix.")
+        return codec.decode(codes[row:row + 1], self._scales_of(codec, scales, [row]))[0]
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Decoded copy of every row; prefer `search` for scoring."""
+        codec, codes, scales, _, size, _ = self._view
+        if codes is None or size == 0:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return codec.decode(codes[:size], self._scales_of(codec, scales, slice(0, size)))
+
+    @property
+    def ids(self) -> np.ndarray:
+        _, _, _, ids, size, _ = self._view
+        return ids[:size]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the populated codes and scales."""
+        codec, codes, _, _, size, _ = self._view
+        if codes is None:
+            return 0
+        scale_bytes = size * 4 if codec.scaled else 0
+        return codes[:size].nbytes + scale_bytes
+
+    def search(
+        self,
+        query: np.ndarray,
+        top_k: Optional[int] = None,
+        threshold: Optional[float] = None,
+        entry_ids: Optional[Iterable[int]] = None,
+    ) -> List[Tuple[int, float]]:
+        """
+        Scores the codes against the query and returns (entry_id, score) pairs, best first. With a
+        rerank source the candidates are re-scored exactly before the threshold and top_k cut.
+        """
+        codec, codes, scales, all_ids, size, row_of = self._view
+        if size == 0 or top_k == 0:
+            return []
+
+        query = self.normalize(query).reshape(-1)
+        if entry_ids is None:
+            ids = all_ids[:size]
+            scores = codec.score(codes[:size], self._scales_of(codec, scales, slice(0, size)), query)
+        else:
+            found = (row_of.get(int(entry_id)) for entry_id in entry_ids)
+            rows = np.fromiter((row for row in found if row is not None and row < size), dtype=np.int64)
+            if rows.size == 0:
+                return []
+            ids = all_ids[rows]
+            scores = codec.score(codes[rows], self._scales_of(codec, scales, rows), query)
+
+        rerank = self.rerank_source is not None and self.rerank_factor > 0 and codec.name != "float32"
+        if rerank:
+            # Over-fetch on approximate scores, then let exact scores decide
+            depth = None if top_k is None else top_k * self.rerank_factor
+            candidates = _top(scores, depth, None if threshold is None else threshold - RERANK_SLACK)
+            ids = ids[candidates]
+            scores = self.normalize(self.rerank_source(ids.tolist())) @ query
+
+        keep = _top(scores, top_k, threshold)
+        return [(int(ids[i]), float(scores[i])) for i in keep]
+
+    def clear(self) -> None:
+        """Drops every row but keeps the dimension and any trained codec."""
+        self._codes = None
+        self._scales = None
+        self._ids = np.empty(0, dtype=np.int64)
+        self._size = 0
+        self._row_of = {}
+        self._publish()
+
+    def __len__(self) -> int:
+        return self._view[4]
+
+    def __contains__(self, entry_id: int) -> bool:
+        _, _, _, _, size, row_of = self._view
+        return row_of.get(int(entry_id), size) < size
+
+
+def _top(scores: np.ndarray, top_k: Optional[int], threshold: Optional[float]) -> np.ndarray:
+    """Positions of the best scores strictly above the threshold, best first."""
+    positions = np.arange(scores.size) if threshold is None else np.flatnonzero(scores > threshold)
+    if top_k is not None and top_k < positions.size:
+        positions = positions[np.argpartition(-scores[positions], top_k - 1)[:top_k]]
+    return positions[np.argsort(-scores[positions], kind="stable")]
+
+
+def create_matrix(codec: Optional[str] = None, **params) -> Union[EmbeddingMatrix, QuantizedMatrix]:
+    """
+    Builds the embedding matrix for a storage. The codec defaults to the MEMGPT_EMBEDDING_CODEC
+    environment variable, then to 'float32' (a plain EmbeddingMatrix).
+    """
+    codec = (codec or os.getenv("MEMGPT_EMBEDDING_CODEC", "float32")).lower()
+    if codec == "float32":
+        return EmbeddingMatrix()
+    if codec == "pq":
+        params.setdefault("subspaces", int(os.getenv("MEMGPT_PQ_SUBSPACES", 0)) or None)
+    if os.getenv("MEMGPT_RERANK_FACTOR"):
+        params.setdefault("rerank_factor", int(os.getenv("MEMGPT_RERANK_FACTOR")))
+    return QuantizedMatrix(codec, **params)
@@ -0,0 +1,157 @@
+# memory/storage/vector_file.py
+
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from memory.snapshot import atomic_write
+from utils.logger import logger
+
+
+class VectorFile:
+    """
+    Append-only on-disk store for embeddings and their metadata.
+
+    `<base>.f32` holds raw float32 rows and is opened with np.memmap, `<base>.meta.jsonl`
+    holds one JSON object per row, and `<base>.header.json` records how many rows (and
+    sidecar bytes) are committed, along with the write-ahead log sequence number the rows
+    cover. The header is written last, so a torn append is ignored
+    on load and truncated away by the next write. A rewrite writes a new generation of the
+    data files (`<base>.<n>.f32`, `<base>.<n>.meta.jsonl`) next to the committed one and
+    switches the header to it, so a crash at any point leaves one complete generation.
+    """
+
+    def __init__(self, base_path: str):
+        self.base_path = base_path
+        self.header_path = f"{base_path}.header.json"
+
+    def _paths(self, generation: int) -> Tuple[str, str]:
+        """Data and metadata files of a generation; generation 0 keeps the original unnumbered names."""
+        base = self.base_path if generation == 0 else f"{self.base_path}.{generation}"
+        return f"{base}.f32", f"{base}.meta.jsonl"
+
+    @property
+    def data_path(self) -> str:
+        return self._paths(self._read_header().get("generation", 0))[0]
+
+    @property
+    def meta_path(self) -> str:
+        return self._paths(self._read_header().get("generation", 0))[1]
+
+    def exists(self) -> bool:
+        return os.path.exists(self.header_path)
+
+    def _read_header(self) -> Dict[str, Any]:
+        try:
+            with open(self.header_path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"dim": None, "rows": 0, "meta_bytes": 0}
+
+    def _write_header(self, dim: Optional[int], rows: int, meta_bytes: int, generation: int = 0, seq: int = 0) -> None:
+        header = {"version": 1, "dim": dim, "rows": rows, "meta_bytes": meta_bytes, "generation": generation, "seq": seq}
+        atomic_write(self.header_path, json.dumps(header).encode("utf-8"))
+
+    @staticmethod
+    def _write_at(path: str, offset: int, payload: bytes) -> None:
+        """Truncates the file to `offset`, writes the payload there and fsyncs it."""
+        with open(path, "ab") as f:
+            f.truncate(offset)
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+
+    @property
+    def rows(self) -> int:
+        """Number of committed rows."""
+        return self._read_header()["rows"]
+
+    @property
+    def seq(self) -> int:
+        """Last write-ahead log sequence number reflected in the committed rows (0 if unknown)."""
+        return self._read_header().get("seq", 0)
+
+    def mark_seq(self, seq: int) -> None:
+        """Records that the committed rows already reflect the log up to `seq`."""
+        header = self._read_header()
+        self._write_header(header["dim"], header["rows"], header["meta_bytes"], header.get("generation", 0), seq)
+
+    def map_vectors(self) -> Optional[np.ndarray]:
+        """Maps the committed embeddings read-only without parsing the metadata sidecar."""
+        header = self._read_header()
+        if header["rows"] == 0 or header["dim"] is None:
+            return None
+        data_path, _ = self._paths(header.get("generation", 0))
+        return np.memmap(data_path, dtype=np.float32, mode="r", shape=(header["rows"], header["dim"]))
+
+    def load(self) -> Tuple[Optional[np.ndarray], List[Dict[str, Any]]]:
+        """Maps the committed embeddings (copy-on-write) and parses the metadata sidecar."""
+        header = self._read_header()
+        rows, dim = header["rows"], header["dim"]
+        if rows == 0 or dim is None:
+            return None, []
+
+        data_path, meta_path = self._paths(header.get("generation", 0))
+        vectors = np.memmap(data_path, dtype=np.float32, mode="c", shape=(rows, dim))
+        with open(meta_path, "rb") as f:
+            raw = f.read(header["meta_bytes"])
+        metadata = [json.loads(line) for line in raw.splitlines() if line]
+        if len(metadata) != rows:
+            raise ValueError(f"{meta_path} has {len(metadata)} rows, header expects {rows}.")
+        return vectors, metadata
+
+    def append(self, vectors: np.ndarray, metadata: List[Dict[str, Any]], seq: Optional[int] = None) -> None:
+        """Appends rows after the committed ones; nothing already on disk is rewritten."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if len(metadata) != len(vectors):
+            raise ValueError("Vectors and metadata must have the same number of rows.")
+        if not metadata:
+            return
+
+        header = self._read_header()
+        dim = header["dim"] or vectors.shape[1]
+        if vectors.shape[1] != dim:
+            raise ValueError(f"Vector dimension {vectors.shape[1]} does not match file dimension {dim}.")
+
+        generation = header.get("generation", 0)
+        data_path, meta_path = self._paths(generation)
+        meta_offset = header["meta_bytes"]
+        lines = self._lines(metadata)
+
+        # Truncate anything written by an append that never committed its header
+        # and make the rows durable before the header points at them
+        self._write_at(data_path, header["rows"] * dim * 4, vectors.tobytes())
+        self._write_at(meta_path, meta_offset, lines)
+
+        seq = header.get("seq", 0) if seq is None else seq
+        self._write_header(dim, header["rows"] + len(metadata), meta_offset + len(lines), generation, seq)
+        logger.debug(f"Appended {len(metadata)} rows to {self.base_path}")
+
+    def rewrite(self, vectors: Optional[np.ndarray], metadata: List[Dict[str, Any]], seq: Optional[int] = None) -> None:
+        """Replaces the whole file, used after deletes or in-place edits; the old rows stay committed until the switch."""
+        header = self._read_header()
+        old_generation = header.get("generation", 0)
+        generation = old_generation + 1
+        data_path, meta_path = self._paths(generation)
+
+        dim, lines = None, b""
+        if metadata:
+            vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+            if len(metadata) != len(vectors):
+                raise ValueError("Vectors and metadata must have the same number of rows.")
+            dim = vectors.shape[1]
+            lines = self._lines(metadata)
+        self._write_at(data_path, 0, vectors.tobytes() if metadata else b"")
+        self._write_at(meta_path, 0, lines)
+        seq = header.get("seq", 0) if seq is None else seq
+        self._write_header(dim, len(metadata), len(lines), generation, seq)
+
+        # The header no longer points at the previous generation
+        for path in self._paths(old_generation):
+            if os.path.exists(path):
+                os.remove(path)
+        logger.debug(f"Rewrote {self.base_path} with {len(metadata)} rows (generation {generation})")
+
+    @staticmethod
+    def _lines(metadata: List[Dict[str, Any]]) -> bytes:
+        return b"".join(json.dumps(item, default=str).encode("utf-8") + b"\n" for item in metadata)
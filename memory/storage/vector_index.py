@@ -0,0 +1,349 @@
+# memory/storage/vector_index.py
+
+import functools
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from memory.storage.embedding_matrix import EmbeddingMatrix
+from utils.logger import logger
+
+faiss = None
+
+INDEX_KINDS = ("exact", "flat", "ivf", "hnsw")
+
+
+def _import_faiss():
+    """Imports faiss on first use; it is optional and slow to import. Returns None when missing."""
+    global faiss
+    if faiss is None:
+        try:
+            import faiss as faiss_module
+        except ImportError:  # faiss-cpu is optional, the exact index works without it
+            return None
+        faiss = faiss_module
+    return faiss
+
+
+class VectorIndex:
+    """Common interface for cosine-similarity indexes keyed by integer ids."""
+
+    kind = "base"
+
+    def add(self, ids: Iterable[int], vectors: np.ndarray) -> None:
+        raise NotImplementedError
+
+    def remove(self, ids: Iterable[int]) -> int:
+        raise NotImplementedError
+
+    def search(self, query: np.ndarray, top_k: Optional[int] = None, threshold: Optional[float] = None) -> List[Tuple[int, float]]:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def save(self, path: str) -> None:
+        raise NotImplementedError
+
+    def load(self, path: str) -> bool:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class ExactIndex(VectorIndex):
+    """Brute-force index backed by an EmbeddingMatrix; also the baseline for recall checks."""
+
+    kind = "exact"
+
+    def __init__(self, matrix: Optional[EmbeddingMatrix] = None):
+        self.matrix = matrix if matrix is not None else EmbeddingMatrix()
+
+    def add(self, ids: Iterable[int], vectors: np.ndarray) -> None:
+        self.matrix.add_batch(ids, vectors)
+
+    def remove(self, ids: Iterable[int]) -> int:
+        return self.matrix.remove(ids)
+
+    def search(self, query: np.ndarray, top_k: Optional[int] = None, threshold: Optional[float] = None) -> List[Tuple[int, float]]:
+        return self.matrix.search(query, top_k=top_k, threshold=threshold)
+
+    def clear(self) -> None:
+        self.matrix.clear()
+
+    def save(self, path: str) -> None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, ids=self.matrix.ids, vectors=self.matrix.vectors)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> bool:
+        if not os.path.exists(path):
+            return False
+        with np.load(path) as data:
+            self.matrix.clear()
+            self.matrix.add_batch(data["ids"].tolist(), data["vectors"])
+        return True
+
+    def __len__(self) -> int:
+        return len(self.matrix)
+
+
+def _synchronized(method):
+    """Runs a FaissIndex method under the index lock: FAISS indexes must not be searched while they change."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class FaissIndex(VectorIndex):
+    """
+    Approximate index on top of FAISS. Supports flat (exact inner product), IVF and HNSW layouts.
+    Vectors are normalised on the way in so inner product equals cosine similarity.
+    Unlike ExactIndex, searches take the index lock since FAISS structures are mutated in place.
+    """
+
+    def __init__(
+        self,
+        kind: str = "hnsw",
+        nlist: int = 256,
+        nprobe: int = 16,
+        train_factor: int = 39,
+        hnsw_m: int = 32,
+        ef_construction: int = 200,
+        ef_search: int = 64,
+    ):
+        if _import_faiss() is None:
+            raise ImportError("faiss is required for the flat, ivf and hnsw index kinds (pip install faiss-cpu).")
+        if kind not in ("flat", "ivf", "hnsw"):
+            raise ValueError(f"Unknown FAISS index kind '{kind}'.")
+        self.kind = kind
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_factor = train_factor
+        self.hnsw_m = hnsw_m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.dim: Optional[int] = None
+        self.index = None
+        # IVF needs training data: vectors are buffered here until there are enough of them
+        self._pending_ids: List[int] = []
+        self._pending: List[np.ndarray] = []
+        # HNSW cannot delete in place, removed ids are filtered out until the next rebuild
+        self._deleted: set = set()
+        self._lock = threading.RLock()
+
+    def _build(self, dim: int) -> None:
+        self.dim = dim
+        if self.kind == "flat":
+            self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+        elif self.kind == "ivf":
+            quantizer = faiss.IndexFlatIP(dim)
+            self.index = faiss.IndexIVFFlat(quantizer, dim, self.nlist, faiss.METRIC_INNER_PRODUCT)
+            self.index.set_direct_map_type(faiss.DirectMap.Hashtable)
+        else:
+            hnsw = faiss.IndexHNSWFlat(dim, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            hnsw.hnsw.efConstruction = self.ef_construction
+            self.index = faiss.IndexIDMap2(hnsw)
+        self.set_search_params()
+
+    def set_search_params(self, nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> None:
+        """Adjusts the recall/latency trade-off of an already built index."""
+        self.nprobe = nprobe or self.nprobe
+        self.ef_search = ef_search or self.ef_search
+        if self.index is None:
+            return
+        if self.kind == "ivf":
+            self.index.nprobe = self.nprobe
+        elif self.kind == "hnsw":
+            faiss.downcast_index(self.index.index).hnsw.efSearch = self.ef_search
+
+    def _train_if_ready(self) -> None:
+        if self.index.is_trained or len(self._pending) < self.nlist * self.train_factor:
+            return
+        vectors = np.vstack(self._pending)
+        self.index.train(vectors)
+        self.index.add_with_ids(vectors, np.asarray(self._pending_ids, dtype=np.int64))
+        self._pending_ids, self._pending = [], []
+        logger.info(f"Trained IVF index with {len(vectors)} vectors")
+
+    @_synchronized
+    def add(self, ids: Iterable[int], vectors: np.ndarray) -> None:
+        ids = np.asarray(list(ids), dtype=np.int64)
+        if ids.size == 0:
+            return
+        vectors = EmbeddingMatrix.normalize(np.asarray(vectors, dtype=np.float32).reshape(ids.size, -1))
+        if self.index is None:
+            self._build(vectors.shape[1])
+        self._deleted.difference_update(ids.tolist())
+
+        if self.kind == "ivf" and not self.index.is_trained:
+            self._pending_ids.extend(ids.tolist())
+            self._pending.extend(vectors)
+            self._train_if_ready()
+            return
+        self.index.add_with_ids(vectors, ids)
+
+    @_synchronized
+    def remove(self, ids: Iterable[int]) -> int:
+        ids = [int(entry_id) for entry_id in ids]
+        if self.index is None or not ids:
+            return 0
+
+        removed = 0
+        if self._pending_ids:
+            doomed = set(ids)
+            keep = [i for i, entry_id in enumerate(self._pending_ids) if entry_id not in doomed]
+            removed += len(self._pending_ids) - len(keep)
+            self._pending_ids = [self._pending_ids[i] for i in keep]
+            self._pending = [self._pending[i] for i in keep]
+
+        if self.kind == "hnsw":
+            before = len(self._deleted)
+            self._deleted.update(ids)
+            removed += len(self._deleted) - before
+            if len(self._deleted) > 0.2 * max(self.index.ntotal, 1):
+                self.rebuild()
+        else:
+            removed += int(self.index.remove_ids(np.asarray(ids, dtype=np.int64)))
+        return removed
+
+    @_synchronized
+    def rebuild(self) -> None:
+        """Rebuilds the index from its live vectors, dropping HNSW tombstones."""
+        if self.index is None:
+            return
+        all_ids = faiss.vector_to_array(self.index.id_map) if self.kind != "ivf" else None
+        if all_ids is None:
+            return
+        live = np.asarray([entry_id for entry_id in all_ids.tolist() if entry_id not in self._deleted], dtype=np.int64)
+        vectors = np.vstack([self.index.reconstruct(int(entry_id)) for entry_id in live]) if live.size else None
+        self._build(self.dim)
+        self._deleted.clear()
+        if vectors is not None:
+            self.index.add_with_ids(vectors, live)
+
+    @_synchronized
+    def search(self, query: np.ndarray, top_k: Optional[int] = None, threshold: Optional[float] = None) -> List[Tuple[int, float]]:
+        if len(self) == 0 or top_k == 0:
+            return []
+        query = EmbeddingMatrix.normalize(query).reshape(1, -1)
+        wanted = len(self) if top_k is None else min(top_k, len(self))
+
+        results: Dict[int, float] = {}
+        if self.index.ntotal:
+            k = min(wanted + len(self._deleted), self.index.ntotal)
+            scores, ids = self.index.search(query, k)
+            for entry_id, score in zip(ids[0].tolist(), scores[0].tolist()):
+                if entry_id != -1 and entry_id not in self._deleted:
+                    results[entry_id] = score
+        if self._pending:
+            # Untrained IVF: score the buffered vectors exactly
+            pending_scores = np.vstack(self._pending) @ query[0]
+            for entry_id, score in zip(self._pending_ids, pending_scores.tolist()):
+                results[entry_id] = score
+
+        matches = sorted(results.items(), key=lambda item: item[1], reverse=True)
+        if threshold is not None:
+            matches = [(entry_id, score) for entry_id, score in matches if score > threshold]
+        return matches[:wanted]
+
+    @_synchronized
+    def clear(self) -> None:
+        if self.dim is not None:
+            self._build(self.dim)
+        self._pending_ids, self._pending = [], []
+        self._deleted.clear()
+
+    @_synchronized
+    def save(self, path: str) -> None:
+        if self.index is None:
+            return
+        faiss.write_index(self.index, path)
+        meta = {
+            "kind": self.kind,
+            "dim": self.dim,
+            "deleted": sorted(self._deleted),
+            "pending_ids": self._pending_ids,
+        }
+        with open(f"{path}.meta.json", "w") as f:
+            json.dump(meta, f)
+        if self._pending:
+            np.save(f"{path}.pending.npy", np.vstack(self._pending))
+
+    @_synchronized
+    def load(self, path: str) -> bool:
+        if not os.path.exists(path) or not os.path.exists(f"{path}.meta.json"):
+            return False
+        with open(f"{path}.meta.json", "r") as f:
+            meta = json.load(f)
+        if meta.get("kind") != self.kind:
+            logger.warning(f"Index at {path} is '{meta.get('kind')}', expected '{self.kind}'. Ignoring it.")
+            return False
+
+        self.index = faiss.read_index(path)
+        self.dim = meta["dim"]
+        self._deleted = set(meta.get("deleted", []))
+        self._pending_ids = meta.get("pending_ids", [])
+        self._pending = list(np.load(f"{path}.pending.npy")) if self._pending_ids else []
+        self.set_search_params()
+        return True
+
+    def __len__(self) -> int:
+        total = self.index.ntotal if self.index is not None else 0
+        return total - len(self._deleted) + len(self._pending_ids)
+
+
+def create_index(kind: Optional[str] = None, matrix: Optional[EmbeddingMatrix] = None, **params) -> VectorIndex:
+    """
+    Builds a vector index. The kind defaults to the MEMGPT_VECTOR_INDEX environment variable,
+    then to 'exact'. ANN kinds fall back to the exact index when faiss is not installed.
+    """
+    kind = (kind or os.getenv("MEMGPT_VECTOR_INDEX", "exact")).lower()
+    if kind not in INDEX_KINDS:
+        raise ValueError(f"Unknown vector index kind '{kind}'. Expected one of {INDEX_KINDS}.")
+    if kind == "exact":
+        return ExactIndex(matrix)
+    if _import_faiss() is None:
+        logger.warning(f"faiss is not installed, using the exact index instead of '{kind}'.")
+        return ExactIndex(matrix)
+    return FaissIndex(kind, **params)
+
+
+def measure_recall(index: VectorIndex, baseline: VectorIndex, queries: Sequence[np.ndarray], top_k: int = 10) -> float:
+    """Fraction of the exact top_k neighbours that the index also returns, averaged over the queries."""
+    hits, expected = 0, 0
+    for query in queries:
+        truth = {entry_id for entry_id, _ in baseline.search(query, top_k=top_k)}
+        if not truth:
+            continue
+        found = {entry_id for entry_id, _ in index.search(query, top_k=top_k)}
+        hits += len(truth & found)
+        expected += len(truth)
+    return hits / expected if expected else 1.0
+
+
+def tune_recall(
+    index: VectorIndex,
+    baseline: VectorIndex,
+    queries: Sequence[np.ndarray],
+    target_recall: float = 0.95,
+    top_k: int = 10,
+    max_steps: int = 8,
+) -> float:
+    """Doubles nprobe / efSearch until the index reaches the target recall against the baseline."""
+    recall = measure_recall(index, baseline, queries, top_k)
+    if not isinstance(index, FaissIndex):
+        return recall
+
+    for _ in range(max_steps):
+        if recall >= target_recall:
+            break
+        index.set_search_params(nprobe=min(index.nprobe * 2, index.nlist), ef_search=index.ef_search * 2)
+        recall = measure_recall(index, baseline, queries, top_k)
+    logger.info(f"Index '{index.kind}' recall@{top_k}={recall:.3f} (nprobe={index.nprobe}, efSearch={index.ef_search})")
+    return recall
@@ -0,0 +1,187 @@
+# memory/storage/write_ahead_log.py
+
+import base64
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+from utils.logger import logger
+
+FSYNC_POLICIES = ("always", "interval", "off")
+
+
+def encode_vector(vector: np.ndarray) -> str:
+    """Packs a float32 vector into a compact base64 string for a log record."""
+    return base64.b64encode(np.ascontiguousarray(vector, dtype=np.float32).tobytes()).decode("ascii")
+
+
+def decode_vector(data: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(data), dtype=np.float32)
+
+
+class WriteAheadLog:
+    """
+    Append-only JSON-lines log of memory mutations.
+
+    Every record gets a sequence number. `checkpoint()` stores the last sequence number
+    covered by a snapshot and truncates the log, so replay after a crash only applies
+    records newer than the snapshot. fsync can happen per write ("always"), at most once
+    per fsync_interval from a background thread ("interval"), or be left to the OS ("off").
+    """
+
+    def __init__(self, path: str, fsync: str = "interval", fsync_interval: float = 1.0):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy '{fsync}'. Expected one of {FSYNC_POLICIES}.")
+        self.path = path
+        self.checkpoint_path = f"{path}.checkpoint"
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._file = None
+        self._seq: Optional[int] = None
+        self._unsynced = False
+        self._last_sync = time.monotonic()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _read_checkpoint(self) -> int:
+        try:
+            with open(self.checkpoint_path, "r") as f:
+                return json.load(f)["seq"]
+        except (FileNotFoundError, ValueError, KeyError):
+            return 0
+
+    def _scan(self) -> List[Dict[str, Any]]:
+        """Reads every intact record and cuts off a torn tail left by a crash mid-write. Caller holds the lock."""
+        records, good_bytes = [], 0
+        try:
+            with open(self.path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        break
+                    good_bytes += len(line)
+        except FileNotFoundError:
+            pass
+
+        if os.path.exists(self.path) and os.path.getsize(self.path) != good_bytes:
+            logger.warning(f"Truncating torn write-ahead log tail in {self.path}")
+            with open(self.path, "r+b") as f:
+                f.truncate(good_bytes)
+
+        checkpoint = self._read_checkpoint()
+        self._seq = max([checkpoint] + [record["seq"] for record in records])
+        return [record for record in records if record["seq"] > checkpoint]
+
+    def replay(self) -> List[Dict[str, Any]]:
+        """Records written after the last checkpoint, oldest first."""
+        with self._lock:
+            return self._scan()
+
+    @property
+    def last_seq(self) -> int:
+        """Sequence number of the newest record written (or checkpointed)."""
+        with self._lock:
+            if self._seq is None:
+                self._scan()
+            return self._seq
+
+    def append(self, record: Dict[str, Any]) -> int:
+        """Appends one mutation record and returns its sequence number."""
+        with self._lock:
+            if self._seq is None:
+                self._scan()
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.path, "ab")
+
+            self._seq += 1
+            line = json.dumps({"seq": self._seq, **record}, default=str).encode("utf-8") + b"\n"
+            self._file.write(line)
+            self._file.flush()
+            if self.fsync == "always":
+                os.fsync(self._file.fileno())
+            else:
+                self._unsynced = True
+            return self._seq
+
+    def sync(self) -> None:
+        """fsyncs records written since the last sync."""
+        with self._lock:
+            if self._file is not None and self._unsynced:
+                if self.fsync != "off":
+                    os.fsync(self._file.fileno())
+                self._unsynced = False
+            self._last_sync = time.monotonic()
+
+    def checkpoint(self) -> None:
+        """Marks every record so far as covered by a snapshot and empties the log."""
+        with self._lock:
+            if self._seq is None:
+                self._scan()
+            tmp_path = f"{self.checkpoint_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"seq": self._seq}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.checkpoint_path)
+
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if os.path.exists(self.path):
+                os.truncate(self.path, 0)
+            self._unsynced = False
+
+    @property
+    def size(self) -> int:
+        """Bytes currently in the log."""
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    def start(self, compact: Callable[[], None], compact_interval: float = 60.0, compact_bytes: int = 16 * 1024 * 1024) -> None:
+        """Starts the background thread that handles interval fsyncs and periodic compaction."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(compact, compact_interval, compact_bytes),
+            name=f"wal-{os.path.basename(self.path)}", daemon=True,
+        )
+        self._thread.start()
+
+    def _run(self, compact: Callable[[], None], compact_interval: float, compact_bytes: int) -> None:
+        last_compaction = time.monotonic()
+        while not self._stop.wait(min(self.fsync_interval, compact_interval)):
+            if self.fsync == "interval" and time.monotonic() - self._last_sync >= self.fsync_interval:
+                self.sync()
+
+            size = self.size
+            due = time.monotonic() - last_compaction >= compact_interval
+            if size and (due or size >= compact_bytes):
+                try:
+                    compact()
+                except Exception as e:
+                    logger.error(f"Background compaction of {self.path} failed: {e}")
+                last_compaction = time.monotonic()
+
+    def close(self) -> None:
+        """Stops the background thread and flushes anything outstanding."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.sync()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,106 @@
+# memory/text_index.py
+
+import re
+from typing import Dict, Iterable, List, Set
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+class NGramIndex:
+    """
+    Incrementally maintained inverted index over lowercased text, keyed by document id.
+
+    Character n-grams answer case-insensitive substring queries: a document can only contain
+    the query if it contains every n-gram of the query, so only the intersection of those
+    posting lists is verified. A word-token index answers term queries.
+    """
+
+    def __init__(self, n: int = 3):
+        if n < 1:
+            raise ValueError("n must be at least 1")
+        self.n = n
+        self._texts: Dict[int, str] = {}
+        self._grams: Dict[str, Set[int]] = {}
+        self._tokens: Dict[str, Set[int]] = {}
+
+    def _ngrams(self, text: str) -> Set[str]:
+        return {text[i:i + self.n] for i in range(len(text) - self.n + 1)}
+
+    def add(self, doc_id: int, text: str) -> None:
+        """Indexes a document, replacing any earlier text stored under the same id."""
+        if doc_id in self._texts:
+            self.remove(doc_id)
+        lowered = text.lower()
+        self._texts[doc_id] = lowered
+        for gram in self._ngrams(lowered):
+            self._grams.setdefault(gram, set()).add(doc_id)
+        for token in set(TOKEN_PATTERN.findall(lowered)):
+            self._tokens.setdefault(token, set()).add(doc_id)
+
+    def remove(self, doc_id: int) -> None:
+        lowered = self._texts.pop(doc_id, None)
+        if lowered is None:
+            return
+        for postings, keys in ((self._grams, self._ngrams(lowered)), (self._tokens, set(TOKEN_PATTERN.findall(lowered)))):
+            for key in keys:
+                ids = postings.get(key)
+                if ids is not None:
+                    ids.discard(doc_id)
+                    if not ids:
+                        del postings[key]
+
+    def clear(self) -> None:
+        self._texts.clear()
+        self._grams.clear()
+        self._tokens.clear()
+
+    def text(self, doc_id: int) -> str:
+        """The lowercased text indexed for a document."""
+        return self._texts[doc_id]
+
+    @staticmethod
+    def _intersect(postings: Iterable[Set[int]]) -> Set[int]:
+        postings = sorted(postings, key=len)
+        if not postings:
+            return set()
+        result = set(postings[0])
+        for ids in postings[1:]:
+            result &= ids
+            if not result:
+                break
+        return result
+
+    def search(self, query: str) -> List[int]:
+        """Ids of documents containing the query as a case-insensitive substring, in id order."""
+        query = query.lower()
+        if len(query) < self.n:
+            # Too short to have an n-gram; the cached lowercase text still spares re-lowering every document
+            return [doc_id for doc_id, text in sorted(self._texts.items()) if query in text]
+
+        postings = []
+        for gram in self._ngrams(query):
+            ids = self._grams.get(gram)
+            if not ids:
+                return []
+            postings.append(ids)
+        candidates = self._intersect(postings)
+        return sorted(doc_id for doc_id in candidates if query in self._texts[doc_id])
+
+    def search_terms(self, query: str) -> List[int]:
+        """Ids of documents containing every word of the query as a whole token, in id order."""
+        tokens = set(TOKEN_PATTERN.findall(query.lower()))
+        if not tokens:
+            return []
+        postings = []
+        for token in tokens:
+            ids = self._tokens.get(token)
+            if not ids:
+                return []
+            postings.append(ids)
+        return sorted(self._intersect(postings))
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def __contains__(self, doc_id: int) -> bool:
+        return doc_id in self._texts
@@ -0,0 +1,54 @@
+# memory/time_index.py
+
+import bisect
+import datetime
+from typing import List, Tuple
+
+
+class TimeIndex:
+    """Document ids kept sorted by timestamp so range queries are answered by bisection."""
+
+    def __init__(self):
+        self._times: List[datetime.datetime] = []
+        self._ids: List[int] = []
+
+    def add(self, doc_id: int, timestamp: datetime.datetime) -> None:
+        """Inserts a document; in-order timestamps append at the end without shifting anything."""
+        position = bisect.bisect_right(self._times, timestamp)
+        self._times.insert(position, timestamp)
+        self._ids.insert(position, doc_id)
+
+    def remove(self, doc_id: int, timestamp: datetime.datetime) -> None:
+        start = bisect.bisect_left(self._times, timestamp)
+        end = bisect.bisect_right(self._times, timestamp)
+        for position in range(start, end):
+            if self._ids[position] == doc_id:
+                del self._times[position]
+                del self._ids[position]
+                return
+
+    def clear(self) -> None:
+        self._times.clear()
+        self._ids.clear()
+
+    def range(self, start: datetime.datetime, end: datetime.datetime) -> List[int]:
+        """Ids with start <= timestamp <= end, oldest first."""
+        return self._ids[bisect.bisect_left(self._times, start):bisect.bisect_right(self._times, end)]
+
+    def range_items(self, start: datetime.datetime, end: datetime.datetime) -> Tuple[List[int], List[datetime.datetime]]:
+        """Like `range`, with the timestamps alongside the ids."""
+        low, high = bisect.bisect_left(self._times, start), bisect.bisect_right(self._times, end)
+        return self._ids[low:high], self._times[low:high]
+
+    def latest(self, count: int) -> List[int]:
+        """Ids of the `count` most recent documents, newest first."""
+        return self.latest_items(count)[0]
+
+    def latest_items(self, count: int) -> Tuple[List[int], List[datetime.datetime]]:
+        """Ids and timestamps of the `count` most recent documents, newest first."""
+        if count <= 0:
+            return [], []
+        return self._ids[-count:][::-1], self._times[-count:][::-1]
+
+    def __len__(self) -> int:
+        return len(self._ids)
@@ -0,0 +1,24 @@
+# tests/conftest.py
+
+import hashlib
+import numpy as np
+import pytest
+from memory.embeddings import EmbeddingModel
+
+
+class HashEmbeddingModel(EmbeddingModel):
+    """Deterministic offline embeddings: one bucket per word."""
+
+    def _request_embeddings(self, texts):
+        vectors = []
+        for text in texts:
+            vector = np.full(32, 0.01, dtype=np.float32)
+            for word in text.lower().split():
+                vector[int(hashlib.md5(word.encode()).hexdigest(), 16) % 32] += 1
+            vectors.append(vector)
+        return vectors
+
+
+@pytest.fixture
+def embedding_model():
+    return HashEmbeddingModel(use_cache=False, coalesce=False)
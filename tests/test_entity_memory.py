@@ -0,0 +1,23 @@
+# tests/test_entity_memory.py
+
+from memory.entity_memory import EntityMemory, EntityMemoryItem
+from memory.storage.memory_store import MemoryStore
+
+
+def test_graph_follows_same_size_changes(tmp_path, embedding_model):
+    store = MemoryStore(embedding_model=embedding_model, data_dir=str(tmp_path))
+    memory = EntityMemory("persona", "human", store.persistence_manager, store=store)
+    store.load()
+    try:
+        memory.save(EntityMemoryItem("Alice", "person", "an engineer", "works_at: Acme"))
+        memory.save(EntityMemoryItem("Bob", "person", "a designer", ""))
+        assert [entity["name"] for entity in memory.lookup(["Alice", "Bob"])] == ["Alice", "Bob"]
+
+        # Delete one entity and add another: the entry count is unchanged
+        alice = next(entry["id"] for entry in memory.storage.storage if entry["metadata"]["name"] == "Alice")
+        memory.storage.delete([alice])
+        memory.save(EntityMemoryItem("Carol", "person", "a manager", ""))
+
+        assert [entity["name"] for entity in memory.lookup(["Alice", "Bob", "Carol"])] == ["Bob", "Carol"]
+    finally:
+        store.close()
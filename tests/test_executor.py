@@ -0,0 +1,20 @@
+# tests/test_executor.py
+
+from memory.archival_memory import ArchivalMemory
+from memory.base_memory import BaseMemory
+from memory.executor import FunctionExecutor
+from memory.messages import RecallMemory
+
+
+def test_archival_index_follows_same_size_reload(embedding_model):
+    archival = ArchivalMemory()
+    executor = FunctionExecutor(BaseMemory(), archival, RecallMemory(), embedding_model=embedding_model)
+    for text in ("apples are red", "bananas are yellow"):
+        executor.execute_function({"name": "add_memory", "args": {"content": text}})
+    assert executor.search_archival_memory("apples", top_k=1)[0]["text"] == "apples are red"
+
+    # A reload refills the same list with as many entries
+    archival.clear()
+    archival.extend((text, embedding_model.embed(text)) for text in ("grapes are purple", "lemons are sour"))
+
+    assert executor.search_archival_memory("grapes", top_k=1)[0]["text"] == "grapes are purple"
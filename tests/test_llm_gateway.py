@@ -0,0 +1,67 @@
+# tests/test_llm_gateway.py
+
+import asyncio
+import time
+from types import SimpleNamespace
+import pytest
+from utils.llm_gateway import LLMGateway
+from utils.rate_limiter import RateLimiter
+from utils.rpc_controller import RPMController
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+class FakeCompletions:
+    async def create(self, model, messages, fail=False, delay=0.0, **params):
+        await asyncio.sleep(delay)
+        if fail:
+            raise RuntimeError("boom")
+        # No usage reported: the call is charged its estimate
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))], usage=None)
+
+
+@pytest.fixture
+def gateway():
+    gateway = LLMGateway(api_key="test", max_concurrency=1, cache=None, single_flight=False)
+    gateway._client = SimpleNamespace(chat=SimpleNamespace(completions=FakeCompletions()), close=lambda: asyncio.sleep(0))
+    # 10 tokens/s refill, so the checks below are not blurred by refills
+    gateway._limiters["m"] = RateLimiter(rpm=6000, tpm=600)
+    yield gateway
+    gateway.close()
+
+
+def _spent(limiter: RateLimiter) -> float:
+    return limiter.tokens.capacity - limiter.tokens.tokens
+
+
+def test_failed_calls_are_refunded(gateway):
+    limiter = gateway._limiters["m"]
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            gateway.complete(MESSAGES, model="m", fail=True)
+    assert _spent(limiter) == pytest.approx(0, abs=1)
+
+    gateway.complete(MESSAGES, model="m")
+    assert _spent(limiter) == pytest.approx(LLMGateway._estimate_tokens(MESSAGES, {}), abs=10)
+
+
+def test_call_cancelled_while_queued_is_refunded(gateway):
+    limiter = gateway._limiters["m"]
+    estimate = LLMGateway._estimate_tokens(MESSAGES, {})
+    running = gateway._submit(MESSAGES, "m", None, {"delay": 0.3}, None)
+    queued = gateway._submit(MESSAGES, "m", None, {}, None)  # Waits for the single concurrency slot
+    time.sleep(0.1)
+    queued.cancel()
+    assert running.result(timeout=5) == "ok"
+
+    time.sleep(0.05)
+    assert _spent(limiter) == pytest.approx(estimate, abs=10)
+
+
+def test_rpm_controller_zero_is_unlimited():
+    for limit in (0, None):
+        controller = RPMController(limit)
+        assert all(controller.allow_request() for _ in range(100))
+
+    controller = RPMController(2)
+    assert [controller.allow_request() for _ in range(3)] == [True, True, False]
@@ -0,0 +1,36 @@
+# tests/test_long_term_memory.py
+
+from memory.long_term_memory import LongTermMemory, LongTermMemoryItem
+from memory.storage.memory_store import MemoryStore
+
+
+def test_save_keeps_item_datetime(tmp_path, embedding_model):
+    store = MemoryStore(embedding_model=embedding_model, data_dir=str(tmp_path))
+    ltm = LongTermMemory("persona", "human", store.persistence_manager, store=store)
+    store.load()
+    try:
+        ltm.save(LongTermMemoryItem("agent", "book a flight to Paris", "booked", "2024-05-01T09:30:00"))
+        ltm.save(LongTermMemoryItem("agent", "book a hotel in Rome", "booked", None))
+
+        created = {entry["value"]: entry["created_at"] for entry in ltm.storage.storage}
+        assert created["book a flight to Paris"] == "2024-05-01T09:30:00"
+        assert created["book a hotel in Rome"] != "2024-05-01T09:30:00"
+    finally:
+        store.close()
+
+
+def test_search_only_scores_the_newest_candidates(tmp_path, embedding_model):
+    store = MemoryStore(embedding_model=embedding_model, data_dir=str(tmp_path))
+    ltm = LongTermMemory("persona", "human", store.persistence_manager, store=store)
+    store.load()
+    try:
+        ltm.save_batch([
+            LongTermMemoryItem("agent", "book a flight to Paris", "booked", "2024-05-01T09:30:00"),
+            LongTermMemoryItem("agent", "water the plants", "done", "2024-05-02T09:30:00"),
+        ])
+
+        capped = ltm.search("book a flight to Paris", max_candidates=1)
+        assert "book a flight to Paris" not in [entry["value"] for entry in capped]
+        assert ltm.search("book a flight to Paris", max_candidates=2)[0]["value"] == "book a flight to Paris"
+    finally:
+        store.close()
@@ -0,0 +1,52 @@
+# tests/test_persistence.py
+
+import numpy as np
+from memory.archival_memory import ArchivalMemory
+from memory.base_memory import BaseMemory
+from memory.messages import RecallMemory
+from memory.persistence import PersistenceManager
+
+
+def _manager() -> PersistenceManager:
+    return PersistenceManager(BaseMemory(), ArchivalMemory(), RecallMemory())
+
+
+def _add(manager: PersistenceManager, texts) -> None:
+    for i, text in enumerate(texts):
+        manager.archival_memory.append((text, np.full(4, i, dtype=np.float32)))
+
+
+def test_archival_clear_add_save_load(tmp_path):
+    path = str(tmp_path / "memgpt_state.json")
+    manager = _manager()
+    _add(manager, [f"old{i}" for i in range(3)])
+    manager.save(path)
+
+    # More entries than were saved after a clear: the old rows must not survive as a prefix
+    manager.archival_memory.clear()
+    _add(manager, [f"new{i}" for i in range(5)])
+    manager.save(path)
+
+    reloaded = _manager()
+    reloaded.load(path)
+    assert [memory for memory, _ in reloaded.archival_memory] == [f"new{i}" for i in range(5)]
+
+
+def test_archival_same_size_after_clear(tmp_path):
+    path = str(tmp_path / "memgpt_state.json")
+    manager = _manager()
+    _add(manager, ["a", "b"])
+    manager.save(path)
+    manager.archival_memory.clear()
+    _add(manager, ["c", "d"])
+    manager.save(path)
+
+    reloaded = _manager()
+    reloaded.load(path)
+    assert [memory for memory, _ in reloaded.archival_memory] == ["c", "d"]
+    # Appends after a load still go to the end of the file
+    _add(reloaded, ["e"])
+    reloaded.save(path)
+    final = _manager()
+    final.load(path)
+    assert [memory for memory, _ in final.archival_memory] == ["c", "d", "e"]
@@ -0,0 +1,41 @@
+# tests/test_plan_cache.py
+
+from memory.plan_cache import PlanCache
+
+BOOKING_PLAN = [
+    {
+        "description": "Book flight to Paris on 2024-05-01",
+        "tools": ["flight_booking"],
+        "dependencies": [],
+        "input_data": {"city": "Paris", "date": "2024-05-01"},
+    },
+]
+
+
+def test_changed_slots_are_rebound(embedding_model):
+    cache = PlanCache(embedding_model, threshold=0.3)
+    cache.store("Book a flight to Paris on 2024-05-01", "", {}, BOOKING_PLAN)
+
+    plan = cache.lookup("Book a flight to Rome on 2024-06-12", "", {})
+
+    assert plan[0]["description"] == "Book flight to Rome on 2024-06-12"
+    assert plan[0]["input_data"] == {"city": "Rome", "date": "2024-06-12"}
+    assert plan[0]["tools"] == ["flight_booking"]
+
+
+def test_changed_verb_is_a_miss(embedding_model):
+    cache = PlanCache(embedding_model, threshold=0.3)
+    cache.store("Book a flight to Paris on 2024-05-01", "", {}, BOOKING_PLAN)
+
+    assert cache.lookup("Cancel a flight to Paris on 2024-05-01", "", {}) is None
+    assert cache.stats["hits"] == 0
+
+
+def test_inferred_parameters_are_a_miss(embedding_model):
+    plan = [{"description": "Book flight to Paris", "tools": [], "dependencies": [], "input_data": {"airport": "CDG"}}]
+    cache = PlanCache(embedding_model, threshold=0.3)
+    cache.store("Book a flight to Paris", "", {}, plan)
+
+    # The airport was inferred from the city, so it cannot follow the city to Rome
+    assert cache.lookup("Book a flight to Rome", "", {}) is None
+    assert cache.lookup("Book a flight to Paris", "", {})[0]["input_data"] == {"airport": "CDG"}
@@ -0,0 +1,44 @@
+# tests/test_quantization.py
+
+import numpy as np
+import pytest
+from memory.storage.embedding_matrix import EmbeddingMatrix
+from memory.storage.quantization import QuantizedMatrix
+
+
+def _dataset(rows: int = 2000, dim: int = 64, queries: int = 50):
+    rng = np.random.default_rng(7)
+    centers = rng.normal(size=(20, dim))
+    vectors = centers[rng.integers(0, 20, rows)] + 0.5 * rng.normal(size=(rows, dim))
+    queries = centers[rng.integers(0, 20, queries)] + 0.5 * rng.normal(size=(queries, dim))
+    return vectors.astype(np.float32), queries.astype(np.float32)
+
+
+def _recall(matrix, exact, queries, top_k: int = 10) -> float:
+    hits = 0
+    for query in queries:
+        truth = {entry_id for entry_id, _ in exact.search(query, top_k=top_k)}
+        hits += len(truth & {entry_id for entry_id, _ in matrix.search(query, top_k=top_k)})
+    return hits / (top_k * len(queries))
+
+
+@pytest.mark.parametrize("codec, params, floor", [
+    ("int8", {}, 0.99),
+    ("pq", {"train_size": 512}, 0.95),
+])
+def test_rerank_recall(codec, params, floor):
+    vectors, queries = _dataset()
+    ids = list(range(len(vectors)))
+    exact = EmbeddingMatrix()
+    exact.add_batch(ids, vectors)
+    normalized = exact.vectors.copy()
+
+    matrix = QuantizedMatrix(codec, rerank_source=lambda entry_ids: normalized[entry_ids], **params)
+    matrix.add_batch(ids, vectors)
+    assert matrix.codec.name == codec
+    recall = _recall(matrix, exact, queries)
+    assert recall >= floor
+
+    # Re-ranked scores are the exact ones
+    entry_id, score = matrix.search(queries[0], top_k=1)[0]
+    assert score == pytest.approx(float(normalized[entry_id] @ EmbeddingMatrix.normalize(queries[0]).reshape(-1)), abs=1e-5)
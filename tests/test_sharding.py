@@ -0,0 +1,50 @@
+# tests/test_sharding.py
+
+import pytest
+from memory.sharding import MemoryShards
+
+
+class FakeShard:
+    def __init__(self, key: str):
+        self.key = key
+        self.closed = False
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def _shards(tmp_path, **kwargs) -> MemoryShards:
+    return MemoryShards(lambda key, data_dir: FakeShard(key), root=str(tmp_path), **kwargs)
+
+
+def test_least_recently_used_shard_is_closed(tmp_path):
+    shards = _shards(tmp_path, max_open=2)
+    a, b = shards.get("a"), shards.get("b")
+    shards.get("a")  # b is now the least recently used
+    c = shards.get("c")
+
+    assert sorted(shards.keys()) == ["a", "c"]
+    assert b.closed and not a.closed and not c.closed
+    assert shards.stats == {"opened": 3, "evicted": 1}
+
+
+def test_leased_shard_is_not_evicted_until_released(tmp_path):
+    shards = _shards(tmp_path, max_open=1)
+    a = shards.acquire("a")
+    b = shards.get("b")
+    assert not a.closed and len(shards) == 2
+
+    shards.release("a")
+    assert a.closed and not b.closed
+    assert shards.keys() == ["b"]
+
+
+def test_allowlist(tmp_path, monkeypatch):
+    monkeypatch.setenv("MEMGPT_SHARD_ALLOWLIST", "tenant-a, tenant-b")
+    shards = _shards(tmp_path)
+    assert shards.get("tenant-a").key == "tenant-a"
+    assert shards.get("default").key == "default"
+    with pytest.raises(PermissionError):
+        shards.get("tenant-c")
+    with pytest.raises(ValueError):
+        shards.get("../escape")
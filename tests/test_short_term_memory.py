@@ -0,0 +1,25 @@
+# tests/test_short_term_memory.py
+
+from memory.long_term_memory import LongTermMemory
+from memory.short_term_memory import ShortTermMemory
+from memory.storage.memory_store import MemoryStore
+
+
+def test_promotion_keeps_original_created_at(tmp_path, embedding_model):
+    store = MemoryStore(embedding_model=embedding_model, data_dir=str(tmp_path))
+    ltm = LongTermMemory("persona", "human", store.persistence_manager, store=store)
+    stm = ShortTermMemory("persona", "human", store.persistence_manager, store=store, ltm=ltm, capacity=1, batch_size=1)
+    store.load()
+    try:
+        stm.save("book a flight to Paris", {"result": "booked"})
+        created_at = next(iter(stm.storage.entries.values()))["created_at"]
+
+        # Over capacity: the first entry is promoted to long-term memory
+        stm.save("book a hotel in Rome", {"result": "booked"})
+        assert stm.stats["promoted"] == 1
+
+        promoted = [entry for entry in ltm.storage.storage if entry["value"] == "book a flight to Paris"]
+        assert len(promoted) == 1
+        assert promoted[0]["created_at"] == created_at
+    finally:
+        store.close()
@@ -0,0 +1,99 @@
+# tests/test_single_flight.py
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+from utils.single_flight import AsyncSingleFlight, SingleFlight
+from conftest import HashEmbeddingModel
+
+
+def _wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_concurrent_calls_share_one_run():
+    flight = SingleFlight()
+    release = threading.Event()
+    runs = []
+
+    def work():
+        runs.append(1)
+        release.wait(5)
+        return "result"
+
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(flight.do, "key", work) for _ in range(4)]
+        _wait_for(lambda: flight.shared == 3)
+        release.set()
+        assert [future.result() for future in futures] == ["result"] * 4
+
+    assert len(runs) == 1
+    assert flight.stats()["collapse_rate"] == 0.75
+    assert flight.stats()["in_flight"] == 0
+    # Nothing is remembered afterwards
+    assert flight.do("key", lambda: "again") == "again"
+
+
+def test_exception_is_shared():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise RuntimeError("boom")
+
+    with ThreadPoolExecutor(2) as pool:
+        futures = [pool.submit(flight.do, "key", fail) for _ in range(2)]
+        _wait_for(lambda: flight.shared == 1)
+        release.set()
+        for future in futures:
+            with pytest.raises(RuntimeError):
+                future.result()
+
+
+def test_async_waiter_cancellation_keeps_the_shared_run():
+    async def scenario():
+        flight = AsyncSingleFlight()
+        runs = []
+
+        async def work():
+            runs.append(1)
+            await asyncio.sleep(0.05)
+            return "result"
+
+        leader = asyncio.ensure_future(flight.do("key", work))
+        follower = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        assert await follower == "result"
+        assert len(runs) == 1
+        assert flight.stats()["shared"] == 1
+
+    asyncio.run(scenario())
+
+
+class SlowEmbeddingModel(HashEmbeddingModel):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.requests = []
+
+    def _request_embeddings(self, texts):
+        self.requests.append(list(texts))
+        time.sleep(0.1)
+        return super()._request_embeddings(texts)
+
+
+def test_concurrent_embeds_of_same_text_share_one_request():
+    model = SlowEmbeddingModel(model="single-flight-test", use_cache=False, coalesce=False)
+    with ThreadPoolExecutor(4) as pool:
+        vectors = list(pool.map(lambda _: model.embed("book a flight"), range(4)))
+
+    assert model.requests == [["book a flight"]]
+    for vector in vectors[1:]:
+        np.testing.assert_array_equal(vector, vectors[0])
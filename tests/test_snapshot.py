@@ -0,0 +1,38 @@
+# tests/test_snapshot.py
+
+import json
+import pytest
+from memory.snapshot import read_snapshot, write_snapshot
+
+
+def _corrupt(path: str) -> None:
+    # Valid JSON whose data no longer matches the checksum
+    with open(path, "r") as f:
+        envelope = json.load(f)
+    envelope["data"]["messages"].append("injected")
+    with open(path, "w") as f:
+        json.dump(envelope, f)
+
+
+def test_checksum_mismatch_falls_back_to_older_generation(tmp_path):
+    path = str(tmp_path / "state.json")
+    write_snapshot(path, {"messages": ["one"]})
+    write_snapshot(path, {"messages": ["one", "two"]})
+    _corrupt(path)
+
+    data, source = read_snapshot(path)
+    assert data == {"messages": ["one"]}
+    assert source == f"{path}.1"
+
+
+def test_every_generation_damaged_raises(tmp_path):
+    path = str(tmp_path / "state.json")
+    write_snapshot(path, {"messages": ["one"]})
+    _corrupt(path)
+
+    with pytest.raises(ValueError):
+        read_snapshot(path)
+
+
+def test_missing_snapshot(tmp_path):
+    assert read_snapshot(str(tmp_path / "state.json")) == (None, None)
@@ -0,0 +1,58 @@
+# tests/test_vector_file.py
+
+import numpy as np
+import pytest
+from memory.storage.vector_file import VectorFile
+
+
+def _rows(count: int, offset: int = 0):
+    vectors = np.arange(count * 4, dtype=np.float32).reshape(count, 4) + offset
+    return vectors, [{"id": offset + i} for i in range(count)]
+
+
+def test_append_and_rewrite(tmp_path):
+    vector_file = VectorFile(str(tmp_path / "entries"))
+    vector_file.append(*_rows(3))
+    vector_file.append(*_rows(2, offset=3))
+    vectors, metadata = vector_file.load()
+    assert [row["id"] for row in metadata] == [0, 1, 2, 3, 4]
+
+    vector_file.rewrite(*_rows(2, offset=10))
+    vectors, metadata = vector_file.load()
+    assert [row["id"] for row in metadata] == [10, 11]
+    np.testing.assert_array_equal(vectors, _rows(2, offset=10)[0])
+    # Only the committed generation is left on disk
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["entries.1.f32", "entries.1.meta.jsonl", "entries.header.json"]
+
+
+def test_crash_before_header_switch_keeps_old_generation(tmp_path, monkeypatch):
+    vector_file = VectorFile(str(tmp_path / "entries"))
+    vector_file.append(*_rows(3))
+
+    def crash(*args, **kwargs):
+        raise OSError("crash before the header is committed")
+
+    monkeypatch.setattr(vector_file, "_write_header", crash)
+    with pytest.raises(OSError):
+        vector_file.rewrite(*_rows(1, offset=10))
+    monkeypatch.undo()
+
+    _, metadata = vector_file.load()
+    assert [row["id"] for row in metadata] == [0, 1, 2]
+    # The next rewrite reuses the abandoned generation's files
+    vector_file.rewrite(*_rows(1, offset=10))
+    assert [row["id"] for row in vector_file.load()[1]] == [10]
+
+
+def test_torn_append_is_ignored_and_truncated(tmp_path):
+    vector_file = VectorFile(str(tmp_path / "entries"))
+    vector_file.append(*_rows(2))
+    # Rows written without a header update, as after a crash mid-append
+    with open(vector_file.data_path, "ab") as f:
+        f.write(b"\x00" * 16)
+    assert [row["id"] for row in vector_file.load()[1]] == [0, 1]
+
+    vector_file.append(*_rows(1, offset=2))
+    vectors, metadata = vector_file.load()
+    assert [row["id"] for row in metadata] == [0, 1, 2]
+    np.testing.assert_array_equal(vectors[2], _rows(1, offset=2)[0][0])
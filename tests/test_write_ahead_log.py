@@ -0,0 +1,40 @@
+# tests/test_write_ahead_log.py
+
+import os
+from memory.storage.write_ahead_log import WriteAheadLog
+
+
+def test_replay_drops_torn_tail(tmp_path):
+    path = str(tmp_path / "entries.wal")
+    wal = WriteAheadLog(path, fsync="always")
+    wal.append({"op": "add", "id": "a"})
+    wal.append({"op": "add", "id": "b"})
+    wal.close()
+    intact_size = os.path.getsize(path)
+    # A crash mid-write leaves half a record without its newline
+    with open(path, "ab") as f:
+        f.write(b'{"seq": 3, "op": "add", "id"')
+
+    wal = WriteAheadLog(path, fsync="always")
+    assert [record["id"] for record in wal.replay()] == ["a", "b"]
+    assert os.path.getsize(path) == intact_size
+
+    # Appending continues after the last intact record
+    assert wal.append({"op": "add", "id": "c"}) == 3
+    assert [record["id"] for record in wal.replay()] == ["a", "b", "c"]
+    wal.close()
+
+
+def test_replay_skips_checkpointed_records(tmp_path):
+    path = str(tmp_path / "entries.wal")
+    wal = WriteAheadLog(path, fsync="off")
+    wal.append({"op": "add", "id": "a"})
+    wal.checkpoint()
+    wal.append({"op": "add", "id": "b"})
+    wal.close()
+
+    wal = WriteAheadLog(path, fsync="off")
+    records = wal.replay()
+    assert [(record["seq"], record["id"]) for record in records] == [(2, "b")]
+    assert wal.last_seq == 2
+    wal.close()
@@ -1,7 +1,5 @@
 # web_scraper_tool.py
 
-import requests
-from bs4 import BeautifulSoup
 from utils.logger import logger
 import logging
 
@@ -11,6 +9,9 @@ class WebScraperTool:
         self.logger = logger
 
     def run(self, input_data: dict):
+        import requests
+        from bs4 import BeautifulSoup
+
         url = input_data.get('url', '')
         try:
             response = requests.get(url)
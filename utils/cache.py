@@ -1,12 +1,60 @@
 # cache.py
 
-import redis
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+class InMemoryRedis:
+    """Thread-safe stand-in for the subset of the Redis client CacheHandler uses, for tests and local runs."""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[bytes, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _encode(value) -> bytes:
+        return value if isinstance(value, bytes) else str(value).encode("utf-8")
+
+    def setex(self, key, expiration, value):
+        with self._lock:
+            self._data[key] = (self._encode(value), time.monotonic() + expiration)
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (self._encode(value), None)
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires is not None and expires <= time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
 
 class CacheHandler:
     """A Redis-based caching handler for storing and retrieving data."""
 
-    def __init__(self, host='localhost', port=6379, db=0):
-        self.client = redis.Redis(host=host, port=port, db=db)
+    def __init__(self, host='localhost', port=6379, db=0, client=None):
+        if client is None:
+            import redis  # Imported on first use so the module loads without the Redis client installed
+            client = redis.Redis(host=host, port=port, db=db)
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url: str) -> "CacheHandler":
+        """Connects to e.g. redis://redis:6379/0; `memory://` gives an in-process InMemoryRedis."""
+        if url.startswith("memory://"):
+            return cls(client=InMemoryRedis())
+        import redis
+        # Short socket timeouts: a cache that is down must not stall its callers
+        return cls(client=redis.Redis.from_url(url, socket_connect_timeout=2, socket_timeout=2))
 
     def set_cache(self, key, value, expiration=3600):
         """Set a value in the cache with an expiration time."""
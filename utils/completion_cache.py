@@ -0,0 +1,153 @@
+# completion_cache.py
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from utils.cache import CacheHandler
+from utils.logger import logger
+
+KEY_PREFIX = "llm-completion:"
+
+
+class CompletionCache:
+    """
+    Cache of LLM completions keyed by a hash of (model, messages, sampling parameters): a bounded
+    in-process LRU in front of an optional shared Redis tier (CacheHandler). Only calls at or below
+    `max_temperature` are cached, since higher temperatures are expected to vary. Redis errors never
+    fail a call; the tier is skipped for `retry_after` seconds instead.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        remote: Optional[CacheHandler] = None,
+        ttl: int = 86400,
+        max_temperature: float = 0.5,
+        retry_after: float = 30.0,
+    ):
+        self.max_entries = max_entries
+        self.remote = remote
+        self.ttl = ttl
+        self.max_temperature = max_temperature
+        self.retry_after = retry_after
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._remote_down_until = 0.0
+        self.local_hits = 0
+        self.remote_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.remote_errors = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(model: str, messages: List[Dict[str, str]], params: Dict[str, Any]) -> str:
+        payload = json.dumps({"model": model, "messages": messages, "params": params}, sort_keys=True, default=str)
+        return KEY_PREFIX + hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def cacheable(self, params: Dict[str, Any]) -> bool:
+        """Low-temperature, non-streaming, single-choice calls; the API's default temperature is 1.0."""
+        cacheable = (
+            params.get("temperature", 1.0) <= self.max_temperature
+            and not params.get("stream")
+            and params.get("n", 1) == 1
+        )
+        if not cacheable:
+            with self._lock:
+                self.bypassed += 1
+        return cacheable
+
+    def _remote_available(self) -> bool:
+        return self.remote is not None and time.monotonic() >= self._remote_down_until
+
+    def _remote_failed(self, e: Exception) -> None:
+        with self._lock:
+            self.remote_errors += 1
+            self._remote_down_until = time.monotonic() + self.retry_after
+        logger.warning(f"Completion cache: Redis tier unavailable ({e}); using the local tier for {self.retry_after:.0f}s")
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns a cached completion from the local tier, then Redis, or None on a miss."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.local_hits += 1
+                return value
+
+        value = None
+        if self._remote_available():
+            try:
+                raw = self.remote.get_cache(key)
+                value = raw.decode("utf-8") if isinstance(raw, bytes) else raw
+            except Exception as e:
+                self._remote_failed(e)
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.remote_hits += 1
+            self._insert(key, value)
+        return value
+
+    def put(self, key: str, value: str) -> None:
+        """Stores a completion in both tiers."""
+        if value is None:
+            return
+        with self._lock:
+            self._insert(key, value)
+        if self._remote_available():
+            try:
+                self.remote.set_cache(key, value, expiration=self.ttl)
+            except Exception as e:
+                self._remote_failed(e)
+
+    def _insert(self, key: str, value: str) -> None:
+        """Adds to the LRU and evicts from the cold end. Caller holds the lock."""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters per tier."""
+        with self._lock:
+            lookups = self.local_hits + self.remote_hits + self.misses
+            return {
+                "local_hits": self.local_hits,
+                "remote_hits": self.remote_hits,
+                "misses": self.misses,
+                "hit_rate": (self.local_hits + self.remote_hits) / lookups if lookups else 0.0,
+                "bypassed": self.bypassed,
+                "entries": len(self._entries),
+                "evictions": self.evictions,
+                "remote": self.remote is not None,
+                "remote_errors": self.remote_errors,
+            }
+
+    def clear(self) -> None:
+        """Empties the local tier; Redis entries expire on their own."""
+        with self._lock:
+            self._entries.clear()
+
+    @classmethod
+    def from_env(cls) -> Optional["CompletionCache"]:
+        """
+        Configured by MEMGPT_LLM_CACHE (0 disables), MEMGPT_LLM_CACHE_SIZE, MEMGPT_LLM_CACHE_TTL,
+        MEMGPT_LLM_CACHE_MAX_TEMPERATURE and MEMGPT_REDIS_URL (no Redis tier when unset).
+        """
+        if os.getenv("MEMGPT_LLM_CACHE", "1") == "0":
+            return None
+        redis_url = os.getenv("MEMGPT_REDIS_URL")
+        return cls(
+            max_entries=int(os.getenv("MEMGPT_LLM_CACHE_SIZE", 1024)),
+            remote=CacheHandler.from_url(redis_url) if redis_url else None,
+            ttl=int(os.getenv("MEMGPT_LLM_CACHE_TTL", 86400)),
+            max_temperature=float(os.getenv("MEMGPT_LLM_CACHE_MAX_TEMPERATURE", 0.5)),
+        )
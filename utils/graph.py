@@ -1,6 +1,5 @@
 # graph.py
 
-import networkx as nx
 from tasks.meta_task import MetaTask
 
 class GraphOptimizer:
@@ -8,6 +7,8 @@ class GraphOptimizer:
 
     def optimize(self, meta_tasks):
         """Organize tasks into an optimal execution order."""
+        import networkx as nx
+
         workflow_graph = nx.DiGraph()
 
         for task in meta_tasks:
@@ -0,0 +1,234 @@
+# llm_gateway.py
+
+import asyncio
+import os
+import threading
+from typing import Any, Dict, List, Optional
+from utils.completion_cache import CompletionCache
+from utils.logger import logger
+from utils.rate_limiter import RateLimiter, get_rate_limiter
+from utils.single_flight import AsyncSingleFlight
+from utils.tokenizer import get_token_counter
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+
+class LLMGateway:
+    """
+    Single async entry point for chat completions. One AsyncOpenAI client with a persistent
+    connection pool runs on a dedicated event loop thread; a semaphore caps the calls in flight
+    and every call has a timeout. Synchronous callers (the agents, which run in worker threads)
+    block only their own thread, and async callers on any loop can await `acomplete`.
+    Repeated low-temperature calls are answered from the completion cache when one is set, and
+    every API call first waits for room under its (model, API key) RPM/TPM limits. Identical
+    calls made while one is already in flight share its result instead of calling again.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+        max_connections: Optional[int] = None,
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        cache: Optional[CompletionCache] = None,
+        single_flight: Optional[bool] = None,
+    ):
+        self.cache = cache
+        if single_flight is None:
+            single_flight = os.getenv("MEMGPT_LLM_SINGLE_FLIGHT", "1") != "0"
+        self.flight = AsyncSingleFlight() if single_flight else None
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.max_concurrency = max_concurrency or int(os.getenv("MEMGPT_LLM_MAX_CONCURRENCY", 64))
+        self.max_connections = max_connections or int(os.getenv("MEMGPT_LLM_MAX_CONNECTIONS", 100))
+        self.timeout = timeout or float(os.getenv("MEMGPT_LLM_TIMEOUT", 30.0))
+        self.max_retries = int(os.getenv("MEMGPT_LLM_MAX_RETRIES", 2)) if max_retries is None else max_retries
+        self.stats: Dict[str, float] = {"calls": 0, "failures": 0, "timeouts": 0, "in_flight": 0, "peak_in_flight": 0}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._client = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._limiters: Dict[str, RateLimiter] = {}
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        """Starts the gateway loop on first use."""
+        if self._loop is not None:
+            return self._loop
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+                self._thread = threading.Thread(target=self._run, args=(loop, ready), name="llm-gateway", daemon=True)
+                self._thread.start()
+                ready.wait()
+                self._loop = loop
+        return self._loop
+
+    def _run(self, loop: asyncio.AbstractEventLoop, ready: threading.Event) -> None:
+        asyncio.set_event_loop(loop)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        loop.call_soon(ready.set)
+        loop.run_forever()
+
+    def _get_client(self):
+        """The pooled client, created on the gateway loop the first time it is needed."""
+        if self._client is None:
+            import httpx
+            import openai  # Imported on first use: the SDK is slow to import
+
+            limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+            self._client = openai.AsyncOpenAI(
+                api_key=self.api_key,
+                timeout=self.timeout,
+                max_retries=self.max_retries,
+                http_client=httpx.AsyncClient(limits=limits, timeout=self.timeout),
+            )
+        return self._client
+
+    def _limiter(self, model: str) -> RateLimiter:
+        if model not in self._limiters:
+            self._limiters[model] = get_rate_limiter(model, self.api_key)
+        return self._limiters[model]
+
+    @staticmethod
+    def _estimate_tokens(messages: List[Dict[str, str]], params: Dict[str, Any]) -> int:
+        """Prompt tokens plus the completion allowance, as the provider counts them against TPM."""
+        counter = get_token_counter()
+        prompt = sum(counter.count(message.get("content") or "") + 4 for message in messages)
+        return prompt + int(params.get("max_tokens") or 256) * int(params.get("n") or 1)
+
+    async def _complete(self, messages: List[Dict[str, str]], model: str, timeout: float, params: Dict[str, Any]) -> str:
+        limiter = self._limiter(model)
+        estimate = self._estimate_tokens(messages, params) if limiter.tokens is not None else 0
+        # Wait for rate-limit room before taking a concurrency slot
+        await limiter.acquire(estimate)
+        used = 0  # A call that fails, times out or is cancelled (even while queued for a slot) gets its tokens back
+        try:
+            async with self._semaphore:
+                self.stats["calls"] += 1
+                self.stats["in_flight"] += 1
+                self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.stats["in_flight"])
+                try:
+                    response = await asyncio.wait_for(
+                        self._get_client().chat.completions.create(model=model, messages=messages, **params),
+                        timeout,
+                    )
+                    usage = getattr(response, "usage", None)
+                    used = usage.total_tokens if usage is not None else estimate
+                    return response.choices[0].message.content
+                except asyncio.TimeoutError:
+                    self.stats["timeouts"] += 1
+                    self.stats["failures"] += 1
+                    raise TimeoutError(f"LLM call to {model} timed out after {timeout}s")
+                except Exception:
+                    self.stats["failures"] += 1
+                    raise
+                finally:
+                    self.stats["in_flight"] -= 1
+        finally:
+            if estimate and used != estimate:
+                await limiter.asettle(estimate, used)
+
+    async def _deduplicated_complete(self, messages, model: str, timeout: float, params: Dict[str, Any], use_cache: Optional[bool]) -> str:
+        if self.flight is None:
+            return await self._cached_complete(messages, model, timeout, params, use_cache)
+        key = (CompletionCache.key(model, messages, params), use_cache is not False)
+        return await self.flight.do(key, lambda: self._cached_complete(messages, model, timeout, params, use_cache))
+
+    async def _cached_complete(self, messages, model: str, timeout: float, params: Dict[str, Any], use_cache: Optional[bool]) -> str:
+        cache = self.cache if use_cache is not False else None
+        if cache is None or (use_cache is None and not cache.cacheable(params)):
+            return await self._complete(messages, model, timeout, params)
+
+        key = cache.key(model, messages, params)
+        # The Redis tier does blocking I/O, keep it off the gateway loop
+        lookup = asyncio.to_thread if cache.remote is not None else self._call
+        cached = await lookup(cache.get, key)
+        if cached is not None:
+            return cached
+        text = await self._complete(messages, model, timeout, params)
+        await lookup(cache.put, key, text)
+        return text
+
+    @staticmethod
+    async def _call(function, *args):
+        return function(*args)
+
+    def _submit(self, messages, model, timeout, params, use_cache):
+        loop = self._ensure_started()
+        coroutine = self._deduplicated_complete(messages, model or DEFAULT_MODEL, timeout or self.timeout, params, use_cache)
+        return asyncio.run_coroutine_threadsafe(coroutine, loop)
+
+    async def acomplete(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        timeout: Optional[float] = None,
+        cache: Optional[bool] = None,
+        **params: Any,
+    ) -> str:
+        """
+        Returns the completion text; awaitable from any event loop. `cache` forces the completion
+        cache on or off; by default only low-temperature calls use it.
+        """
+        return await asyncio.wrap_future(self._submit(messages, model, timeout, params, cache))
+
+    def complete(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        timeout: Optional[float] = None,
+        cache: Optional[bool] = None,
+        **params: Any,
+    ) -> str:
+        """Blocking variant for synchronous code; must not be called from a running event loop."""
+        return self._submit(messages, model, timeout, params, cache).result()
+
+    def chat(self, prompt: str, system: str = "You are a helpful assistant.", **params: Any) -> str:
+        """Completes a single user prompt under a system message."""
+        return self.complete([{"role": "system", "content": system}, {"role": "user", "content": prompt}], **params)
+
+    def report(self) -> Dict[str, Any]:
+        """Call counters, completion cache hit rates, collapsed duplicate calls and rate-limit waits per model."""
+        return {
+            **self.stats,
+            "single_flight": self.flight.stats() if self.flight is not None else None,
+            "cache": self.cache.stats() if self.cache is not None else None,
+            "rate_limits": {model: dict(limiter.stats) for model, limiter in self._limiters.items()},
+        }
+
+    def close(self) -> None:
+        """Closes the connection pool and stops the loop thread."""
+        if self._loop is None:
+            return
+        loop, self._loop = self._loop, None
+        if self._client is not None:
+            asyncio.run_coroutine_threadsafe(self._client.close(), loop).result()
+            self._client = None
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join()
+        self._thread = None
+        loop.close()
+        logger.info(f"LLM gateway closed after {self.stats['calls']} calls")
+
+
+_default_gateway: Optional[LLMGateway] = None
+_default_gateway_lock = threading.Lock()
+
+
+def get_gateway() -> LLMGateway:
+    """Process-wide gateway shared by every agent, configured from the environment."""
+    global _default_gateway
+    with _default_gateway_lock:
+        if _default_gateway is None:
+            _default_gateway = LLMGateway(cache=CompletionCache.from_env())
+        return _default_gateway
+
+
+def close_gateway() -> None:
+    global _default_gateway
+    with _default_gateway_lock:
+        gateway, _default_gateway = _default_gateway, None
+    if gateway is not None:
+        gateway.close()
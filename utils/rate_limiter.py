@@ -0,0 +1,252 @@
+# rate_limiter.py
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from utils.logger import logger
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: holds up to `capacity` tokens and refills at `rate` tokens per second.
+    A bucket may be driven into debt by `adjust` when a reservation turns out too small.
+    """
+
+    def __init__(self, capacity: float, rate: float):
+        if capacity <= 0 or rate <= 0:
+            raise ValueError("Token bucket capacity and rate must be positive.")
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        """Caller holds the lock."""
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: Optional[float] = None) -> float:
+        """Seconds until `amount` tokens are available (0 when they are now). Caller holds the lock."""
+        self._refill(time.monotonic() if now is None else now)
+        amount = min(amount, self.capacity)  # Oversized requests wait for a full bucket instead of forever
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount: float) -> float:
+        """Takes the tokens if available and returns 0, otherwise returns the seconds to wait."""
+        with self._lock:
+            wait = self.wait_time(amount)
+            if wait == 0:
+                self.tokens -= min(amount, self.capacity)
+            return wait
+
+    def adjust(self, amount: float) -> None:
+        """Gives back (positive) or charges (negative) tokens after the fact."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limits for one (model, API key). A call reserves one
+    request and its estimated tokens from both buckets at once; `acquire` waits until both have room
+    instead of refusing, and `settle` corrects the token bucket once the real usage is known.
+    A limit of 0 means unlimited.
+    """
+
+    def __init__(self, rpm: float = 0, tpm: float = 0, burst: float = 1.0):
+        self.rpm = rpm
+        self.tpm = tpm
+        # A full bucket holds `burst` minutes' worth of the limit
+        self.requests = TokenBucket(rpm * burst, rpm / 60.0) if rpm else None
+        self.tokens = TokenBucket(tpm * burst, tpm / 60.0) if tpm else None
+        self._lock = threading.Lock()
+        self.stats: Dict[str, float] = {"acquired": 0, "throttled": 0, "waited_s": 0.0}
+
+    def reserve(self, tokens: float = 0) -> float:
+        """Takes one request and `tokens` from the buckets and returns 0, or returns the seconds to wait."""
+        buckets = [(bucket, amount) for bucket, amount in ((self.requests, 1), (self.tokens, tokens)) if bucket is not None]
+        with self._lock:
+            for bucket, _ in buckets:
+                bucket._lock.acquire()
+            try:
+                now = time.monotonic()
+                wait = max([bucket.wait_time(amount, now) for bucket, amount in buckets], default=0.0)
+                if wait == 0:
+                    for bucket, amount in buckets:
+                        bucket.tokens -= min(amount, bucket.capacity)
+                return wait
+            finally:
+                for bucket, _ in buckets:
+                    bucket._lock.release()
+
+    def settle(self, estimated: float, actual: float) -> None:
+        """Corrects the token bucket once a call's real token usage is known (0 refunds a failed call)."""
+        if self.tokens is not None and actual is not None:
+            self.tokens.adjust(estimated - actual)
+
+    async def asettle(self, estimated: float, actual: float) -> None:
+        """`settle` for event loop callers."""
+        self.settle(estimated, actual)
+
+    def _record(self, waited: float) -> None:
+        self.stats["acquired"] += 1
+        if waited:
+            self.stats["throttled"] += 1
+            self.stats["waited_s"] += waited
+
+    async def acquire(self, tokens: float = 0) -> float:
+        """Waits until the call fits under both limits, then reserves it. Returns the seconds waited."""
+        waited = 0.0
+        while True:
+            wait = self.reserve(tokens)
+            if wait == 0:
+                self._record(waited)
+                return waited
+            await asyncio.sleep(wait)
+            waited += wait
+
+    def acquire_sync(self, tokens: float = 0) -> float:
+        """Blocking variant of `acquire` for threads without an event loop."""
+        waited = 0.0
+        while True:
+            wait = self.reserve(tokens)
+            if wait == 0:
+                self._record(waited)
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+
+# Refills and takes from both buckets atomically on the Redis server, using its clock.
+# KEYS: request bucket, token bucket. ARGV: rpm, tpm, burst, tokens wanted, debt to add.
+# Returns the milliseconds to wait, 0 when the reservation was made.
+SHARED_BUCKET_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local limits = {tonumber(ARGV[1]), tonumber(ARGV[2])}
+local wanted = {1, tonumber(ARGV[4])}
+local burst = tonumber(ARGV[3])
+local debt = tonumber(ARGV[5])
+local levels = {}
+local wait = 0
+for i = 1, 2 do
+    if limits[i] > 0 then
+        local capacity = limits[i] * burst
+        local rate = limits[i] / 60
+        local state = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+        local tokens = tonumber(state[1]) or capacity
+        local ts = tonumber(state[2]) or now
+        tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+        if i == 2 then tokens = math.min(capacity, tokens - debt) end
+        levels[i] = tokens
+        local amount = math.min(wanted[i], capacity)
+        if debt == 0 and tokens < amount then
+            wait = math.max(wait, (amount - tokens) / rate)
+        end
+    end
+end
+for i = 1, 2 do
+    if levels[i] ~= nil then
+        local tokens = levels[i]
+        if debt == 0 and wait == 0 then
+            tokens = tokens - math.min(wanted[i], limits[i] * burst)
+        end
+        redis.call('HSET', KEYS[i], 'tokens', tokens, 'ts', now)
+        redis.call('EXPIRE', KEYS[i], 120)
+    end
+end
+return math.ceil(wait * 1000)
+"""
+
+
+class SharedRateLimiter(RateLimiter):
+    """
+    RateLimiter whose buckets live in Redis, so every worker process draws from the same limits.
+    While Redis is unreachable it falls back to its in-process buckets, which only see this process's calls.
+    """
+
+    def __init__(self, client, key: str, rpm: float = 0, tpm: float = 0, burst: float = 1.0, retry_after: float = 30.0):
+        super().__init__(rpm, tpm, burst)
+        self.client = client
+        self.burst = burst
+        self.keys = [f"ratelimit:{key}:requests", f"ratelimit:{key}:tokens"]
+        self.retry_after = retry_after
+        self._script = None
+        self._down_until = 0.0
+
+    def _eval(self, tokens: float, debt: float) -> Optional[float]:
+        if time.monotonic() < self._down_until:
+            return None
+        try:
+            if self._script is None:
+                self._script = self.client.register_script(SHARED_BUCKET_SCRIPT)
+            return self._script(keys=self.keys, args=[self.rpm, self.tpm, self.burst, tokens, debt]) / 1000.0
+        except Exception as e:
+            self._down_until = time.monotonic() + self.retry_after
+            logger.warning(f"Shared rate limiter unavailable ({e}); limiting locally for {self.retry_after:.0f}s")
+            return None
+
+    def reserve(self, tokens: float = 0) -> float:
+        wait = self._eval(tokens, 0)
+        return super().reserve(tokens) if wait is None else wait
+
+    def settle(self, estimated: float, actual: float) -> None:
+        if self.tpm and actual is not None and actual != estimated:
+            if self._eval(0, actual - estimated) is None:
+                super().settle(estimated, actual)
+
+    async def asettle(self, estimated: float, actual: float) -> None:
+        await asyncio.to_thread(self.settle, estimated, actual)
+
+    async def acquire(self, tokens: float = 0) -> float:
+        # Every reservation is a Redis round trip; keep it off the caller's event loop
+        waited = 0.0
+        while True:
+            wait = await asyncio.to_thread(self.reserve, tokens)
+            if wait == 0:
+                self._record(waited)
+                return waited
+            await asyncio.sleep(wait)
+            waited += wait
+
+
+def _configured_limits(model: str) -> Tuple[float, float]:
+    """(rpm, tpm) for a model: MEMGPT_LLM_LIMITS JSON overrides, then MEMGPT_LLM_RPM / MEMGPT_LLM_TPM."""
+    overrides = json.loads(os.getenv("MEMGPT_LLM_LIMITS", "{}") or "{}")
+    limits = overrides.get(model, {})
+    return (
+        float(limits.get("rpm", os.getenv("MEMGPT_LLM_RPM", 0))),
+        float(limits.get("tpm", os.getenv("MEMGPT_LLM_TPM", 0))),
+    )
+
+
+_limiters: Dict[Tuple[str, str], RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(model: str, api_key: Optional[str] = None) -> RateLimiter:
+    """
+    Shared limiter for a (model, API key) pair. Limits come from the environment; with
+    MEMGPT_RATE_LIMIT_REDIS_URL set, the buckets are shared across processes through Redis.
+    """
+    key_id = hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]  # Never store the key itself
+    with _limiters_lock:
+        limiter = _limiters.get((model, key_id))
+        if limiter is None:
+            rpm, tpm = _configured_limits(model)
+            burst = float(os.getenv("MEMGPT_RATE_LIMIT_BURST", 1.0))
+            redis_url = os.getenv("MEMGPT_RATE_LIMIT_REDIS_URL")
+            if redis_url and (rpm or tpm):
+                import redis
+                client = redis.Redis.from_url(redis_url, socket_connect_timeout=2, socket_timeout=2)
+                limiter = SharedRateLimiter(client, f"{model}:{key_id}", rpm, tpm, burst)
+            else:
+                limiter = RateLimiter(rpm, tpm, burst)
+            _limiters[(model, key_id)] = limiter
+        return limiter
@@ -1,20 +1,18 @@
 # rpm_controller.py
 
-import time
+from utils.rate_limiter import TokenBucket
 
 class RPMController:
-    """Controls the rate of requests per minute to avoid exceeding limits."""
+    """
+    Controls the rate of requests per minute to avoid exceeding limits.
+    Kept for compatibility; backed by a token bucket (see utils.rate_limiter for RPM + TPM limits).
+    A limit of 0 or None means unlimited.
+    """
 
     def __init__(self, max_requests_per_minute):
         self.max_requests_per_minute = max_requests_per_minute
-        self.requests = []
+        self.bucket = TokenBucket(max_requests_per_minute, max_requests_per_minute / 60.0) if max_requests_per_minute else None
 
     def allow_request(self):
         """Determine if a request can be allowed based on the rate limit."""
-        current_time = time.time()
-        self.requests = [t for t in self.requests if current_time - t < 60]
-
-        if len(self.requests) < self.max_requests_per_minute:
-            self.requests.append(current_time)
-            return True
-        return False
+        return self.bucket is None or self.bucket.take(1) == 0
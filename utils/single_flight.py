@@ -0,0 +1,80 @@
+# single_flight.py
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class _FlightCounters:
+    def __init__(self):
+        self.leaders = 0  # Calls that actually ran
+        self.shared = 0   # Calls answered by another caller's in-flight run
+
+    def stats(self) -> Dict[str, Any]:
+        calls = self.leaders + self.shared
+        return {
+            "calls": calls,
+            "leaders": self.leaders,
+            "shared": self.shared,
+            "collapse_rate": self.shared / calls if calls else 0.0,
+            "in_flight": len(self._flights),
+        }
+
+
+class SingleFlight(_FlightCounters):
+    """
+    Collapses concurrent identical calls from threads: the first caller for a key runs the
+    function, callers arriving while it is in flight wait for and share its result (or exception).
+    Nothing is remembered once the call completes; caching is left to the caller.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._flights: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, function: Callable[[], Any]) -> Any:
+        with self._lock:
+            future = self._flights.get(key)
+            leader = future is None
+            if leader:
+                future = self._flights[key] = Future()
+                self.leaders += 1
+            else:
+                self.shared += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = function()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._flights[key]
+
+
+class AsyncSingleFlight(_FlightCounters):
+    """
+    SingleFlight for coroutines on one event loop. The shared run is a task, so a caller that is
+    cancelled or times out does not cancel it for the others still waiting.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._flights: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, function: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._flights.get(key)
+        if task is None:
+            task = self._flights[key] = asyncio.ensure_future(function())
+            task.add_done_callback(lambda _: self._flights.pop(key, None))
+            self.leaders += 1
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
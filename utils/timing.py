@@ -0,0 +1,30 @@
+# timing.py
+
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+
+class PhaseTimer:
+    """Records how long named phases take, e.g. for a startup-time report."""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str):
+        """Times the enclosed block; repeated phases accumulate."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    def report(self) -> Dict[str, float]:
+        """Milliseconds per phase plus the total since the timer was created."""
+        return {**self.phases, "total": (time.perf_counter() - self._started) * 1000}
+
+    def summary(self) -> str:
+        return ", ".join(f"{name}={elapsed:.1f}ms" for name, elapsed in self.report().items())
@@ -0,0 +1,75 @@
+# tokenizer.py
+
+import functools
+import math
+import os
+import re
+import threading
+from typing import Dict, Optional
+
+# Heuristic fallback: words and punctuation marks, each roughly one BPE token
+PIECE_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+# One counter per model, shared by every caller in the process
+_counters: Dict[str, "TokenCounter"] = {}
+_counters_lock = threading.Lock()
+
+
+class TokenCounter:
+    """
+    Counts tokens with tiktoken when it is installed and a heuristic estimate otherwise.
+    The encoding is loaded once on first use and counts are memoised per text.
+    """
+
+    def __init__(self, model: str = "gpt-4o-mini", cache_size: int = 8192):
+        self.model = model
+        self._encoding = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.count = functools.lru_cache(maxsize=cache_size)(self._count)
+
+    @property
+    def encoding(self):
+        """The tiktoken encoding for the model, or None when tiktoken is unavailable."""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._encoding = self._load_encoding()
+                    self._loaded = True
+        return self._encoding
+
+    def _load_encoding(self):
+        try:
+            import tiktoken  # Optional dependency, imported on first count
+        except ImportError:
+            return None
+        try:
+            return tiktoken.encoding_for_model(self.model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+
+    @property
+    def exact(self) -> bool:
+        """Whether counts come from the model's real tokenizer rather than the estimate."""
+        return self.encoding is not None
+
+    def _count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        # Long words split into several tokens: take the larger of the piece count and ~4 chars per token
+        return max(len(PIECE_PATTERN.findall(text)), math.ceil(len(text) / 4))
+
+
+def get_token_counter(model: Optional[str] = None) -> TokenCounter:
+    """Shared counter for a model, defaulting to the MEMGPT_TOKENIZER_MODEL environment variable."""
+    model = model or os.getenv("MEMGPT_TOKENIZER_MODEL", "gpt-4o-mini")
+    with _counters_lock:
+        if model not in _counters:
+            _counters[model] = TokenCounter(model)
+        return _counters[model]
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    return get_token_counter(model).count(text)